@@ -1,14 +1,14 @@
 from datetime import datetime, timedelta
 from typing import Optional
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from sqlalchemy.orm import Session
 
 from . import crud, models, schemas
 from .db import get_db
+from .services.password_hasher import pwd_context, password_hasher
 
 import os
 from dotenv import load_dotenv
@@ -20,8 +20,6 @@ SECRET_KEY = os.getenv("SECRET_KEY", "09d25e094faa6ca2556c818166b7a9563b93f7099f
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 
@@ -37,11 +35,32 @@ def authenticate_user(db: Session, username: str, password: str):
     user = db.query(models.User).filter(models.User.username == username).first()
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    valid, new_hash = pwd_context.verify_and_update(password, user.hashed_password)
+    if not valid:
         return False
+    _store_rehash(db, user, new_hash)
     return user
 
 
+async def authenticate_user_async(db: Session, username: str, password: str):
+    """Like authenticate_user, but bcrypt runs on the password hashing pool"""
+    user = db.query(models.User).filter(models.User.username == username).first()
+    if not user:
+        return False
+    valid, new_hash = await password_hasher.verify(password, user.hashed_password)
+    if not valid:
+        return False
+    _store_rehash(db, user, new_hash)
+    return user
+
+
+def _store_rehash(db: Session, user: models.User, new_hash: Optional[str]):
+    # The stored hash used outdated cost settings; upgrade it now that we know the password
+    if new_hash is not None:
+        user.hashed_password = new_hash
+        db.commit()
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -53,23 +72,40 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(request: Request, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    """
+    Resolve the bearer token to a user. Claims already verified by the auth
+    middleware are taken from request.state, and a cached snapshot of the
+    user is returned without a database lookup when available (it is a
+    detached User object, not attached to `db`).
+    """
+    from .token_cache import token_cache
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        if getattr(request.state, "token", None) == token:
+            payload = request.state.token_claims
+        else:
+            payload = token_cache.verify(token)
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
         token_data = schemas.TokenData(username=username)
     except JWTError:
         raise credentials_exception
+
+    snapshot = token_cache.get_user(token)
+    if snapshot is not None:
+        return models.User(**snapshot)
+
     user = db.query(models.User).filter(models.User.username == token_data.username).first()
     if user is None:
         raise credentials_exception
+    token_cache.set_user(token, user)
     return user
 
 
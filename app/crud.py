@@ -1,15 +1,23 @@
+from sqlalchemy import insert, func, case
 from sqlalchemy.orm import Session
 from . import models, schemas
+from bisect import bisect_left, bisect_right
 from datetime import datetime, timedelta
-import joblib
+import json
 import numpy as np
+import uuid
 from .models.meal_recommendation import MealRecommendation
-from passlib.context import CryptContext
+from .services import health_rollups, progress_series
+from .services.alert_hub import alert_hub, alert_event
+from .services import email_outbox, food_catalog
+from .services.password_hasher import pwd_context
+from .services.symptom_classifier import symptom_classifier
+from .services.food_search import food_search, resolve_meal_items
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-def create_user(db: Session, user: schemas.UserCreate):
-    hashed_password = pwd_context.hash(user.password)
+def create_user(db: Session, user: schemas.UserCreate, hashed_password: str = None):
+    # Async callers hash on the password hashing pool and pass the result in
+    if hashed_password is None:
+        hashed_password = pwd_context.hash(user.password)
     user_data = user.dict()
     user_data.pop("password")
     user_data["hashed_password"] = hashed_password
@@ -23,60 +31,52 @@ def get_user(db: Session, user_id: str):
     return db.query(models.User).filter(models.User.id == user_id).first()
 
 def bulk_insert_foods_from_df(db: Session, df):
-    from .models import FoodItem
-    for _, row in df.iterrows():
-        f = FoodItem(
-            name=row['name'],
-            serving_g=int(row['serving_g']),
-            calories_per_100g=float(row['calories_per_100g']),
-            protein_g_per_100g=float(row['protein_g_per_100g']),
-            fat_g_per_100g=float(row['fat_g_per_100g']),
-            carbs_g_per_100g=float(row['carbs_g_per_100g']),
-            tags=row.get('tags', "")
-        )
-        db.add(f)
+    """Upsert a DataFrame of foods on (name, serving_g) in one executemany/COPY"""
+    rows, skipped = food_catalog.clean_chunk(df)
+    food_catalog.check_table(db.connection())
+    written, _ = food_catalog.upsert_chunk(db.connection(), rows)
     db.commit()
+    food_search.invalidate()
+    return {"rows": written, "skipped": skipped}
 
 # Symptom logging functions
 def create_symptom_log(db: Session, symptom_log: schemas.SymptomLogCreate):
-    # Load AI model for symptom classification
-    try:
-        model = joblib.load("models/symptom_model.joblib")
-        # Convert symptoms to feature vector (simplified)
-        symptoms = symptom_log.symptoms
-        features = [
-            1 if 'fever' in [s.lower() for s in symptoms] else 0,
-            1 if 'nausea' in [s.lower() for s in symptoms] else 0,
-            1 if 'bloating' in [s.lower() for s in symptoms] else 0,
-            1 if 'headache' in [s.lower() for s in symptoms] else 0
-        ]
-        classification = model.predict([features])[0]
-        classification_map = {0: "none", 1: "flu-like", 2: "food-intolerance"}
-        ai_classification = classification_map.get(classification, "unknown")
-        
-        # Determine if medical attention is needed
-        needs_medical_attention = (
-            symptom_log.severity >= 8 or 
-            'fever' in [s.lower() for s in symptoms] or
-            'severe' in [s.lower() for s in symptoms]
+    return create_symptom_logs(db, [symptom_log])[0]
+
+def create_symptom_logs(db: Session, symptom_logs: list):
+    """Create several symptom logs with one (memoized) classifier call and one commit"""
+    # Classify with the process-wide (memory-mapped) symptom model
+    classifications = symptom_classifier.classify_many([log.symptoms for log in symptom_logs])
+    created = []
+    for symptom_log, ai_classification in zip(symptom_logs, classifications):
+        symptoms = [s.lower() for s in symptom_log.symptoms]
+        if ai_classification == "unknown":
+            needs_medical_attention = symptom_log.severity >= 8
+        else:
+            # Determine if medical attention is needed
+            needs_medical_attention = (
+                symptom_log.severity >= 8 or
+                'fever' in symptoms or
+                'severe' in symptoms
+            )
+
+        sl = models.SymptomLog(
+            user_id=symptom_log.user_id,
+            symptom=','.join(symptom_log.symptoms),  # Join the symptoms list into a comma-separated string
+            severity=symptom_log.severity,
+            notes=f"AI Classification: {ai_classification}"
         )
-    except:
-        ai_classification = "unknown"
-        needs_medical_attention = symptom_log.severity >= 8
-
-    sl = models.SymptomLog(
-        user_id=symptom_log.user_id,
-        symptom=','.join(symptom_log.symptoms),  # Join the symptoms list into a comma-separated string
-        severity=symptom_log.severity,
-        notes=f"AI Classification: {ai_classification}"
-    )
-    # Add these as attributes after creation since they're not in the model
-    sl.ai_classification = ai_classification
-    sl.needs_medical_attention = needs_medical_attention
-    db.add(sl)
+        db.add(sl)
+        db.flush()
+        health_rollups.record_symptom(db, sl.user_id, sl.timestamp, ai_classification, sl.severity)
+        created.append((sl, ai_classification, needs_medical_attention))
     db.commit()
-    db.refresh(sl)
-    return sl
+    for sl, ai_classification, needs_medical_attention in created:
+        db.refresh(sl)
+        # Add these as attributes after the refresh since they're not in the model
+        sl.ai_classification = ai_classification
+        sl.needs_medical_attention = needs_medical_attention
+    return [sl for sl, _, _ in created]
 
 def get_user_symptoms(db: Session, user_id: str, days: int = 7):
     cutoff_date = datetime.utcnow() - timedelta(days=days)
@@ -104,23 +104,27 @@ def get_user_symptoms(db: Session, user_id: str, days: int = 7):
 
 # Meal logging functions
 def create_meal_log(db: Session, meal_log: schemas.MealLogCreate):
-    # Calculate total calories from foods
-    total_calories = 0
-    for food in meal_log.foods:
-        # This is simplified - in real app you'd look up food in database
-        if 'calories' in food:
-            total_calories += food['calories']
-    
+    # Resolve foods to catalog rows and compute calories and macros server-side
+    foods = [food.dict(exclude_none=True) for food in meal_log.foods]
+    items, totals = resolve_meal_items(food_search.current(db), foods)
+
     ml = models.MealLog(
         user_id=meal_log.user_id,
         meal_type=meal_log.meal_type,
-        foods=meal_log.foods,
-        total_calories=total_calories,
-        symptoms_after=meal_log.symptoms_after or []
+        food_items=json.dumps(items),
+        calories=totals["calories"],
+        protein_grams=totals["protein_g"],
+        carbs_grams=totals["carbs_g"],
+        fat_grams=totals["fat_g"]
     )
     db.add(ml)
+    db.flush()
+    health_rollups.record_meal(db, ml.user_id, ml.timestamp, totals["calories"],
+                               totals["protein_g"], totals["carbs_g"], totals["fat_g"])
     db.commit()
     db.refresh(ml)
+    # Not stored on the meal; the route logs them as a symptom log
+    ml.symptoms_after = meal_log.symptoms_after or []
     return ml
 
 def get_user_meals(db: Session, user_id: str, days: int = 7):
@@ -130,10 +134,33 @@ def get_user_meals(db: Session, user_id: str, days: int = 7):
         models.MealLog.timestamp >= cutoff_date
     ).order_by(models.MealLog.timestamp.desc()).all()
 
+def get_symptoms_after_meals(db: Session, user_id: str, meals: list, hours: float = 6):
+    """
+    Symptoms the user logged within `hours` after each meal, by meal id.
+    Meals only link to symptoms by time; one query covers all the meals.
+    """
+    if not meals:
+        return {}
+    window = timedelta(hours=hours)
+    rows = db.query(models.SymptomLog.timestamp, models.SymptomLog.symptom).filter(
+        models.SymptomLog.user_id == user_id,
+        models.SymptomLog.timestamp >= min(meal.timestamp for meal in meals),
+        models.SymptomLog.timestamp <= max(meal.timestamp for meal in meals) + window
+    ).order_by(models.SymptomLog.timestamp).all()
+    times = [row[0] for row in rows]
+    symptoms_after = {}
+    for meal in meals:
+        logged = rows[bisect_left(times, meal.timestamp):bisect_right(times, meal.timestamp + window)]
+        symptoms_after[meal.id] = [s.strip() for _, symptom in logged for s in (symptom or "").split(",") if s.strip()]
+    return symptoms_after
+
 # Progress tracking functions
 def create_progress(db: Session, progress: schemas.ProgressCreate):
     p = models.Progress(**progress.dict())
     db.add(p)
+    db.flush()
+    health_rollups.record_progress(db, p)
+    progress_series.record_progress(db, p)
     db.commit()
     db.refresh(p)
     return p
@@ -154,16 +181,73 @@ def create_health_alert(db: Session, user_id: str, alert_type: str, message: str
         severity=severity
     )
     db.add(alert)
+    db.flush()
+    health_rollups.record_alert(db, user_id, alert.created_at, severity)
+    email_outbox.enqueue_critical_alerts(db, [alert_event(alert)])
     db.commit()
     db.refresh(alert)
+    alert_hub.publish(alert_event(alert))
     return alert
 
+def create_health_alerts(db: Session, alerts: list):
+    """
+    Insert many alerts with a single INSERT and commit once.
+    Each item needs user_id, alert_type, message and severity (fingerprint is optional).
+    Returns the inserted rows as dicts.
+    """
+    if not alerts:
+        return []
+    now = datetime.utcnow()
+    rows = [{"id": str(uuid.uuid4()), "is_read": False, "created_at": now, "fingerprint": None, **a} for a in alerts]
+    db.execute(insert(models.HealthAlert), rows)
+    for row in rows:
+        health_rollups.record_alert(db, row["user_id"], row["created_at"], row["severity"])
+    email_outbox.enqueue_critical_alerts(db, rows)
+    db.commit()
+    for row in rows:
+        alert_hub.publish(alert_event(row))
+    return rows
+
 def get_user_alerts(db: Session, user_id: str, unread_only: bool = False):
     query = db.query(models.HealthAlert).filter(models.HealthAlert.user_id == user_id)
     if unread_only:
         query = query.filter(models.HealthAlert.is_read == False)
     return query.order_by(models.HealthAlert.created_at.desc()).all()
 
+def get_alert_summary(db: Session, user_id: str):
+    """
+    Count a user's alerts by severity and type, plus the unread count,
+    with a single GROUP BY query.
+    """
+    HealthAlert = models.HealthAlert
+    rows = db.query(
+        HealthAlert.severity,
+        HealthAlert.alert_type,
+        func.count(HealthAlert.id),
+        func.sum(case((HealthAlert.is_read == False, 1), else_=0))
+    ).filter(HealthAlert.user_id == user_id).group_by(HealthAlert.severity, HealthAlert.alert_type).all()
+
+    severity_counts = {}
+    alert_type_counts = {}
+    total = unread = 0
+    for severity, alert_type, count, unread_count in rows:
+        severity_counts[severity] = severity_counts.get(severity, 0) + count
+        alert_type_counts[alert_type] = alert_type_counts.get(alert_type, 0) + count
+        total += count
+        unread += unread_count or 0
+    return {
+        "total_alerts": total,
+        "unread_alerts": unread,
+        "severity_distribution": severity_counts,
+        "alert_type_distribution": alert_type_counts
+    }
+
+def get_recent_alerts_by_severity(db: Session, user_id: str, severity: str, limit: int = 5):
+    return db.query(models.HealthAlert).filter(
+        models.HealthAlert.user_id == user_id,
+        models.HealthAlert.severity == severity
+    ).order_by(models.HealthAlert.created_at.desc()).limit(limit).all()
+
 def mark_alert_read(db: Session, alert_id: str):
     alert = db.query(models.HealthAlert).filter(models.HealthAlert.id == alert_id).first()
     if alert:
@@ -171,6 +255,27 @@ def mark_alert_read(db: Session, alert_id: str):
         db.commit()
     return alert
 
+def mark_alerts_read(db: Session, user_id: str, alert_ids: list = None, before: datetime = None,
+                     alert_type: str = None) -> int:
+    """
+    Mark a user's unread alerts as read with a single UPDATE, optionally
+    limited to some ids, alerts created before a time, or one alert type.
+    Returns the number of alerts that changed.
+    """
+    query = db.query(models.HealthAlert).filter(
+        models.HealthAlert.user_id == user_id,
+        models.HealthAlert.is_read == False
+    )
+    if alert_ids is not None:
+        query = query.filter(models.HealthAlert.id.in_(alert_ids))
+    if before is not None:
+        query = query.filter(models.HealthAlert.created_at < before)
+    if alert_type is not None:
+        query = query.filter(models.HealthAlert.alert_type == alert_type)
+    updated = query.update({models.HealthAlert.is_read: True}, synchronize_session=False)
+    db.commit()
+    return updated
+
 # Meal recommendation functions
 def create_meal_recommendation(db: Session, recommendation: schemas.MealRecommendationCreate):
     """Create a new meal recommendation record"""
@@ -44,6 +44,9 @@ def health_check():
 
 # Add authentication middleware
 from .middleware import add_auth_middleware
+from .services.password_hasher import password_hasher, HasherBusyError
+from .services import food_catalog
+from .services.food_search import food_search
 add_auth_middleware(app)
 
 # Include all route modules
@@ -57,6 +60,26 @@ app.include_router(consultation.router)
 # create tables (simple approach)
 Base.metadata.create_all(bind=engine)
 
+@app.on_event("startup")
+def start_alert_evaluator():
+    from .services import alert_evaluator
+    alert_evaluator.start_scheduler()
+
+@app.on_event("shutdown")
+def stop_alert_evaluator():
+    from .services import alert_evaluator
+    alert_evaluator.stop_scheduler()
+
+@app.on_event("startup")
+async def start_email_outbox():
+    from .services import email_outbox
+    email_outbox.start_worker()
+
+@app.on_event("shutdown")
+async def stop_email_outbox():
+    from .services import email_outbox
+    await email_outbox.stop_worker()
+
 def get_db():
     from .db import SessionLocal
     session = SessionLocal()
@@ -100,7 +123,16 @@ async def create_user(u: schemas.UserCreate, session: Session = Depends(get_db))
             detail="Email already registered"
         )
     
-    user = crud.create_user(session, u)
+    # bcrypt runs on the password hashing pool, not on the event loop
+    try:
+        hashed_password = await password_hasher.hash(u.password)
+    except HasherBusyError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server busy, please retry",
+            headers={"Retry-After": "1"}
+        )
+    user = crud.create_user(session, u, hashed_password=hashed_password)
     
     # Send welcome email
     from .services.email_service import send_welcome_email
@@ -114,7 +146,14 @@ async def create_user(u: schemas.UserCreate, session: Session = Depends(get_db))
 
 @app.post("/token", response_model=schemas.Token)
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = auth.authenticate_user(db, form_data.username, form_data.password)
+    try:
+        user = await auth.authenticate_user_async(db, form_data.username, form_data.password)
+    except HasherBusyError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server busy, please retry",
+            headers={"Retry-After": "1"}
+        )
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -127,6 +166,18 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
+@app.get("/metrics/password-hashing")
+def password_hashing_metrics():
+    """Queue and run times of the password hashing pool"""
+    return password_hasher.stats()
+
+@app.post("/logout")
+async def logout(token: str = Depends(auth.oauth2_scheme)):
+    """Revoke the current access token"""
+    from .token_cache import token_cache
+    token_cache.revoke(token)
+    return {"message": "Logged out"}
+
 @app.get("/users/{user_id}", response_model=schemas.UserResponse)
 def get_user(user_id: str, session: Session = Depends(get_db)):
     user = crud.get_user(session, user_id)
@@ -193,9 +244,16 @@ def load_food_sample(session: Session = Depends(get_db)):
     path = os.path.join("data", "food_sample.csv")
     if not os.path.exists(path):
         raise HTTPException(status_code=400, detail="data/food_sample.csv not found")
-    df = pd.read_csv(path)
-    crud.bulk_insert_foods_from_df(session, df)
-    return {"loaded": len(df), "message": "Sample food data loaded successfully"}
+    result = food_catalog.import_catalog(session.get_bind(), path)
+    food_search.invalidate()
+    return {"loaded": result["rows"], **result, "message": "Sample food data loaded successfully"}
+
+@app.get("/food/search")
+def search_foods(q: str, limit: int = 10, session: Session = Depends(get_db)):
+    """Autocomplete food names from the catalog, best matches first"""
+    if not 1 <= limit <= 50:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 50")
+    return {"query": q, "results": food_search.search(session, q, limit)}
 
 def mifflin_calories(sex, weight_kg, height_cm, age, activity_factor=1.2):
     if sex.lower() in ("m", "male"):
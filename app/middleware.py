@@ -1,8 +1,9 @@
-from fastapi import Request, HTTPException, status
-from fastapi.responses import JSONResponse
-from jose import JWTError, jwt
-from .auth import SECRET_KEY, ALGORITHM
-from typing import List
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+from fastapi import status
+from jose import JWTError
+from .token_cache import token_cache
+from typing import Iterable
 import re
 
 # List of paths that don't require authentication
@@ -28,65 +29,100 @@ PUBLIC_PATHS = [
     "/login",  # Login page
     "/register",  # Registration page
     "/@vite/client",  # Vite client for development
+    "/alerts/user/[^/]+/stream",  # SSE alert stream; EventSource cannot send headers, the route checks ?token=
 ]
 
-# Compile regex patterns for public paths
-PUBLIC_PATHS_PATTERNS = [re.compile(f"^{path}$") for path in PUBLIC_PATHS]
+_REGEX_CHARS = re.compile(r"[\\^$.|?*+()\[\]{}]")
+
+
+class PublicPathMatcher:
+    """
+    Matches a path against all public path patterns at once. Each pattern is
+    a full-match regex; plain paths go into a set, "<prefix>.*" patterns into
+    a prefix tuple, and anything else into one combined regex.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        exact, prefixes, regexes = set(), [], []
+        for pattern in patterns:
+            if pattern.endswith(".*") and not _REGEX_CHARS.search(pattern[:-2]):
+                prefixes.append(pattern[:-2])
+            elif not _REGEX_CHARS.search(pattern):
+                exact.add(pattern)
+            else:
+                regexes.append(f"(?:{pattern})")
+        self.exact = frozenset(exact)
+        self.prefixes = tuple(prefixes)
+        self.regex = re.compile("|".join(regexes)) if regexes else None
+
+    def __call__(self, path: str) -> bool:
+        return (
+            path in self.exact
+            or path.startswith(self.prefixes)
+            or (self.regex is not None and self.regex.fullmatch(path) is not None)
+        )
+
+
+is_public_path = PublicPathMatcher(PUBLIC_PATHS)
+
+
+def _unauthorized(detail: str) -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        content={"detail": detail},
+        headers={"WWW-Authenticate": "Bearer"}
+    )
 
 
 class AuthMiddleware:
-    """Middleware for JWT authentication"""
-    
-    async def __call__(self, request: Request, call_next):
-        path = request.url.path
-        
-        # Check if the path is public
-        if self._is_public_path(path):
-            return await call_next(request)
-        
+    """
+    Pure ASGI middleware for JWT authentication. Unlike BaseHTTPMiddleware it
+    does not wrap the request in a task or the response in a stream; it only
+    inspects the scope headers and either rejects the request or passes it on.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or is_public_path(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
         # Check for authorization header
-        authorization = request.headers.get("Authorization")
+        authorization = None
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                authorization = value.decode("latin-1")
+                break
         if not authorization or not authorization.startswith("Bearer "):
-            return JSONResponse(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                content={"detail": "Not authenticated"},
-                headers={"WWW-Authenticate": "Bearer"}
-            )
-        
+            await _unauthorized("Not authenticated")(scope, receive, send)
+            return
+
         token = authorization.replace("Bearer ", "")
-        
+
         try:
-            # Verify token
-            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-            username = payload.get("sub")
-            if username is None:
-                return JSONResponse(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    content={"detail": "Invalid token"},
-                    headers={"WWW-Authenticate": "Bearer"}
-                )
-            
-            # Add user info to request state
-            request.state.user = {"username": username}
-            
+            # Verify token (decoded once, then served from the token cache until it expires)
+            payload = token_cache.verify(token)
         except JWTError:
-            return JSONResponse(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                content={"detail": "Invalid token"},
-                headers={"WWW-Authenticate": "Bearer"}
-            )
-        
-        return await call_next(request)
-    
-    def _is_public_path(self, path: str) -> bool:
-        """Check if the path is public and doesn't require authentication"""
-        for pattern in PUBLIC_PATHS_PATTERNS:
-            if pattern.match(path):
-                return True
-        return False
+            await _unauthorized("Invalid token")(scope, receive, send)
+            return
+
+        username = payload.get("sub")
+        if username is None:
+            await _unauthorized("Invalid token")(scope, receive, send)
+            return
+
+        # Add user info to request state (request.state reads scope["state"]);
+        # auth.get_current_user reuses the verified claims instead of decoding again
+        state = scope.setdefault("state", {})
+        state["user"] = {"username": username}
+        state["token"] = token
+        state["token_claims"] = payload
+
+        await self.app(scope, receive, send)
 
 
 def add_auth_middleware(app):
     """Add authentication middleware to the FastAPI app"""
-    from starlette.middleware.base import BaseHTTPMiddleware
-    app.add_middleware(BaseHTTPMiddleware, dispatch=AuthMiddleware())
\ No newline at end of file
+    app.add_middleware(AuthMiddleware)
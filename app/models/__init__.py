@@ -3,6 +3,15 @@ from .meal_recommendation import MealRecommendation
 from .user import User
 from .symptom_log import SymptomLog
 from .progress import Progress
+from .health_alert import HealthAlert
+from .daily_rollup import DailyHealthRollup
+from .progress_series import ProgressSeriesBucket
+from .report_export import ReportExport
+from .alert_evaluator_run import AlertEvaluatorRun
+from .email_outbox import EmailOutbox
+from .model_training_run import ModelTrainingRun
+from .food_item import FoodItem
+from .meal_log import MealLog
 
-# Export Base, MealRecommendation, User, SymptomLog, and Progress
-__all__ = ['Base', 'MealRecommendation', 'User', 'SymptomLog', 'Progress']
\ No newline at end of file
+# Export Base and all ORM models
+__all__ = ['Base', 'MealRecommendation', 'User', 'SymptomLog', 'Progress', 'HealthAlert', 'DailyHealthRollup', 'ProgressSeriesBucket', 'ReportExport', 'AlertEvaluatorRun', 'EmailOutbox', 'ModelTrainingRun', 'FoodItem', 'MealLog']
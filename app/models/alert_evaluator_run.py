@@ -0,0 +1,35 @@
+from sqlalchemy import Column, String, Integer, Float, DateTime, Text, UniqueConstraint
+from datetime import datetime
+from ..db import Base
+import uuid
+
+def new_id():
+    return str(uuid.uuid4())
+
+class AlertEvaluatorRun(Base):
+    """
+    One pass of the background alert evaluator. scanned_until of the latest
+    completed run is the watermark the next run starts from.
+
+    A running run holds the evaluator lease: lease is "evaluator" only while
+    it runs, and the unique constraint lets one process hold it at a time.
+    """
+    __tablename__ = "alert_evaluator_runs"
+    __table_args__ = (UniqueConstraint("lease", name="uq_alert_evaluator_runs_lease"),)
+    id = Column(String, primary_key=True, default=new_id)
+    status = Column(String, default="running")  # running, completed, failed
+    lease = Column(String)  # "evaluator" while running, NULL afterwards
+    lease_expires_at = Column(DateTime)
+    scanned_from = Column(DateTime)
+    scanned_until = Column(DateTime, index=True)
+    users_evaluated = Column(Integer, default=0)
+    batches = Column(Integer, default=0)
+    failed_batches = Column(Integer, default=0)
+    alerts_created = Column(Integer, default=0)
+    duplicates_suppressed = Column(Integer, default=0)
+    duration_seconds = Column(Float)
+    users_per_second = Column(Float)
+    lag_seconds = Column(Float)  # oldest new reading -> end of its evaluation
+    error = Column(Text)
+    started_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime)
@@ -0,0 +1,47 @@
+from sqlalchemy import Column, String, Integer, Float, Date, DateTime, JSON, Index
+from datetime import datetime
+from ..db import Base
+import uuid
+
+def new_id():
+    return str(uuid.uuid4())
+
+class DailyHealthRollup(Base):
+    """
+    Materialized per-user, per-day health totals.
+    Rows are maintained incrementally by the write paths in crud so that
+    dashboards can read a user's recent health state without scanning logs.
+    """
+    __tablename__ = "daily_health_rollups"
+    __table_args__ = (
+        Index("ix_daily_health_rollups_user_day", "user_id", "day", unique=True),
+    )
+
+    id = Column(String, primary_key=True, default=new_id)
+    user_id = Column(String, nullable=False)
+    day = Column(Date, nullable=False)
+
+    # Nutrition
+    meal_count = Column(Integer, default=0)
+    calories = Column(Float, default=0.0)
+    protein_g = Column(Float, default=0.0)
+    carbs_g = Column(Float, default=0.0)
+    fat_g = Column(Float, default=0.0)
+
+    # Symptoms
+    symptom_log_count = Column(Integer, default=0)
+    symptom_class_counts = Column(JSON)  # {"flu-like": 2, "none": 1}
+    symptom_severity_counts = Column(JSON)  # {"mild": 1, "moderate": 0, "severe": 2}
+
+    # Latest vitals recorded on this day
+    weight_kg = Column(Float)
+    blood_sugar = Column(Float)
+    blood_pressure_systolic = Column(Integer)
+    blood_pressure_diastolic = Column(Integer)
+    vitals_recorded_at = Column(DateTime)
+
+    # Alerts
+    alert_count = Column(Integer, default=0)
+    alert_severity_counts = Column(JSON)  # {"high": 1, "critical": 0}
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,31 @@
+from sqlalchemy import Column, String, Integer, DateTime, Text, Index
+from datetime import datetime
+from ..db import Base
+import uuid
+
+def new_id():
+    return str(uuid.uuid4())
+
+class EmailOutbox(Base):
+    """
+    Queued outbound email. Rows are delivered by the outbox worker; while a
+    worker holds a row (status "sending") next_attempt_at is its lease expiry.
+    """
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        Index("ix_email_outbox_due", "status", "next_attempt_at"),
+    )
+
+    id = Column(String, primary_key=True, default=new_id)
+    recipient = Column(String, nullable=False)
+    domain = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    body = Column(Text, nullable=False)
+    subtype = Column(String, default="html")  # html, plain
+    kind = Column(String)  # welcome, password_reset, critical_alert
+    status = Column(String, default="pending")  # pending, sending, sent, failed
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow)
+    last_error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime)
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, String, Integer, Float, Text, UniqueConstraint
+from ..db import Base
+import uuid
+
+def new_id():
+    return str(uuid.uuid4())
+
+class FoodItem(Base):
+    """
+    A food catalog entry. Name plus serving size is the natural key the
+    catalog import upserts on.
+    """
+    __tablename__ = "food_items"
+    __table_args__ = (UniqueConstraint("name", "serving_g", name="uq_food_items_name_serving"),)
+    id = Column(String, primary_key=True, default=new_id)
+    name = Column(String, nullable=False)
+    serving_g = Column(Integer, nullable=False)
+    calories_per_100g = Column(Float)
+    protein_g_per_100g = Column(Float)
+    fat_g_per_100g = Column(Float)
+    carbs_g_per_100g = Column(Float)
+    tags = Column(Text)
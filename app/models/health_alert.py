@@ -0,0 +1,25 @@
+from sqlalchemy import Column, String, Boolean, DateTime, Text, Index, text
+from datetime import datetime
+from ..db import Base
+import uuid
+
+def new_id():
+    return str(uuid.uuid4())
+
+class HealthAlert(Base):
+    __tablename__ = "health_alerts"
+    __table_args__ = (
+        # Serves the per-severity listings (e.g. latest critical alerts) of the summary
+        Index("ix_health_alerts_user_severity_created", "user_id", "severity", "created_at"),
+        # At most one unread alert per fingerprint, so concurrent rule runs cannot both raise it
+        Index("uq_health_alerts_open_fingerprint", "fingerprint", unique=True,
+              postgresql_where=text("NOT is_read"), sqlite_where=text("NOT is_read")),
+    )
+    id = Column(String, primary_key=True, default=new_id)
+    user_id = Column(String, nullable=False, index=True)
+    alert_type = Column(String)  # severe_symptoms, weight_change, etc.
+    message = Column(Text)
+    severity = Column(String)  # low, medium, high, critical
+    is_read = Column(Boolean, default=False)
+    fingerprint = Column(String, index=True)  # set by the alert rule engine for deduplication
+    created_at = Column(DateTime, default=datetime.utcnow)
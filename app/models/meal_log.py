@@ -1,6 +1,7 @@
 from sqlalchemy import Column, String, Integer, Float, DateTime, Text, ForeignKey
 from datetime import datetime
 from ..db import Base
+import json
 import uuid
 
 def new_id():
@@ -17,4 +18,13 @@ class MealLog(Base):
     carbs_grams = Column(Float)
     fat_grams = Column(Float)
     notes = Column(Text)
-    timestamp = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    timestamp = Column(DateTime, default=datetime.utcnow)
+
+    @property
+    def foods(self):
+        """Logged food items, parsed from food_items"""
+        return json.loads(self.food_items) if self.food_items else []
+
+    @property
+    def total_calories(self):
+        return self.calories or 0.0
@@ -0,0 +1,30 @@
+from sqlalchemy import Column, String, Integer, Float, DateTime, Text
+from datetime import datetime
+from ..db import Base
+import uuid
+
+def new_id():
+    return str(uuid.uuid4())
+
+class ModelTrainingRun(Base):
+    """
+    A symptom model training job. The API enqueues it; the training worker
+    process claims it and records epoch progress and metrics as it runs.
+    """
+    __tablename__ = "model_training_runs"
+    id = Column(String, primary_key=True, default=new_id)
+    mode = Column(String, default="incremental")  # incremental, full
+    status = Column(String, default="queued", index=True)  # queued, running, completed, skipped, failed
+    epoch = Column(Integer, default=0)
+    epochs = Column(Integer)
+    progress = Column(Float, default=0.0)  # 0..1
+    loss = Column(Float)
+    samples = Column(Integer)
+    metrics = Column(Text)  # JSON
+    model_version = Column(Integer)
+    worker = Column(String)
+    error = Column(Text)
+    requested_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    heartbeat_at = Column(DateTime)
+    finished_at = Column(DateTime)
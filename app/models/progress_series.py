@@ -0,0 +1,31 @@
+from sqlalchemy import Column, String, Integer, Float, Date, DateTime, Index
+from datetime import datetime
+from ..db import Base
+import uuid
+
+def new_id():
+    return str(uuid.uuid4())
+
+class ProgressSeriesBucket(Base):
+    """
+    Downsampled progress measurements for a single metric.
+    One row per (user, metric, resolution, bucket) holding min/max/mean/last,
+    maintained on every progress insert so long-range charts can skip raw rows.
+    """
+    __tablename__ = "progress_series_buckets"
+    __table_args__ = (
+        Index("ix_progress_series_lookup", "user_id", "metric", "resolution", "bucket_start", unique=True),
+    )
+
+    id = Column(String, primary_key=True, default=new_id)
+    user_id = Column(String, nullable=False)
+    metric = Column(String, nullable=False)  # weight_kg, blood_sugar, blood_pressure_systolic, ...
+    resolution = Column(String, nullable=False)  # day, week
+    bucket_start = Column(Date, nullable=False)
+    count = Column(Integer, default=0)
+    min_value = Column(Float)
+    max_value = Column(Float)
+    sum_value = Column(Float, default=0.0)
+    last_value = Column(Float)
+    last_at = Column(DateTime)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
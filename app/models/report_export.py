@@ -0,0 +1,25 @@
+from sqlalchemy import Column, String, Integer, DateTime, Text
+from datetime import datetime
+from ..db import Base
+import uuid
+
+def new_id():
+    return str(uuid.uuid4())
+
+class ReportExport(Base):
+    """
+    A health report export job. The file is written in the background to
+    REPORT_EXPORT_DIR and can be downloaded once status is "completed".
+    """
+    __tablename__ = "report_exports"
+    id = Column(String, primary_key=True, default=new_id)
+    user_id = Column(String, nullable=False, index=True)
+    format = Column(String, nullable=False)  # csv, ndjson, pdf
+    days = Column(Integer, nullable=False)
+    status = Column(String, default="pending")  # pending, running, completed, failed
+    rows_written = Column(Integer, default=0)
+    file_path = Column(String)
+    error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    completed_at = Column(DateTime)
@@ -1,11 +1,124 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from jose import JWTError
 from sqlalchemy.orm import Session
 from .. import crud, schemas
-from ..db import get_db
-from typing import List
+from ..db import get_db, SessionLocal
+from ..token_cache import token_cache
+from ..services import alert_rules, alert_evaluator
+from ..services.alert_hub import alert_hub
+import json
+from typing import List, Optional
+from datetime import datetime
 
 router = APIRouter(prefix="/alerts", tags=["alerts"])
 
+# Upper bound on alert ids per bulk read request
+MAX_BULK_ALERT_IDS = 1000
+
+# Seconds between keep-alive messages on idle alert streams
+STREAM_HEARTBEAT_SECONDS = 15
+
+@router.get("/evaluator/runs")
+def get_evaluator_runs(limit: int = Query(20, ge=1, le=200), db: Session = Depends(get_db)):
+    """Get recent background alert evaluator runs with their lag and throughput"""
+    return [
+        {
+            "id": run.id,
+            "status": run.status,
+            "scanned_from": run.scanned_from,
+            "scanned_until": run.scanned_until,
+            "users_evaluated": run.users_evaluated,
+            "batches": run.batches,
+            "failed_batches": run.failed_batches,
+            "alerts_created": run.alerts_created,
+            "duplicates_suppressed": run.duplicates_suppressed,
+            "duration_seconds": run.duration_seconds,
+            "users_per_second": run.users_per_second,
+            "lag_seconds": run.lag_seconds,
+            "started_at": run.started_at,
+            "finished_at": run.finished_at
+        }
+        for run in alert_evaluator.get_recent_runs(db, limit)
+    ]
+
+def _token_username(token: Optional[str]) -> Optional[str]:
+    """The username of a valid access token, None for a missing, invalid or revoked one"""
+    if not token:
+        return None
+    try:
+        # Through the token cache, so revoked (logged out) tokens are rejected
+        return token_cache.verify(token).get("sub")
+    except JWTError:
+        return None
+
+@router.get("/user/{user_id}/stream")
+async def stream_user_alerts(user_id: str, request: Request, token: Optional[str] = Query(None),
+                             db: Session = Depends(get_db)):
+    """
+    Push new alerts for a user as Server-Sent Events. A browser EventSource
+    cannot set headers, so the access token may be passed as ?token= instead
+    of an Authorization header.
+    """
+    authorization = request.headers.get("authorization", "")
+    if token is None and authorization.startswith("Bearer "):
+        token = authorization[len("Bearer "):]
+    username = _token_username(token)
+    if username is None:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    user = crud.get_user(db, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    if user.username != username:
+        raise HTTPException(status_code=403, detail="Not allowed to read this user's alerts")
+    
+    subscription = alert_hub.subscribe(user_id)
+    
+    async def events():
+        try:
+            while not await request.is_disconnected():
+                event = await subscription.get(STREAM_HEARTBEAT_SECONDS)
+                if event is None:
+                    yield ": keep-alive\n\n"
+                else:
+                    yield f"id: {event['id']}\nevent: alert\ndata: {json.dumps(event)}\n\n"
+        finally:
+            alert_hub.unsubscribe(subscription)
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@router.websocket("/user/{user_id}/ws")
+async def user_alerts_websocket(websocket: WebSocket, user_id: str, token: str = Query(None)):
+    """
+    Push new alerts for a user over a WebSocket. Browsers cannot set headers
+    on WebSocket requests, so the access token is passed as ?token=.
+    """
+    username = _token_username(token)
+    user = None
+    if username is not None:
+        db = SessionLocal()
+        try:
+            user = crud.get_user(db, user_id)
+        finally:
+            db.close()
+    if user is None or user.username != username:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    await websocket.accept()
+    subscription = alert_hub.subscribe(user_id)
+    try:
+        while True:
+            event = await subscription.get(STREAM_HEARTBEAT_SECONDS)
+            if event is None:
+                await websocket.send_json({"type": "ping"})
+            else:
+                await websocket.send_json({"type": "alert", **event})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        alert_hub.unsubscribe(subscription)
+
 @router.get("/user/{user_id}", response_model=List[schemas.HealthAlertResponse])
 def get_user_alerts(user_id: str, unread_only: bool = False, db: Session = Depends(get_db)):
     """Get user's health alerts"""
@@ -24,6 +137,31 @@ def mark_alert_as_read(alert_id: str, db: Session = Depends(get_db)):
     
     return {"message": "Alert marked as read", "alert_id": alert_id}
 
+@router.put("/user/{user_id}/read")
+def mark_alerts_as_read(user_id: str, request: schemas.AlertBulkReadRequest, db: Session = Depends(get_db)):
+    """Mark a list of the user's alerts as read"""
+    if len(request.alert_ids) > MAX_BULK_ALERT_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_ALERT_IDS} alert ids per request")
+    
+    updated = crud.mark_alerts_read(db, user_id, alert_ids=list(set(request.alert_ids)))
+    return {"message": "Alerts marked as read", "requested": len(request.alert_ids), "updated": updated}
+
+@router.put("/user/{user_id}/read-all")
+def mark_all_alerts_as_read(
+    user_id: str,
+    before: Optional[datetime] = Query(None, description="Only alerts created before this time"),
+    db: Session = Depends(get_db)
+):
+    """Mark all of the user's alerts as read, optionally only those created before a timestamp"""
+    updated = crud.mark_alerts_read(db, user_id, before=before)
+    return {"message": "Alerts marked as read", "updated": updated}
+
+@router.put("/user/{user_id}/read-type/{alert_type}")
+def mark_alert_type_as_read(user_id: str, alert_type: str, db: Session = Depends(get_db)):
+    """Mark all of the user's alerts of one type as read"""
+    updated = crud.mark_alerts_read(db, user_id, alert_type=alert_type)
+    return {"message": "Alerts marked as read", "alert_type": alert_type, "updated": updated}
+
 @router.get("/user/{user_id}/summary")
 def get_alerts_summary(user_id: str, db: Session = Depends(get_db)):
     """Get summary of user's alerts"""
@@ -31,34 +169,18 @@ def get_alerts_summary(user_id: str, db: Session = Depends(get_db)):
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    all_alerts = crud.get_user_alerts(db, user_id)
-    unread_alerts = crud.get_user_alerts(db, user_id, unread_only=True)
-    
-    # Count alerts by severity
-    severity_counts = {}
-    alert_type_counts = {}
-    
-    for alert in all_alerts:
-        severity_counts[alert.severity] = severity_counts.get(alert.severity, 0) + 1
-        alert_type_counts[alert.alert_type] = alert_type_counts.get(alert.alert_type, 0) + 1
+    # Counts come from one aggregate query, critical alerts from an indexed LIMIT query
+    summary = crud.get_alert_summary(db, user_id)
+    critical_alerts = crud.get_recent_alerts_by_severity(db, user_id, "critical", limit=5)
     
-    # Get recent critical alerts
-    critical_alerts = [alert for alert in all_alerts if alert.severity == "critical"][:5]
-    
-    summary = {
-        "total_alerts": len(all_alerts),
-        "unread_alerts": len(unread_alerts),
-        "severity_distribution": severity_counts,
-        "alert_type_distribution": alert_type_counts,
-        "recent_critical_alerts": [
-            {
-                "id": alert.id,
-                "message": alert.message,
-                "created_at": alert.created_at
-            }
-            for alert in critical_alerts
-        ]
-    }
+    summary["recent_critical_alerts"] = [
+        {
+            "id": alert.id,
+            "message": alert.message,
+            "created_at": alert.created_at
+        }
+        for alert in critical_alerts
+    ]
     
     return summary
 
@@ -69,58 +191,20 @@ def check_health_status(user_id: str, db: Session = Depends(get_db)):
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    # Get recent symptoms and progress data
-    recent_symptoms = crud.get_user_symptoms(db, user_id, days=3)
-    recent_progress = crud.get_user_progress(db, user_id, days=7)
-    
-    alerts_generated = []
-    
-    # Check for severe symptoms
-    severe_symptoms = [s for s in recent_symptoms if s.severity >= 8]
-    if severe_symptoms:
-        alert_message = f"Severe symptoms detected in the last 3 days. Please consult a healthcare provider."
-        alert = crud.create_health_alert(db, user_id, "severe_symptoms", alert_message, "high")
-        alerts_generated.append(alert)
-    
-    # Check for rapid weight changes
-    if len(recent_progress) >= 2:
-        weight_changes = []
-        for i in range(1, len(recent_progress)):
-            weight_diff = recent_progress[i-1].weight_kg - recent_progress[i].weight_kg
-            weight_changes.append(abs(weight_diff))
-        
-        avg_weight_change = sum(weight_changes) / len(weight_changes)
-        if avg_weight_change > 2:  # More than 2kg average change
-            alert_message = f"Significant weight change detected ({avg_weight_change:.1f}kg average). Monitor your health."
-            alert = crud.create_health_alert(db, user_id, "weight_change", alert_message, "medium")
-            alerts_generated.append(alert)
-    
-    # Check for high blood pressure
-    if recent_progress:
-        latest = recent_progress[0]
-        if latest.blood_pressure_systolic and latest.blood_pressure_systolic > 140:
-            alert_message = f"High blood pressure detected ({latest.blood_pressure_systolic}/{latest.blood_pressure_diastolic}). Consider lifestyle changes."
-            alert = crud.create_health_alert(db, user_id, "high_blood_pressure", alert_message, "medium")
-            alerts_generated.append(alert)
-    
-    # Check for high blood sugar
-    if recent_progress:
-        latest = recent_progress[0]
-        if latest.blood_sugar and latest.blood_sugar > 140:
-            alert_message = f"High blood sugar detected ({latest.blood_sugar} mg/dL). Monitor your diet and consult a doctor."
-            alert = crud.create_health_alert(db, user_id, "high_blood_sugar", alert_message, "medium")
-            alerts_generated.append(alert)
+    # Evaluate the alert rules; rules with an open (unread) alert are not raised again
+    result = alert_rules.run_rules(db, user_id)
     
     return {
         "health_status": "checked",
-        "alerts_generated": len(alerts_generated),
+        "alerts_generated": len(result["alerts"]),
+        "suppressed_duplicates": result["suppressed"],
         "new_alerts": [
             {
-                "id": alert.id,
-                "type": alert.alert_type,
-                "message": alert.message,
-                "severity": alert.severity
+                "id": alert["id"],
+                "type": alert["alert_type"],
+                "message": alert["message"],
+                "severity": alert["severity"]
             }
-            for alert in alerts_generated
+            for alert in result["alerts"]
         ]
     }
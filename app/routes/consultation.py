@@ -14,7 +14,9 @@ import re
 import logging
 from datetime import datetime
 from .. import db, crud, schemas
+from ..db import get_db
 from ..services.consultation import HealthConsultation
+from ..services import health_rollups
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -165,30 +167,72 @@ async def chat_with_health_assistant(message: ChatMessage, db: Session = Depends
     return ChatResponse(response=response)
 
 
-@router.get("/summary", response_class=HTMLResponse)
-async def get_health_summary(user_id: str = Query(...), db: Session = Depends(get_db)):
+@router.get("/summary")
+async def get_health_summary(
+    user_id: str = Query(...),
+    days: int = Query(7, ge=1, le=30),
+    format: str = Query("html", description="Response format (html or json)"),
+    db: Session = Depends(get_db)
+):
     """
     Get a summary of the user's health data for display in the chat interface.
+    The summary is served from the user's materialized daily rollups.
     """
+    summary = health_rollups.build_health_summary(db, user_id, days)
+    if format == "json":
+        return summary
+
     try:
-        # This would normally fetch real user data from the database
-        # For now, we'll return mock data
-        summary = f"""
+        return HTMLResponse(content=_render_health_summary(summary))
+    except Exception as e:
+        logger.error(f"Error generating health summary: {e}")
+        return HTMLResponse(content="<p>Unable to load health summary at this time.</p>")
+
+def _render_health_summary(summary: Dict[str, Any]) -> str:
+    """Render a rollup health summary as an HTML fragment"""
+    nutrition = summary["nutrition"]
+    symptoms = summary["symptoms"]
+    vitals = summary["latest_vitals"]
+    alerts = summary["alerts"]
+    days = summary["window_days"]
+
+    items = []
+    if vitals and vitals.get("blood_pressure_systolic") is not None:
+        items.append(f"<li><strong>Blood Pressure:</strong> {vitals['blood_pressure_systolic']}/{vitals['blood_pressure_diastolic']} mmHg</li>")
+    if vitals and vitals.get("blood_sugar") is not None:
+        items.append(f"<li><strong>Blood Sugar:</strong> {vitals['blood_sugar']} mg/dL</li>")
+    if vitals and vitals.get("weight_kg") is not None:
+        items.append(f"<li><strong>Weight:</strong> {vitals['weight_kg']} kg</li>")
+    if not vitals:
+        items.append("<li><strong>Vitals:</strong> No recent measurements</li>")
+
+    if nutrition["average_daily_calories"] is not None:
+        items.append(
+            f"<li><strong>Nutrition:</strong> {nutrition['average_daily_calories']} kcal/day avg "
+            f"(P {nutrition['protein_g']}g / C {nutrition['carbs_g']}g / F {nutrition['fat_g']}g over {days} days)</li>"
+        )
+    else:
+        items.append("<li><strong>Nutrition:</strong> No meals logged</li>")
+
+    if symptoms["total_logs"]:
+        classes = ", ".join(f"{name}: {count}" for name, count in symptoms["by_classification"].items())
+        severe = symptoms["by_severity"].get("severe", 0)
+        items.append(f"<li><strong>Recent Symptoms:</strong> {symptoms['total_logs']} logged ({classes}); {severe} severe</li>")
+    else:
+        items.append("<li><strong>Recent Symptoms:</strong> None reported</li>")
+
+    items.append(f"<li><strong>Alerts:</strong> {alerts['total']} in the last {days} days</li>")
+
+    last_updated = summary["last_updated"][:10] if summary["last_updated"] else "No data yet"
+    return f"""
         <div class="health-summary">
             <h3>Recent Health Summary</h3>
-            <p><strong>Last Updated:</strong> {datetime.now().strftime('%Y-%m-%d')}</p>
+            <p><strong>Last Updated:</strong> {last_updated}</p>
             <ul>
-                <li><strong>Blood Pressure:</strong> 120/80 mmHg (Normal)</li>
-                <li><strong>Heart Rate:</strong> 72 bpm (Normal)</li>
-                <li><strong>Recent Symptoms:</strong> Mild headache (2 days ago)</li>
-                <li><strong>Sleep Quality:</strong> Good (7.5 hours avg)</li>
+                {"".join(items)}
             </ul>
         </div>
         """
-        return HTMLResponse(content=summary)
-    except Exception as e:
-        logger.error(f"Error generating health summary: {e}")
-        return HTMLResponse(content="<p>Unable to load health summary at this time.</p>")
 
 async def get_user_health_data(user_id: str, db: Session) -> Dict[str, Any]:
     """
@@ -305,27 +349,6 @@ def chat_with_health_assistant(chat_message: ChatMessage, session: Session = Dep
     
     return {"response": response}
 
-@router.get("/summary", response_model=Dict[str, str])
-def get_health_summary(session: Session = Depends(get_db)):
-    """Get a summary of the user's health data.
-    
-    This endpoint provides a concise summary of the user's health status.
-    
-    Args:
-        session: Database session
-        
-    Returns:
-        A dictionary with health summary categories
-    """
-    # In a real implementation, this would extract the user_id from the token
-    # For now, we'll return a mock summary
-    return {
-        "general_health": "Your overall health appears to be good based on recent data.",
-        "recent_symptoms": "You've reported mild headaches and occasional fatigue in the past week.",
-        "nutrition": "Your diet has been balanced with adequate protein intake.",
-        "activity": "You've been meeting your exercise goals consistently."
-    }
-
 @router.get("/health-tips/{category}", response_model=List[Dict[str, Any]])
 def get_health_tips(category: str):
     """Get general health tips by category.
@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from .. import crud, schemas, auth
 from ..db import get_db
 from typing import List, Dict, Any
+from collections import Counter
 import pandas as pd
 from ..services import meal_planner
 from ..models import User
@@ -73,12 +74,12 @@ def get_nutrition_summary(user_id: str, days: int = 7, db: Session = Depends(get
             if isinstance(food, dict) and 'name' in food:
                 all_foods.append(food['name'])
     
-    from collections import Counter
     food_counts = Counter(all_foods)
     most_eaten_foods = food_counts.most_common(5)
     
-    # Check for symptoms after meals
-    meals_with_symptoms = [meal for meal in meals if meal.symptoms_after]
+    # Check for symptoms logged in the hours after meals
+    symptoms_after = crud.get_symptoms_after_meals(db, user_id, meals)
+    meals_with_symptoms = [meal for meal in meals if symptoms_after[meal.id]]
     
     summary = {
         "total_meals_logged": len(meals),
@@ -215,22 +216,24 @@ def analyze_food_symptom_correlations(user_id: str, db: Session = Depends(get_db
     
     # Create food-symptom correlation data
     food_symptom_data = {}
+    symptoms_by_meal = crud.get_symptoms_after_meals(db, user_id, meals)
     
     for meal in meals:
-        if meal.symptoms_after:  # Only analyze meals that caused symptoms
-            for food in meal.foods:
-                if isinstance(food, dict) and 'name' in food:
-                    food_name = food['name']
-                    if food_name not in food_symptom_data:
-                        food_symptom_data[food_name] = {
-                            'total_occurrences': 0,
-                            'symptom_occurrences': 0,
-                            'symptoms': []
-                        }
-                    
-                    food_symptom_data[food_name]['total_occurrences'] += 1
+        symptoms_after = symptoms_by_meal[meal.id]
+        for food in meal.foods:
+            if isinstance(food, dict) and 'name' in food:
+                food_name = food['name']
+                if food_name not in food_symptom_data:
+                    food_symptom_data[food_name] = {
+                        'total_occurrences': 0,
+                        'symptom_occurrences': 0,
+                        'symptoms': []
+                    }
+                
+                food_symptom_data[food_name]['total_occurrences'] += 1
+                if symptoms_after:  # Symptoms logged in the hours after the meal
                     food_symptom_data[food_name]['symptom_occurrences'] += 1
-                    food_symptom_data[food_name]['symptoms'].extend(meal.symptoms_after)
+                    food_symptom_data[food_name]['symptoms'].extend(symptoms_after)
     
     # Calculate correlation scores
     correlations = []
@@ -1,16 +1,18 @@
 # app/routes/predictions.py
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Dict, Any, Optional
 
 from .. import crud, schemas
 from ..db import get_db
 from ..services.symptom_predictor import symptom_predictor
+from ..services import training_worker
 
 router = APIRouter(prefix="/predictions", tags=["predictions"])
 
 @router.get("/symptoms/{user_id}/future")
-def predict_future_symptoms(user_id: str, days_ahead: int = 3, db: Session = Depends(get_db)):
+def predict_future_symptoms(user_id: str, days_ahead: int = Query(3, ge=1, le=30), db: Session = Depends(get_db)):
     """Predict future symptoms for a user based on their symptom history"""
     # Validate user exists
     user = crud.get_user(db, user_id)
@@ -69,38 +71,64 @@ def analyze_symptom_patterns(user_id: str, db: Session = Depends(get_db)):
     }
 
 @router.post("/model/train")
-def train_model(background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
-    """Train the symptom prediction model (admin only)"""
+def train_model(full: bool = False, db: Session = Depends(get_db)):
+    """
+    Queue a symptom prediction model training run (admin only). Only symptom
+    logs newer than the current model's watermark are used unless `full` is
+    set. The run is picked up by the training worker process
+    (python -m app.services.training_worker).
+    """
     # This would typically have authentication/authorization
     # For now, we'll just check if we have enough data
-    
-    # Get all users with symptom logs
-    users_with_symptoms = db.query(crud.models.SymptomLog.user_id).distinct().all()
-    user_ids = [user[0] for user in users_with_symptoms]
-    
-    if not user_ids:
+    if db.query(crud.models.SymptomLog.id).first() is None:
         raise HTTPException(
             status_code=400, 
             detail="No users with symptom data found. Cannot train model."
         )
     
-    # Train in background to avoid blocking the API
-    def train_model_task():
-        symptom_predictor.train_model(db, user_ids)
-    
-    background_tasks.add_task(train_model_task)
+    run = training_worker.enqueue_training(db, "full" if full else "incremental")
     
-    return {"message": "Model training started in the background"}
+    return {
+        "message": "Model training queued",
+        "run_id": run.id,
+        "mode": run.mode,
+        "status": run.status,
+        "current_version": symptom_predictor.registry.version if symptom_predictor.load_model() else None
+    }
 
 @router.get("/model/status")
-def get_model_status():
-    """Get the status of the symptom prediction model"""
-    is_loaded = symptom_predictor.is_model_loaded or symptom_predictor.load_model()
+def get_model_status(db: Session = Depends(get_db)):
+    """Get the status of the symptom prediction model and its recent training runs"""
+    artifact = symptom_predictor.registry.current()
+    is_loaded = artifact is not None
     
     return {
         "model_loaded": is_loaded,
-        "model_type": "GRU (Gated Recurrent Unit)",
-        "features": symptom_predictor.SYMPTOM_FEATURES + ["severity"],
+        "model_type": "MLP over daily symptom windows",
+        "features": symptom_predictor.SYMPTOM_FEATURES + ["severity", "logged"],
         "sequence_length": symptom_predictor.SEQUENCE_LENGTH,
-        "can_predict": is_loaded
-    }
\ No newline at end of file
+        "version": symptom_predictor.registry.version,
+        "trained_until": artifact["trained_until"] if is_loaded else None,
+        "can_predict": is_loaded,
+        "training_runs": [
+            {
+                "id": run.id,
+                "mode": run.mode,
+                "status": run.status,
+                "epoch": run.epoch,
+                "epochs": run.epochs,
+                "progress": run.progress,
+                "loss": run.loss,
+                "samples": run.samples,
+                "metrics": json.loads(run.metrics) if run.metrics else None,
+                "model_version": run.model_version,
+                "worker": run.worker,
+                "error": run.error,
+                "requested_at": run.requested_at,
+                "started_at": run.started_at,
+                "heartbeat_at": run.heartbeat_at,
+                "finished_at": run.finished_at
+            }
+            for run in training_worker.get_recent_runs(db, 5)
+        ]
+    }
@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
+from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime, timedelta
@@ -6,6 +7,13 @@ from datetime import datetime, timedelta
 from .. import schemas, crud, models
 from ..db import get_db
 from ..services.progress_tracker import ProgressTracker
+from ..services import progress_series, report_export
+
+# Upper bound on users per bulk analytics request
+MAX_BULK_USERS = 1000
+
+# Longest history a report export may cover (20 years)
+MAX_EXPORT_DAYS = 7300
 
 router = APIRouter(
     prefix="/progress",
@@ -56,6 +64,28 @@ def get_user_progress(user_id: str, days: int = Query(30, ge=1, le=365), db: Ses
         for p in progress_history
     ]
 
+@router.get("/user/{user_id}/series")
+def get_metric_series(
+    user_id: str,
+    metric: str = Query("weight", description="Metric to chart (weight, blood_sugar, blood_pressure_systolic, blood_pressure_diastolic)"),
+    days: int = Query(30, ge=1, le=3650),
+    resolution: str = Query("auto", description="Series resolution (auto, raw, day, week)"),
+    db: Session = Depends(get_db)
+):
+    """Get a downsampled time series of a progress metric for charting"""
+    # Validate user exists
+    user = crud.get_user(db, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    if metric not in progress_series.SERIES_METRICS:
+        raise HTTPException(status_code=400, detail=f"Invalid metric. Must be one of: {', '.join(progress_series.SERIES_METRICS)}")
+
+    if resolution != "auto" and resolution not in progress_series.RESOLUTIONS:
+        raise HTTPException(status_code=400, detail=f"Invalid resolution. Must be one of: auto, {', '.join(progress_series.RESOLUTIONS)}")
+
+    return progress_series.get_metric_series(db, user_id, metric, days, resolution)
+
 @router.get("/user/{user_id}/weight-trend")
 def analyze_weight_trend(user_id: str, days: int = Query(30, ge=1, le=365), db: Session = Depends(get_db)):
     """Analyze weight trends for a user"""
@@ -84,6 +114,28 @@ def analyze_blood_pressure_trend(user_id: str, days: int = Query(30, ge=1, le=36
     # Analyze blood pressure trend
     return tracker.analyze_blood_pressure_trend(user_id, days)
 
+@router.post("/bulk/trends")
+def analyze_trends_bulk(request: schemas.ProgressBulkTrendRequest, db: Session = Depends(get_db)):
+    """Analyze weight and blood pressure trends for many users in one request"""
+    user_ids = list(dict.fromkeys(request.user_ids))  # Drop duplicates, keep order
+    if not user_ids:
+        raise HTTPException(status_code=400, detail="user_ids must not be empty")
+    if len(user_ids) > MAX_BULK_USERS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_USERS} users can be analyzed per request")
+    
+    # Validate users exist
+    known = {row[0] for row in db.query(models.User.id).filter(models.User.id.in_(user_ids)).all()}
+    missing = [user_id for user_id in user_ids if user_id not in known]
+    
+    # Create progress tracker service
+    tracker = ProgressTracker(db)
+    
+    return {
+        "days": request.days,
+        "results": tracker.analyze_trends_bulk([user_id for user_id in user_ids if user_id in known], request.days),
+        "missing_user_ids": missing
+    }
+
 @router.get("/user/{user_id}/goal-progress")
 def track_goal_progress(
     user_id: str, 
@@ -120,4 +172,55 @@ def generate_health_report(user_id: str, db: Session = Depends(get_db)):
     tracker = ProgressTracker(db)
     
     # Generate health report
-    return tracker.generate_health_report(user_id)
\ No newline at end of file
+    return tracker.generate_health_report(user_id)
+
+@router.post("/user/{user_id}/health-report/exports", status_code=202)
+def start_health_report_export(
+    user_id: str,
+    background_tasks: BackgroundTasks,
+    format: str = Query("csv", description="Export format (csv, ndjson, pdf)"),
+    days: int = Query(365, ge=1, le=MAX_EXPORT_DAYS),
+    db: Session = Depends(get_db)
+):
+    """Start a streamed export of a user's full health history"""
+    user = crud.get_user(db, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    if format not in report_export.EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid format. Must be one of: {', '.join(report_export.EXPORT_FORMATS)}"
+        )
+
+    export = report_export.create_export(db, user_id, format, days)
+
+    # Runs after the response is sent, with its own database session
+    background_tasks.add_task(report_export.run_export, export.id)
+
+    return report_export.export_status(export)
+
+def _get_export(db: Session, export_id: str) -> models.ReportExport:
+    export = db.query(models.ReportExport).filter(models.ReportExport.id == export_id).first()
+    if not export:
+        raise HTTPException(status_code=404, detail="Export not found")
+    return export
+
+@router.get("/health-report/exports/{export_id}")
+def get_health_report_export(export_id: str, db: Session = Depends(get_db)):
+    """Get the status of a health report export"""
+    return report_export.export_status(_get_export(db, export_id))
+
+@router.get("/health-report/exports/{export_id}/download")
+def download_health_report_export(export_id: str, db: Session = Depends(get_db)):
+    """Download a completed health report export"""
+    export = _get_export(db, export_id)
+    if export.status != "completed":
+        raise HTTPException(status_code=409, detail=f"Export is {export.status}")
+
+    _, media_type = report_export.EXPORT_FORMATS[export.format]
+    return FileResponse(
+        export.file_path,
+        media_type=media_type,
+        filename=f"health-report-{export.user_id}.{export.format}"
+    )
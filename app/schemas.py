@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 from typing import List, Optional, Dict, Any, Union
 from datetime import datetime
 
@@ -39,10 +39,27 @@ class SymptomLogResponse(BaseModel):
     ai_classification: Optional[str] = None
     needs_medical_attention: bool = False
 
+class MealFoodItem(BaseModel):
+    food_id: Optional[str] = None
+    name: Optional[str] = None
+    grams: Optional[float] = Field(None, ge=0)
+    servings: Optional[float] = Field(None, ge=0)  # of the catalog serving size, default 1
+    # Kept for foods that do not match the catalog
+    calories: Optional[float] = Field(None, ge=0)
+    protein_g: Optional[float] = Field(None, ge=0)
+    carbs_g: Optional[float] = Field(None, ge=0)
+    fat_g: Optional[float] = Field(None, ge=0)
+
+    @model_validator(mode="after")
+    def check_food(self):
+        if not self.food_id and not self.name:
+            raise ValueError("A food needs a food_id or a name")
+        return self
+
 class MealLogCreate(BaseModel):
     user_id: str
     meal_type: str
-    foods: List[dict]  # List of food items with quantities
+    foods: List[MealFoodItem]
     symptoms_after: Optional[List[str]] = []
 
 class MealLogResponse(BaseModel):
@@ -51,8 +68,14 @@ class MealLogResponse(BaseModel):
     meal_type: str
     foods: List[dict]
     total_calories: float
+    protein_grams: Optional[float] = None
+    carbs_grams: Optional[float] = None
+    fat_grams: Optional[float] = None
     timestamp: datetime
-    symptoms_after: List[str]
+    symptoms_after: List[str] = []
+
+    class Config:
+        orm_mode = True
 
 class ProgressCreate(BaseModel):
     user_id: str
@@ -62,6 +85,10 @@ class ProgressCreate(BaseModel):
     blood_pressure_diastolic: Optional[int] = None
     notes: Optional[str] = None
 
+class ProgressBulkTrendRequest(BaseModel):
+    user_ids: List[str]
+    days: int = Field(30, ge=1, le=365)
+
 class HealthAlertResponse(BaseModel):
     id: str
     user_id: str
@@ -71,6 +98,9 @@ class HealthAlertResponse(BaseModel):
     is_read: bool
     created_at: datetime
 
+class AlertBulkReadRequest(BaseModel):
+    alert_ids: List[str]
+
 class MealPlanResponse(BaseModel):
     user_id: str
     daily_calories_target: int
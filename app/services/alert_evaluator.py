@@ -0,0 +1,226 @@
+"""HealthSync Background Alert Evaluator
+
+Periodically runs the alert rules for every user who logged progress or
+symptoms since the previous run, so alerts no longer depend on a client
+calling check-health-status.
+
+Each run starts from the persisted watermark (scanned_until of the last
+completed run in alert_evaluator_runs), splits the changed users into
+batches and evaluates the batches on a thread pool. Every batch uses its own
+session and writes its alerts with a single bulk insert. Run metrics (users,
+alerts, duration, throughput and lag) are stored on the run row.
+
+Every uvicorn worker starts the scheduler, but only one run can be active
+across all processes: the run row takes a lease (a unique column) that is
+released when it finishes. A run that finds the lease taken is skipped. A
+lease whose holder died expires after ALERT_EVALUATOR_LEASE_SECONDS without
+progress and is taken over by the next run.
+
+Configuration:
+    ALERT_EVALUATOR_INTERVAL_SECONDS  seconds between runs, 0 disables the scheduler (default 300)
+    ALERT_EVALUATOR_WORKERS           worker threads per run (default 4)
+    ALERT_EVALUATOR_BATCH_SIZE        users per batch (default 200)
+    ALERT_EVALUATOR_LEASE_SECONDS     lease renewed as batches finish (default 900)
+
+Run a single pass from the command line with:
+    python -m app.services.alert_evaluator
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..db import SessionLocal
+from ..models.progress import Progress
+from ..models.symptom_log import SymptomLog
+from ..models.alert_evaluator_run import AlertEvaluatorRun
+from . import alert_rules
+
+logger = logging.getLogger(__name__)
+
+ALERT_EVALUATOR_INTERVAL_SECONDS = int(os.getenv("ALERT_EVALUATOR_INTERVAL_SECONDS", "300"))
+ALERT_EVALUATOR_WORKERS = int(os.getenv("ALERT_EVALUATOR_WORKERS", "4"))
+ALERT_EVALUATOR_BATCH_SIZE = int(os.getenv("ALERT_EVALUATOR_BATCH_SIZE", "200"))
+ALERT_EVALUATOR_LEASE_SECONDS = int(os.getenv("ALERT_EVALUATOR_LEASE_SECONDS", "900"))
+
+LEASE = "evaluator"
+
+# Rows committed just before a run starts can carry a timestamp slightly
+# older than the watermark, so every scan overlaps the previous one a little.
+# Re-evaluating a user is harmless because open alerts are deduplicated.
+WATERMARK_OVERLAP = timedelta(seconds=60)
+
+
+def get_watermark(db: Session) -> Optional[datetime]:
+    """Get scanned_until of the latest completed run"""
+    run = db.query(AlertEvaluatorRun).filter(
+        AlertEvaluatorRun.status == "completed"
+    ).order_by(AlertEvaluatorRun.scanned_until.desc()).first()
+    return run.scanned_until if run else None
+
+
+def find_changed_users(db: Session, since: datetime, until: datetime) -> Dict[str, datetime]:
+    """Get the users with progress or symptom rows in [since, until), mapped to their oldest new row"""
+    changed: Dict[str, datetime] = {}
+    for model in (Progress, SymptomLog):
+        rows = db.query(model.user_id, func.min(model.timestamp)).filter(
+            model.timestamp >= since,
+            model.timestamp < until
+        ).group_by(model.user_id).all()
+        for user_id, first_seen in rows:
+            if user_id not in changed or first_seen < changed[user_id]:
+                changed[user_id] = first_seen
+    return changed
+
+
+def acquire_lease(db: Session, since: datetime, until: datetime) -> Optional[AlertEvaluatorRun]:
+    """Start a run holding the evaluator lease, or None while another run holds it"""
+    now = datetime.utcnow()
+    # Free the lease of a run whose process stopped renewing it
+    expired = db.query(AlertEvaluatorRun).filter(
+        AlertEvaluatorRun.lease == LEASE,
+        AlertEvaluatorRun.lease_expires_at < now
+    ).update({"lease": None, "status": "failed", "error": "lease expired", "finished_at": now},
+             synchronize_session=False)
+    if expired:
+        logger.warning("Alert evaluator lease expired; taking over")
+    run = AlertEvaluatorRun(status="running", scanned_from=since, scanned_until=until, lease=LEASE,
+                            lease_expires_at=now + timedelta(seconds=ALERT_EVALUATOR_LEASE_SECONDS))
+    db.add(run)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return None
+    return run
+
+
+def _evaluate_batch(user_ids: List[str]) -> Dict[str, Any]:
+    db = SessionLocal()
+    try:
+        result = alert_rules.run_rules_batch(db, user_ids)
+        return {"alerts": len(result["alerts"]), "suppressed": result["suppressed"], "finished_at": datetime.utcnow()}
+    finally:
+        db.close()
+
+
+def run_once(workers: int = ALERT_EVALUATOR_WORKERS,
+             batch_size: int = ALERT_EVALUATOR_BATCH_SIZE) -> Optional[AlertEvaluatorRun]:
+    """
+    Evaluate every user with new data since the watermark and record the
+    run. Returns None when another process holds the evaluator lease.
+    """
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        until = datetime.utcnow()
+        watermark = get_watermark(db)
+        if watermark is None:
+            # Nothing older than the longest rule window can fire an alert
+            since = until - timedelta(days=alert_rules.alert_rule_set.max_window_days)
+        else:
+            since = watermark - WATERMARK_OVERLAP
+
+        run = acquire_lease(db, since, until)
+        if run is None:
+            logger.info("Alert evaluator run skipped: another process is running one")
+            return None
+
+        try:
+            changed = find_changed_users(db, since, until)
+            user_ids = sorted(changed)
+            batches = [user_ids[i:i + batch_size] for i in range(0, len(user_ids), batch_size)]
+
+            lag = 0.0
+            with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+                futures = {pool.submit(_evaluate_batch, batch): batch for batch in batches}
+                for future in as_completed(futures):
+                    batch = futures[future]
+                    try:
+                        result = future.result()
+                    except Exception:
+                        logger.exception("Alert evaluation failed for a batch of %d users", len(batch))
+                        run.failed_batches += 1
+                        continue
+                    run.alerts_created += result["alerts"]
+                    run.duplicates_suppressed += result["suppressed"]
+                    run.users_evaluated += len(batch)
+                    oldest = min(changed[user_id] for user_id in batch)
+                    lag = max(lag, (result["finished_at"] - oldest).total_seconds())
+                    run.lease_expires_at = datetime.utcnow() + timedelta(seconds=ALERT_EVALUATOR_LEASE_SECONDS)
+                    db.commit()
+
+            duration = time.perf_counter() - started
+            run.batches = len(batches)
+            run.duration_seconds = round(duration, 3)
+            run.users_per_second = round(run.users_evaluated / duration, 1) if duration > 0 else None
+            run.lag_seconds = round(lag, 3) if changed else None
+            run.finished_at = datetime.utcnow()
+            # A run with failed batches keeps the old watermark so those users are retried
+            run.status = "failed" if run.failed_batches else "completed"
+            run.lease = None
+            db.commit()
+        except Exception as e:
+            # Release the lease right away instead of waiting for it to expire
+            db.rollback()
+            run.status, run.error, run.lease, run.finished_at = "failed", repr(e), None, datetime.utcnow()
+            db.commit()
+            raise
+        db.refresh(run)
+        logger.info(
+            "Alert evaluator: %d users, %d alerts, %d duplicates suppressed in %.2fs",
+            run.users_evaluated, run.alerts_created, run.duplicates_suppressed, duration
+        )
+        return run
+    finally:
+        db.close()
+
+
+def get_recent_runs(db: Session, limit: int = 20) -> List[AlertEvaluatorRun]:
+    """Get the most recent evaluator runs, newest first"""
+    return db.query(AlertEvaluatorRun).order_by(AlertEvaluatorRun.started_at.desc()).limit(limit).all()
+
+
+_stop_event = threading.Event()
+_thread: Optional[threading.Thread] = None
+
+
+def _loop(interval: int):
+    while not _stop_event.wait(interval):
+        try:
+            run_once()
+        except Exception:
+            logger.exception("Alert evaluator run failed")
+
+
+def start_scheduler(interval: int = ALERT_EVALUATOR_INTERVAL_SECONDS):
+    """Start running the evaluator every `interval` seconds in a daemon thread"""
+    global _thread
+    if interval <= 0 or (_thread is not None and _thread.is_alive()):
+        return
+    _stop_event.clear()
+    _thread = threading.Thread(target=_loop, args=(interval,), name="alert-evaluator", daemon=True)
+    _thread.start()
+
+
+def stop_scheduler():
+    """Stop the scheduler thread after its current run"""
+    _stop_event.set()
+
+
+if __name__ == "__main__":
+    from ..db import Base, engine
+    logging.basicConfig(level=logging.INFO)
+    Base.metadata.create_all(bind=engine)
+    run = run_once()
+    if run is None:
+        raise SystemExit("Another alert evaluator run is in progress")
+    print(f"{run.status}: {run.users_evaluated} users, {run.alerts_created} alerts, "
+          f"{run.users_per_second} users/s, lag {run.lag_seconds}s")
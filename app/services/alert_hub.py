@@ -0,0 +1,260 @@
+"""HealthSync Alert Hub
+
+In-process publish/subscribe hub for health alerts. crud publishes every
+alert it writes and the SSE / WebSocket endpoints in routes/alerts.py
+subscribe per user, so clients are pushed new alerts instead of polling.
+
+Each subscriber has a bounded queue. When a slow consumer lets its queue
+fill up the oldest pending alerts are dropped, and the next delivered event
+carries a "missed" count so the client knows to refetch from the REST API.
+
+Backends decide how published alerts reach the hub of every worker:
+    local   (default) alerts stay in this process
+    broker  alerts are relayed through a small TCP broker so that every
+            worker process sees them; run it with
+            python -m app.services.alert_hub broker
+
+Configuration:
+    ALERT_HUB_BACKEND      local or broker
+    ALERT_HUB_BROKER_URL   host:port of the broker (default 127.0.0.1:7878)
+    ALERT_HUB_QUEUE_SIZE   pending alerts per subscriber (default 100)
+"""
+
+import asyncio
+import json
+import logging
+import os
+import queue
+import socket
+import threading
+import time
+from typing import Dict, Any, Callable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+ALERT_HUB_BACKEND = os.getenv("ALERT_HUB_BACKEND", "local")
+ALERT_HUB_BROKER_URL = os.getenv("ALERT_HUB_BROKER_URL", "127.0.0.1:7878")
+ALERT_HUB_QUEUE_SIZE = int(os.getenv("ALERT_HUB_QUEUE_SIZE", "100"))
+
+# A broker client whose unsent output grows past this is disconnected
+BROKER_CLIENT_BUFFER_LIMIT = 1024 * 1024
+# Alerts waiting for the background sender before publish falls back to local delivery
+BROKER_SEND_QUEUE_SIZE = 10000
+
+
+def alert_event(alert) -> Dict[str, Any]:
+    """Serializable event for an alert ORM object or bulk-inserted row dict"""
+    get = alert.get if isinstance(alert, dict) else lambda key: getattr(alert, key)
+    created_at = get("created_at")
+    return {
+        "id": get("id"),
+        "user_id": get("user_id"),
+        "alert_type": get("alert_type"),
+        "message": get("message"),
+        "severity": get("severity"),
+        "created_at": created_at.isoformat() if created_at else None
+    }
+
+
+class Subscription:
+    """A subscriber's bounded queue, owned by the event loop that created it"""
+
+    def __init__(self, user_id: str, loop: asyncio.AbstractEventLoop, max_queue: int):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.missed = 0
+
+    def _offer(self, event: Dict[str, Any]):
+        # Runs on the subscriber's loop; drop the oldest alert rather than block publishers
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.missed += 1
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """Wait up to `timeout` seconds for the next alert, None on timeout"""
+        try:
+            event = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if self.missed:
+            event = {**event, "missed": self.missed}
+            self.missed = 0
+        return event
+
+
+class AlertHub:
+    """Fans published alerts out to the subscriptions of their user"""
+
+    def __init__(self, backend, max_queue: int = ALERT_HUB_QUEUE_SIZE):
+        self.max_queue = max_queue
+        self._subscriptions: Dict[str, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+        self.backend = backend
+        backend.attach(self.dispatch)
+
+    def subscribe(self, user_id: str) -> Subscription:
+        """Subscribe to a user's alerts; must be called from a running event loop"""
+        subscription = Subscription(user_id, asyncio.get_running_loop(), self.max_queue)
+        with self._lock:
+            self._subscriptions.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+
+    def publish(self, event: Dict[str, Any]):
+        """Publish an alert event; safe to call from any thread"""
+        try:
+            self.backend.publish(event)
+        except Exception:
+            # Pushing is best effort, clients can always fall back to polling
+            logger.exception("Failed to publish alert %s", event.get("id"))
+
+    def dispatch(self, event: Dict[str, Any]):
+        """Deliver an event to this process' subscribers (called by the backend)"""
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(event.get("user_id"), ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._offer, event)
+            except RuntimeError:
+                # The subscriber's loop is closed
+                self.unsubscribe(subscription)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(s) for s in self._subscriptions.values())
+
+
+class LocalBackend:
+    """Deliver alerts to subscribers in this process only"""
+
+    def attach(self, dispatch: Callable[[Dict[str, Any]], None]):
+        self.dispatch = dispatch
+
+    def publish(self, event: Dict[str, Any]):
+        self.dispatch(event)
+
+
+class BrokerBackend:
+    """
+    Relay alerts through the TCP broker as JSON lines. The broker echoes
+    every line to all connected workers, including the sender, and this
+    backend dispatches what it receives. While the broker is unreachable,
+    alerts are dispatched locally and the connection is retried.
+
+    publish() only queues the alert; a background thread does the socket
+    writes, so a slow broker never blocks the request that created an alert.
+    """
+
+    def __init__(self, url: str = ALERT_HUB_BROKER_URL, reconnect_delay: float = 2.0,
+                 max_pending: int = BROKER_SEND_QUEUE_SIZE):
+        host, port = url.rsplit(":", 1)
+        self.address = (host, int(port))
+        self.reconnect_delay = reconnect_delay
+        self._sock: Optional[socket.socket] = None
+        self._send_lock = threading.Lock()
+        self._pending: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_pending)
+
+    def attach(self, dispatch: Callable[[Dict[str, Any]], None]):
+        self.dispatch = dispatch
+        threading.Thread(target=self._read_loop, name="alert-hub-broker", daemon=True).start()
+        threading.Thread(target=self._send_loop, name="alert-hub-sender", daemon=True).start()
+
+    def publish(self, event: Dict[str, Any]):
+        if self._sock is not None:
+            try:
+                self._pending.put_nowait(event)
+                return
+            except queue.Full:
+                logger.warning("Alert broker send queue is full; delivering alert %s locally", event.get("id"))
+        self.dispatch(event)
+
+    def _send_loop(self):
+        while True:
+            event = self._pending.get()
+            with self._send_lock:
+                sock = self._sock
+                if sock is not None:
+                    try:
+                        sock.sendall((json.dumps(event) + "\n").encode())
+                        continue
+                    except OSError:
+                        self._sock = None
+            self.dispatch(event)
+
+    def _read_loop(self):
+        while True:
+            try:
+                sock = socket.create_connection(self.address)
+            except OSError:
+                time.sleep(self.reconnect_delay)
+                continue
+            self._sock = sock
+            try:
+                for line in sock.makefile("rb"):
+                    try:
+                        self.dispatch(json.loads(line))
+                    except ValueError:
+                        logger.warning("Ignoring malformed alert from broker")
+            except OSError:
+                pass
+            finally:
+                with self._send_lock:
+                    if self._sock is sock:
+                        self._sock = None
+                sock.close()
+            time.sleep(self.reconnect_delay)
+
+
+async def run_broker(host: str = "127.0.0.1", port: int = 7878):
+    """Relay every line received from a worker to all connected workers"""
+    clients: Set[asyncio.StreamWriter] = set()
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        clients.add(writer)
+        try:
+            async for line in reader:
+                for client in list(clients):
+                    if client.transport.get_write_buffer_size() > BROKER_CLIENT_BUFFER_LIMIT:
+                        # The worker is not reading; drop it instead of buffering forever
+                        clients.discard(client)
+                        client.close()
+                        continue
+                    client.write(line)
+        finally:
+            clients.discard(writer)
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    logger.info("Alert broker listening on %s:%d", host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def create_backend(name: str = ALERT_HUB_BACKEND):
+    if name == "broker":
+        return BrokerBackend()
+    if name == "local":
+        return LocalBackend()
+    raise ValueError(f"Unknown alert hub backend: {name}")
+
+
+# Process-wide hub instance
+alert_hub = AlertHub(create_backend())
+
+
+if __name__ == "__main__":
+    import sys
+    logging.basicConfig(level=logging.INFO)
+    if sys.argv[1:2] != ["broker"]:
+        sys.exit("usage: python -m app.services.alert_hub broker [host:port]")
+    host, port = (sys.argv[2] if len(sys.argv) > 2 else ALERT_HUB_BROKER_URL).rsplit(":", 1)
+    asyncio.run(run_broker(host, int(port)))
@@ -0,0 +1,326 @@
+"""HealthSync Alert Rules
+
+Health alerts are declared as data (see DEFAULT_RULES) and compiled once
+into an AlertRuleSet. Evaluating a user loads each data source once for the
+longest window any rule needs, computes every aggregate as a NumPy reduction
+over all metrics at once, and compares all rule thresholds in one pass.
+
+Every alert carries a fingerprint of (user, rule). A rule does not fire again
+while an unread alert with the same fingerprint is open, and all new alerts
+of an evaluation are written with a single bulk insert. A partial unique
+index on the open fingerprints (uq_health_alerts_open_fingerprint) rejects
+an alert another writer opened between the dedup read and the insert; the
+batch is then rolled back and deduplicated again.
+
+Alerts with "critical" severity are also emailed to the user (see
+email_outbox.enqueue_critical_alerts); of the defaults, hypertensive_crisis
+and low_blood_sugar are critical. A rules file without critical rules sends
+no alert emails.
+
+Set ALERT_RULES_FILE to a JSON list of rules to replace the defaults.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .. import crud
+from ..models.health_alert import HealthAlert
+from ..models.symptom_log import SymptomLog
+from . import progress_analytics
+
+DEFAULT_RULES = [
+    {
+        "name": "severe_symptoms",
+        "source": "symptoms",
+        "metric": "severity",
+        "aggregate": "max",
+        "window_days": 3,
+        "operator": ">=",
+        "threshold": 8,
+        "severity": "high",
+        "message": "Severe symptoms detected in the last 3 days. Please consult a healthcare provider."
+    },
+    {
+        "name": "weight_change",
+        "source": "progress",
+        "metric": "weight_kg",
+        "aggregate": "mean_abs_change",
+        "window_days": 7,
+        "operator": ">",
+        "threshold": 2,
+        "severity": "medium",
+        "message": "Significant weight change detected ({value:.1f}kg average). Monitor your health."
+    },
+    {
+        "name": "high_blood_pressure",
+        "source": "progress",
+        "metric": "blood_pressure_systolic",
+        "aggregate": "latest",
+        "window_days": 7,
+        "operator": ">",
+        "threshold": 140,
+        "severity": "medium",
+        "message": "High blood pressure detected ({blood_pressure_systolic:.0f}/{blood_pressure_diastolic:.0f}). "
+                   "Consider lifestyle changes."
+    },
+    {
+        "name": "high_blood_sugar",
+        "source": "progress",
+        "metric": "blood_sugar",
+        "aggregate": "latest",
+        "window_days": 7,
+        "operator": ">",
+        "threshold": 140,
+        "severity": "medium",
+        "message": "High blood sugar detected ({value} mg/dL). Monitor your diet and consult a doctor."
+    },
+    {
+        "name": "hypertensive_crisis",
+        "source": "progress",
+        "metric": "blood_pressure_systolic",
+        "aggregate": "latest",
+        "window_days": 7,
+        "operator": ">=",
+        "threshold": 180,
+        "severity": "critical",
+        "message": "Very high blood pressure detected ({blood_pressure_systolic:.0f}/{blood_pressure_diastolic:.0f}). "
+                   "Seek medical care right away."
+    },
+    {
+        "name": "low_blood_sugar",
+        "source": "progress",
+        "metric": "blood_sugar",
+        "aggregate": "latest",
+        "window_days": 7,
+        "operator": "<",
+        "threshold": 54,
+        "severity": "critical",
+        "message": "Very low blood sugar detected ({value} mg/dL). Take fast-acting sugar and seek medical care."
+    }
+]
+
+# Dedup and insert rounds before a batch that keeps conflicting is given up
+INSERT_ATTEMPTS = 3
+
+# Metric rows available from each data source
+SOURCE_COLUMNS = {
+    "progress": progress_analytics.METRIC_COLUMNS,
+    "symptoms": ["severity"]
+}
+
+OPERATORS = {
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "<": np.less,
+    "<=": np.less_equal,
+    "==": np.equal
+}
+
+
+def _latest(values: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    if values.shape[1] == 0:
+        return np.full(values.shape[0], np.nan)
+    last = np.where(mask, np.arange(values.shape[1]), -1).max(axis=1)
+    latest = values[np.arange(values.shape[0]), np.maximum(last, 0)]
+    return np.where(last >= 0, latest, np.nan)
+
+
+def _mean_abs_change(values: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    # Move each row's recorded samples to the front (in time order) and
+    # average the absolute differences between consecutive recorded samples
+    order = np.argsort(~mask, axis=1, kind="stable")
+    compact = np.take_along_axis(values, order, axis=1)
+    counts = mask.sum(axis=1)
+    steps = np.abs(np.diff(compact, axis=1))
+    valid = np.arange(steps.shape[1]) < (counts - 1)[:, None]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 1, np.where(valid, steps, 0.0).sum(axis=1) / (counts - 1), np.nan)
+
+
+def _reduce(ufunc):
+    def aggregate(values: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        filled = np.where(mask, values, np.nan)
+        with np.errstate(invalid="ignore"):
+            return np.where(mask.any(axis=1), ufunc.reduce(filled, axis=1), np.nan)
+    return aggregate
+
+
+def _mean(values: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    counts = mask.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, np.where(mask, values, 0.0).sum(axis=1) / counts, np.nan)
+
+
+# Aggregates reduce a (metrics x samples) window to one value per metric
+AGGREGATES = {
+    "latest": _latest,
+    "max": _reduce(np.fmax),
+    "min": _reduce(np.fmin),
+    "mean": _mean,
+    "count": lambda values, mask: mask.sum(axis=1).astype(float),
+    "mean_abs_change": _mean_abs_change
+}
+
+
+class CompiledRule:
+    """A validated alert rule with its lookups resolved"""
+
+    def __init__(self, spec: Dict[str, Any]):
+        self.name = spec["name"]
+        self.source = spec["source"]
+        self.metric = spec["metric"]
+        self.aggregate = spec["aggregate"]
+        self.window_days = spec["window_days"]
+        self.operator = spec["operator"]
+        self.threshold = float(spec["threshold"])
+        self.severity = spec.get("severity", "medium")
+        self.message = spec["message"]
+
+        if self.source not in SOURCE_COLUMNS:
+            raise ValueError(f"Rule {self.name}: unknown source {self.source}")
+        if self.metric not in SOURCE_COLUMNS[self.source]:
+            raise ValueError(f"Rule {self.name}: unknown metric {self.metric} for source {self.source}")
+        if self.aggregate not in AGGREGATES:
+            raise ValueError(f"Rule {self.name}: unknown aggregate {self.aggregate}")
+        if self.operator not in OPERATORS:
+            raise ValueError(f"Rule {self.name}: unknown operator {self.operator}")
+
+        self.row = SOURCE_COLUMNS[self.source].index(self.metric)
+        self.key = (self.source, self.window_days, self.aggregate)
+
+    def fingerprint(self, user_id: str) -> str:
+        """Identifies alerts raised by this rule (and threshold) for a user"""
+        raw = f"{user_id}|{self.name}|{self.metric}|{self.operator}|{self.threshold:g}"
+        return hashlib.sha1(raw.encode()).hexdigest()[:20]
+
+
+class AlertRuleSet:
+    """A compiled set of alert rules that is evaluated as a whole"""
+
+    def __init__(self, rules: List[Dict[str, Any]]):
+        self.rules = [CompiledRule(spec) for spec in rules]
+        names = [rule.name for rule in self.rules]
+        if len(set(names)) != len(names):
+            raise ValueError("Alert rule names must be unique")
+
+        self.thresholds = np.array([rule.threshold for rule in self.rules])
+        self.operator_groups = {
+            op: np.array([i for i, rule in enumerate(self.rules) if rule.operator == op])
+            for op in {rule.operator for rule in self.rules}
+        }
+        # Distinct (source, window, aggregate) reductions, each computed once per evaluation
+        self.reductions = sorted({rule.key for rule in self.rules})
+        self.reduction_index = [self.reductions.index(rule.key) for rule in self.rules]
+        self.source_days = {}
+        for rule in self.rules:
+            self.source_days[rule.source] = max(self.source_days.get(rule.source, 0), rule.window_days)
+        self.max_window_days = max(self.source_days.values(), default=0)
+
+    def _load(self, db: Session, source: str, user_id: str, days: int) -> Tuple[np.ndarray, np.ndarray]:
+        if source == "progress":
+            timestamps, values = progress_analytics.load_progress_arrays(db, user_id, days)
+            return timestamps, progress_analytics.mask_incomplete_blood_pressure(values)
+
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        rows = db.query(SymptomLog.timestamp, SymptomLog.severity).filter(
+            SymptomLog.user_id == user_id,
+            SymptomLog.timestamp >= cutoff
+        ).order_by(SymptomLog.timestamp).all()
+        timestamps = np.array([r[0] for r in rows], dtype="datetime64[us]")
+        return timestamps, np.array([[r[1] for r in rows]], dtype=float).reshape(1, len(rows))
+
+    def evaluate(self, db: Session, user_id: str, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Get an alert for every rule that fires for the user (without deduplication)"""
+        now = np.datetime64(now or datetime.utcnow(), "us")
+        data = {source: self._load(db, source, user_id, days) for source, days in self.source_days.items()}
+
+        reduced = []
+        latest = {}
+        for source, window_days, aggregate in self.reductions:
+            timestamps, values = data[source]
+            in_window = timestamps >= now - np.timedelta64(int(window_days * 86400e6), "us")
+            window = values[:, in_window]
+            if window.shape[1] == 0:
+                reduced.append(np.full(window.shape[0], np.nan))
+            else:
+                reduced.append(AGGREGATES[aggregate](window, ~np.isnan(window)))
+            if source not in latest:
+                latest[source] = dict(zip(SOURCE_COLUMNS[source], _latest(values, ~np.isnan(values))))
+
+        observed = np.array([reduced[k][rule.row] for k, rule in zip(self.reduction_index, self.rules)])
+        fired = np.zeros(len(self.rules), dtype=bool)
+        for op, idx in self.operator_groups.items():
+            # NaN (no data in the window) never compares true
+            fired[idx] = OPERATORS[op](observed[idx], self.thresholds[idx])
+
+        alerts = []
+        for i in np.flatnonzero(fired):
+            rule = self.rules[i]
+            alerts.append({
+                "user_id": user_id,
+                "alert_type": rule.name,
+                "severity": rule.severity,
+                "message": rule.message.format(value=float(observed[i]), **latest[rule.source]),
+                "fingerprint": rule.fingerprint(user_id)
+            })
+        return alerts
+
+
+def open_fingerprints(db: Session, fingerprints: List[str]) -> set:
+    """Get the fingerprints that already have an unread alert"""
+    if not fingerprints:
+        return set()
+    rows = db.query(HealthAlert.fingerprint).filter(
+        HealthAlert.fingerprint.in_(fingerprints),
+        HealthAlert.is_read == False
+    ).all()
+    return {r[0] for r in rows}
+
+
+def run_rules_batch(db: Session, user_ids: List[str], rule_set: Optional[AlertRuleSet] = None) -> Dict[str, Any]:
+    """
+    Evaluate the rules for several users and store the alerts that are not
+    already open, with one dedup query and one bulk insert for the batch.
+    Returns the new alert rows and the number of suppressed duplicates.
+    """
+    rule_set = rule_set or alert_rule_set
+    candidates = [alert for user_id in user_ids for alert in rule_set.evaluate(db, user_id)]
+    for attempt in range(INSERT_ATTEMPTS):
+        already_open = open_fingerprints(db, [a["fingerprint"] for a in candidates])
+        new_alerts = [a for a in candidates if a["fingerprint"] not in already_open]
+        try:
+            alerts = crud.create_health_alerts(db, new_alerts)
+            break
+        except IntegrityError:
+            # Another writer opened one of these alerts after the dedup read
+            db.rollback()
+            if attempt == INSERT_ATTEMPTS - 1:
+                raise
+    return {
+        "alerts": alerts,
+        "suppressed": len(candidates) - len(new_alerts)
+    }
+
+
+def run_rules(db: Session, user_id: str, rule_set: Optional[AlertRuleSet] = None) -> Dict[str, Any]:
+    """Evaluate the rules for a single user, see run_rules_batch"""
+    return run_rules_batch(db, [user_id], rule_set)
+
+
+def load_rules() -> List[Dict[str, Any]]:
+    """Get the rule definitions from ALERT_RULES_FILE, or the defaults"""
+    path = os.getenv("ALERT_RULES_FILE")
+    if not path:
+        return DEFAULT_RULES
+    with open(path) as f:
+        return json.load(f)
+
+
+# Compiled once per process
+alert_rule_set = AlertRuleSet(load_rules())
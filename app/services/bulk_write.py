@@ -0,0 +1,33 @@
+"""HealthSync Bulk Writes
+
+Writes column lists of plain Python values to a table without building ORM
+objects: PostgreSQL COPY in CSV format, or a driver executemany of INSERT on
+other databases (SQLite), WRITE_BATCH rows per call. Used by the catalog
+import and the synthetic data generator.
+"""
+
+import csv
+import io
+from typing import List
+
+# Rows per COPY/executemany call
+WRITE_BATCH = 20000
+
+
+def write_rows(connection, table: str, columns: List[str], values: List[list], batch: int = WRITE_BATCH) -> int:
+    """Write column lists to a table with COPY on PostgreSQL, executemany elsewhere"""
+    rows = list(zip(*values))
+    quoted = ", ".join(f'"{column}"' for column in columns)
+    if connection.dialect.name == "postgresql":
+        cursor = connection.connection.cursor()
+        for i in range(0, len(rows), batch):
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(rows[i:i + batch])
+            buffer.seek(0)
+            cursor.copy_expert(f"COPY {table} ({quoted}) FROM STDIN WITH (FORMAT csv)", buffer)
+    else:
+        marker = "%s" if connection.dialect.paramstyle in ("format", "pyformat") else "?"
+        sql = f"INSERT INTO {table} ({quoted}) VALUES ({', '.join([marker] * len(columns))})"
+        for i in range(0, len(rows), batch):
+            connection.exec_driver_sql(sql, rows[i:i + batch])
+    return len(rows)
@@ -0,0 +1,316 @@
+"""HealthSync Email Outbox
+
+Outbound email is written to the email_outbox table (in the same transaction
+as whatever triggered it) and delivered by an async worker:
+
+- due rows are claimed in batches and leased, so a crashed worker's rows are
+  picked up again once the lease expires
+- one SMTP connection is kept open and reused across messages and batches
+- each recipient domain is rate limited with a token bucket
+- failed sends are retried with exponential backoff until MAX_ATTEMPTS
+
+Configuration (SMTP settings are shared with the rest of the app):
+    MAIL_SERVER, MAIL_PORT, MAIL_USERNAME, MAIL_PASSWORD, MAIL_FROM, MAIL_FROM_NAME
+    MAIL_STARTTLS / MAIL_SSL_TLS      "true" or "false" (default true / false)
+    EMAIL_OUTBOX_ENABLED              run the worker in the app (default: when MAIL_SERVER is set)
+    EMAIL_OUTBOX_BATCH_SIZE           rows claimed per batch (default 50)
+    EMAIL_DOMAIN_RATE_PER_MINUTE      sends per recipient domain per minute (default 60)
+
+Run the worker on its own with:
+    python -m app.services.email_outbox
+"""
+
+import asyncio
+import html
+import logging
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from email.utils import formataddr
+from typing import Dict, Any, List, Optional, Tuple
+import aiosmtplib
+from dotenv import load_dotenv
+from sqlalchemy.orm import Session
+
+from ..db import SessionLocal
+from ..models.email_outbox import EmailOutbox
+from ..models.user import User
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+EMAIL_OUTBOX_ENABLED = os.getenv("EMAIL_OUTBOX_ENABLED", "true" if os.getenv("MAIL_SERVER") else "false") == "true"
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "50"))
+EMAIL_DOMAIN_RATE_PER_MINUTE = int(os.getenv("EMAIL_DOMAIN_RATE_PER_MINUTE", "60"))
+
+POLL_INTERVAL_SECONDS = 5
+LEASE = timedelta(minutes=5)
+MAX_ATTEMPTS = 6
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 3600
+
+
+def smtp_settings_from_env() -> Dict[str, Any]:
+    return {
+        "hostname": os.getenv("MAIL_SERVER"),
+        "port": int(os.getenv("MAIL_PORT", 587)),
+        "username": os.getenv("MAIL_USERNAME"),
+        "password": os.getenv("MAIL_PASSWORD"),
+        "sender": os.getenv("MAIL_FROM"),
+        "sender_name": os.getenv("MAIL_FROM_NAME", "HealthSync"),
+        "start_tls": os.getenv("MAIL_STARTTLS", "true") == "true",
+        "use_tls": os.getenv("MAIL_SSL_TLS", "false") == "true"
+    }
+
+
+def enqueue_email(db: Session, recipient: str, subject: str, body: str,
+                  subtype: str = "html", kind: Optional[str] = None) -> EmailOutbox:
+    """Queue an email; it is sent once the caller commits"""
+    email = EmailOutbox(
+        recipient=recipient,
+        domain=recipient.rsplit("@", 1)[-1].lower(),
+        subject=subject,
+        body=body,
+        subtype=subtype,
+        kind=kind,
+        status="pending",
+        attempts=0,
+        next_attempt_at=datetime.utcnow()
+    )
+    db.add(email)
+    return email
+
+
+def enqueue_critical_alerts(db: Session, alerts: List[Dict[str, Any]]) -> int:
+    """Queue a notification email for every critical alert, looking up recipients in one query"""
+    critical = [a for a in alerts if a.get("severity") == "critical"]
+    if not critical:
+        return 0
+    users = db.query(User.id, User.email, User.username).filter(
+        User.id.in_({a["user_id"] for a in critical})
+    ).all()
+    recipients = {user_id: (email, username) for user_id, email, username in users}
+
+    queued = 0
+    for alert in critical:
+        if alert["user_id"] not in recipients:
+            continue
+        email, username = recipients[alert["user_id"]]
+        enqueue_email(
+            db, email,
+            subject="HealthSync: critical health alert",
+            body=f"""
+        <html>
+            <body>
+                <h2>Critical health alert</h2>
+                <p>Hi {html.escape(username)},</p>
+                <p>{html.escape(alert["message"])}</p>
+                <p>Please review your alerts in HealthSync and contact a healthcare provider if needed.</p>
+                <p>Best regards,<br>The HealthSync Team</p>
+            </body>
+        </html>
+        """,
+            kind="critical_alert"
+        )
+        queued += 1
+    return queued
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff with 10% jitter after the given number of failed attempts"""
+    delay = min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+    return delay * (1 + random.random() * 0.1)
+
+
+class DomainRateLimiter:
+    """Token bucket per recipient domain"""
+
+    def __init__(self, per_minute: int = EMAIL_DOMAIN_RATE_PER_MINUTE):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+
+    def acquire(self, domain: str, now: Optional[float] = None) -> float:
+        """Take a token; returns 0 on success or the seconds until one is available"""
+        now = time.monotonic() if now is None else now
+        tokens, last = self._buckets.get(domain, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - last) * self.rate)
+        if tokens >= 1:
+            self._buckets[domain] = (tokens - 1, now)
+            return 0.0
+        self._buckets[domain] = (tokens, now)
+        return (1 - tokens) / self.rate
+
+
+class OutboxWorker:
+    """Delivers due outbox rows over a reused SMTP connection"""
+
+    def __init__(self, smtp_settings: Optional[Dict[str, Any]] = None, batch_size: int = EMAIL_OUTBOX_BATCH_SIZE,
+                 rate_limiter: Optional[DomainRateLimiter] = None, session_factory=SessionLocal):
+        self.settings = smtp_settings or smtp_settings_from_env()
+        self.batch_size = batch_size
+        self.rate_limiter = rate_limiter or DomainRateLimiter()
+        self.session_factory = session_factory
+        self._smtp: Optional[aiosmtplib.SMTP] = None
+
+    def _claim(self) -> List[Dict[str, Any]]:
+        db = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            rows = db.query(EmailOutbox).filter(
+                EmailOutbox.status.in_(["pending", "sending"]),
+                EmailOutbox.next_attempt_at <= now
+            ).order_by(EmailOutbox.next_attempt_at).limit(self.batch_size).with_for_update(skip_locked=True).all()
+            claimed = []
+            for row in rows:
+                row.status = "sending"
+                row.next_attempt_at = now + LEASE
+                claimed.append({
+                    "id": row.id, "recipient": row.recipient, "domain": row.domain, "subject": row.subject,
+                    "body": row.body, "subtype": row.subtype, "attempts": row.attempts or 0
+                })
+            db.commit()
+            return claimed
+        finally:
+            db.close()
+
+    def _record(self, updates: List[Dict[str, Any]]):
+        if not updates:
+            return
+        db = self.session_factory()
+        try:
+            db.bulk_update_mappings(EmailOutbox, updates)
+            db.commit()
+        finally:
+            db.close()
+
+    async def _connection(self) -> aiosmtplib.SMTP:
+        if self._smtp is not None and self._smtp.is_connected:
+            try:
+                await self._smtp.noop()
+                return self._smtp
+            except aiosmtplib.SMTPException:
+                await self.close()
+        smtp = aiosmtplib.SMTP(
+            hostname=self.settings["hostname"],
+            port=self.settings["port"],
+            use_tls=self.settings["use_tls"],
+            start_tls=self.settings["start_tls"]
+        )
+        await smtp.connect()
+        if self.settings.get("username"):
+            await smtp.login(self.settings["username"], self.settings["password"])
+        self._smtp = smtp
+        return smtp
+
+    async def close(self):
+        if self._smtp is not None:
+            try:
+                await self._smtp.quit()
+            except aiosmtplib.SMTPException:
+                self._smtp.close()
+            self._smtp = None
+
+    def _build_message(self, row: Dict[str, Any]) -> EmailMessage:
+        message = EmailMessage()
+        message["From"] = formataddr((self.settings.get("sender_name") or "", self.settings["sender"]))
+        message["To"] = row["recipient"]
+        message["Subject"] = row["subject"]
+        message.set_content(row["body"], subtype=row["subtype"] or "plain")
+        return message
+
+    async def process_batch(self) -> int:
+        """Claim and send one batch of due emails. Returns the number of rows claimed."""
+        rows = await asyncio.to_thread(self._claim)
+        if not rows:
+            return 0
+
+        now = datetime.utcnow()
+        updates = []
+        try:
+            for row in rows:
+                updates.append(await self._deliver(row, now))
+        finally:
+            # Record what was done even if the batch is interrupted, so delivered rows are not sent again
+            await asyncio.to_thread(self._record, updates)
+        return len(rows)
+
+    async def _deliver(self, row: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+        """Send one claimed row and return its outbox update"""
+        wait = self.rate_limiter.acquire(row["domain"])
+        if wait:
+            # Over the domain's rate: hand the row back without counting an attempt
+            return {"id": row["id"], "status": "pending", "next_attempt_at": now + timedelta(seconds=wait)}
+        attempts = row["attempts"] + 1
+        try:
+            message = self._build_message(row)
+        except Exception as e:
+            # Bad content or sender settings; retrying the same row cannot succeed
+            logger.exception("Cannot build email %s", row["id"])
+            return {"id": row["id"], "status": "failed", "attempts": attempts, "last_error": f"invalid message: {e}"}
+        try:
+            smtp = await self._connection()
+            await smtp.send_message(message)
+        except Exception as e:
+            if not isinstance(e, aiosmtplib.SMTPException) or isinstance(
+                    e, (aiosmtplib.SMTPServerDisconnected, aiosmtplib.SMTPConnectError)):
+                await self.close()
+            if not isinstance(e, (aiosmtplib.SMTPException, OSError)):
+                logger.exception("Unexpected error sending email %s", row["id"])
+            return {
+                "id": row["id"],
+                "status": "failed" if attempts >= MAX_ATTEMPTS else "pending",
+                "attempts": attempts,
+                "last_error": str(e),
+                "next_attempt_at": now + timedelta(seconds=retry_delay(attempts))
+            }
+        return {"id": row["id"], "status": "sent", "attempts": attempts, "sent_at": datetime.utcnow(), "last_error": None}
+
+    async def run(self, stop: asyncio.Event, poll_interval: float = POLL_INTERVAL_SECONDS):
+        """Deliver batches until `stop` is set, polling when the outbox is empty"""
+        try:
+            while not stop.is_set():
+                try:
+                    claimed = await self.process_batch()
+                except Exception:
+                    logger.exception("Email outbox batch failed")
+                    claimed = 0
+                if claimed < self.batch_size:
+                    try:
+                        await asyncio.wait_for(stop.wait(), poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            await self.close()
+
+
+_stop: Optional[asyncio.Event] = None
+_task: Optional[asyncio.Task] = None
+
+
+def start_worker():
+    """Start the outbox worker on the running event loop (app startup)"""
+    global _stop, _task
+    if not EMAIL_OUTBOX_ENABLED or _task is not None:
+        return
+    _stop = asyncio.Event()
+    _task = asyncio.get_running_loop().create_task(OutboxWorker().run(_stop))
+
+
+async def stop_worker():
+    global _stop, _task
+    if _task is None:
+        return
+    _stop.set()
+    await _task
+    _stop = _task = None
+
+
+if __name__ == "__main__":
+    from ..db import Base, engine
+    logging.basicConfig(level=logging.INFO)
+    Base.metadata.create_all(bind=engine)
+    asyncio.run(OutboxWorker().run(asyncio.Event()))
@@ -1,30 +1,28 @@
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig
+import asyncio
+import html
 from pydantic import EmailStr
-from typing import List
-import os
-from dotenv import load_dotenv
+from ..db import SessionLocal
+from .email_outbox import enqueue_email
 
-load_dotenv()
+# Emails are queued in the outbox and delivered by the outbox worker
+# (see email_outbox.py), which reuses SMTP connections and retries failures.
 
-conf = ConnectionConfig(
-    MAIL_USERNAME=os.getenv('MAIL_USERNAME'),
-    MAIL_PASSWORD=os.getenv('MAIL_PASSWORD'),
-    MAIL_FROM=os.getenv('MAIL_FROM'),
-    MAIL_PORT=int(os.getenv('MAIL_PORT', 587)),
-    MAIL_SERVER=os.getenv('MAIL_SERVER'),
-    MAIL_FROM_NAME=os.getenv('MAIL_FROM_NAME', 'HealthSync'),
-    MAIL_STARTTLS=True,
-    MAIL_SSL_TLS=False,
-    USE_CREDENTIALS=True
-)
-
-fastmail = FastMail(conf)
+def _queue(email: str, subject: str, body: str, kind: str):
+    # Blocking database write; the async senders run it in a worker thread
+    db = SessionLocal()
+    try:
+        enqueue_email(db, email, subject, body, subtype="html", kind=kind)
+        db.commit()
+    finally:
+        db.close()
 
 async def send_welcome_email(email: EmailStr, username: str):
-    message = MessageSchema(
-        subject='Welcome to HealthSync!',
-        recipients=[email],
-        body=f"""
+    username, email_text = html.escape(username), html.escape(email)
+    await asyncio.to_thread(
+        _queue,
+        email,
+        'Welcome to HealthSync!',
+        f"""
         <html>
             <body>
                 <h2>Welcome to HealthSync, {username}!</h2>
@@ -32,7 +30,7 @@ async def send_welcome_email(email: EmailStr, username: str):
                 <p>Your login credentials:</p>
                 <ul>
                     <li>Username: {username}</li>
-                    <li>Email: {email}</li>
+                    <li>Email: {email_text}</li>
                 </ul>
                 <p>You can now log in to access all features of HealthSync:</p>
                 <ul>
@@ -46,16 +44,15 @@ async def send_welcome_email(email: EmailStr, username: str):
             </body>
         </html>
         """,
-        subtype='html'
+        kind='welcome'
     )
-    
-    await fastmail.send_message(message)
 
 async def send_password_reset_email(email: EmailStr, reset_token: str):
-    message = MessageSchema(
-        subject='Reset Your HealthSync Password',
-        recipients=[email],
-        body=f"""
+    await asyncio.to_thread(
+        _queue,
+        email,
+        'Reset Your HealthSync Password',
+        f"""
         <html>
             <body>
                 <h2>Password Reset Request</h2>
@@ -67,7 +64,5 @@ async def send_password_reset_email(email: EmailStr, reset_token: str):
             </body>
         </html>
         """,
-        subtype='html'
-    )
-    
-    await fastmail.send_message(message)
\ No newline at end of file
+        kind='password_reset'
+    )
\ No newline at end of file
@@ -0,0 +1,251 @@
+"""HealthSync Food Catalog Import
+
+Loads food catalog files (CSV or Parquet, with the columns of
+data/food_sample.csv) into food_items.
+
+Files are streamed in chunks of CATALOG_CHUNK_ROWS rows, so a catalog of
+millions of rows is never held in memory or turned into ORM objects. Each
+chunk is cleaned column-wise with pandas and upserted in one transaction on
+the natural key (name, serving_g):
+    - PostgreSQL: COPY into a temporary staging table, then one
+      INSERT ... SELECT ... ON CONFLICT DO UPDATE
+    - other databases (SQLite): a driver executemany of
+      INSERT ... ON CONFLICT DO UPDATE
+Importing the same file twice leaves the catalog unchanged; a row whose key
+already exists updates its nutrition values and tags. Within a file the last
+row for a key wins. Rows without a name, serving size or calories are
+skipped. On PostgreSQL the upsert returns whether each row was inserted
+(xmax = 0), so imports report inserted and updated rows; elsewhere only the
+rows written are known and both are None.
+
+Reading Parquet needs pyarrow.
+
+Upserting needs the unique (name, serving_g) key of the FoodItem model.
+create_all does not add it to an existing table, and older versions of
+scripts/load_food.py created food_items with pandas to_sql, without an id
+column or the key. Imports check the table first and stop with a message
+pointing to --migrate, which keeps one row per key (and the existing ids)
+and recreates the table from the model.
+
+Configuration:
+    CATALOG_CHUNK_ROWS   rows read and written per transaction (default 50000)
+
+Run from the command line with:
+    python -m app.services.food_catalog data/food_sample.csv [--chunk-rows 50000]
+    python -m app.services.food_catalog --migrate
+"""
+
+import os
+import time
+import uuid
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+import pandas as pd
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+from ..models.food_item import FoodItem
+from .bulk_write import write_rows
+
+CATALOG_CHUNK_ROWS = int(os.getenv("CATALOG_CHUNK_ROWS", "50000"))
+
+KEY_COLUMNS = ["name", "serving_g"]
+VALUE_COLUMNS = ["calories_per_100g", "protein_g_per_100g", "fat_g_per_100g", "carbs_g_per_100g", "tags"]
+COLUMNS = ["id"] + KEY_COLUMNS + VALUE_COLUMNS
+NUTRIENT_COLUMNS = VALUE_COLUMNS[:-1]
+
+STAGING_TABLE = "food_items_import"
+LEGACY_TABLE = "food_items_legacy"
+
+
+def read_chunks(path: str, chunk_rows: int = CATALOG_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Yield the rows of a CSV or Parquet catalog file as DataFrames of up to chunk_rows rows"""
+    if path.lower().endswith((".parquet", ".pq")):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Reading Parquet catalogs needs pyarrow (pip install pyarrow)")
+        parquet = pq.ParquetFile(path)
+        columns = [c for c in KEY_COLUMNS + VALUE_COLUMNS if c in parquet.schema_arrow.names]
+        for batch in parquet.iter_batches(batch_size=chunk_rows, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_rows, dtype={"name": str, "tags": str},
+                               usecols=lambda column: column in KEY_COLUMNS + VALUE_COLUMNS)
+
+
+def clean_chunk(df: pd.DataFrame) -> Tuple[pd.DataFrame, int]:
+    """
+    Normalize a chunk to the food_items columns, drop unusable rows and
+    duplicate keys (keeping the last). Returns the rows and how many were
+    skipped.
+    """
+    missing = [c for c in KEY_COLUMNS + ["calories_per_100g"] if c not in df.columns]
+    if missing:
+        raise ValueError(f"Catalog file is missing columns: {', '.join(missing)}")
+    rows = len(df)
+    out = pd.DataFrame({"name": df["name"].astype("string").str.strip()})
+    out["serving_g"] = pd.to_numeric(df["serving_g"], errors="coerce").round()
+    for column in NUTRIENT_COLUMNS:
+        out[column] = pd.to_numeric(df[column], errors="coerce") if column in df.columns else None
+    out["tags"] = df["tags"].fillna("").astype(str).str.strip() if "tags" in df.columns else ""
+    out = out[out["name"].fillna("").str.len().gt(0) & out["serving_g"].notna() & out["calories_per_100g"].notna()]
+    out = out.drop_duplicates(KEY_COLUMNS, keep="last")
+    out["serving_g"] = out["serving_g"].astype(int)
+    return out, rows - len(out)
+
+
+def _values(df: pd.DataFrame) -> List[list]:
+    """Column lists of plain Python values (None for missing) in COLUMNS order"""
+    values = [[str(uuid.uuid4()) for _ in range(len(df))]]
+    for column in COLUMNS[1:]:
+        series = df[column].astype(object)
+        values.append(series.where(series.notna(), None).tolist())
+    return values
+
+
+def _upsert_sql(source: str) -> str:
+    columns = ", ".join(COLUMNS)
+    updates = ", ".join(f"{column} = excluded.{column}" for column in VALUE_COLUMNS)
+    return f"INSERT INTO {FoodItem.__tablename__} ({columns}) {source} ON CONFLICT ({', '.join(KEY_COLUMNS)}) DO UPDATE SET {updates}"
+
+
+def upsert_chunk(connection, df: pd.DataFrame) -> Tuple[int, Optional[int]]:
+    """
+    Upsert cleaned rows on (name, serving_g) inside the caller's transaction.
+    Returns the rows written and, on PostgreSQL, how many were new.
+    """
+    if df.empty:
+        return 0, 0
+    values = _values(df)
+    if connection.dialect.name == "postgresql":
+        connection.exec_driver_sql(
+            f"CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} "
+            f"(LIKE {FoodItem.__tablename__} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+        )
+        write_rows(connection, STAGING_TABLE, COLUMNS, values)
+        # xmax is 0 for a row this statement inserted and set for one it updated
+        result = connection.exec_driver_sql(
+            _upsert_sql(f"SELECT {', '.join(COLUMNS)} FROM {STAGING_TABLE}") + " RETURNING (xmax = 0)"
+        )
+        return len(df), sum(1 for (inserted,) in result if inserted)
+    marker = "%s" if connection.dialect.paramstyle in ("format", "pyformat") else "?"
+    sql = _upsert_sql(f"VALUES ({', '.join([marker] * len(COLUMNS))})")
+    connection.exec_driver_sql(sql, list(zip(*values)))
+    return len(df), None
+
+
+def has_catalog_key(connection) -> bool:
+    """Whether food_items is missing or has the id column and the unique (name, serving_g) key"""
+    inspector = inspect(connection)
+    table = FoodItem.__tablename__
+    if not inspector.has_table(table):
+        return True
+    if "id" not in {column["name"] for column in inspector.get_columns(table)}:
+        return False
+    unique = [c["column_names"] for c in inspector.get_unique_constraints(table)]
+    unique += [i["column_names"] for i in inspector.get_indexes(table) if i["unique"]]
+    return any(sorted(columns) == sorted(KEY_COLUMNS) for columns in unique)
+
+
+def check_table(connection):
+    """Fail with instructions when food_items cannot be upserted on (name, serving_g)"""
+    if not has_catalog_key(connection):
+        raise RuntimeError(
+            f"{FoodItem.__tablename__} has no id column or no unique (name, serving_g) key, so catalog rows "
+            f"cannot be upserted. It was probably created by an older scripts/load_food.py. Run "
+            f"'python -m app.services.food_catalog --migrate' to remove duplicate foods and recreate the table."
+        )
+
+
+def migrate_table(engine: Engine) -> Dict[str, Any]:
+    """
+    Recreate a food_items table that lacks the catalog key from the FoodItem
+    model, in one transaction. One row per (name, serving_g) is kept, with
+    its id when the old table has one; unusable rows are dropped.
+    """
+    table = FoodItem.__tablename__
+    with engine.begin() as connection:
+        if has_catalog_key(connection):
+            return {"migrated": False}
+        old_columns = {column["name"] for column in inspect(connection).get_columns(table)}
+        before = _count(connection)
+        connection.exec_driver_sql(f"CREATE TABLE {LEGACY_TABLE} AS SELECT * FROM {table}")
+        connection.exec_driver_sql(f"DROP TABLE {table}")
+        FoodItem.__table__.create(connection)
+
+        if "id" in old_columns:
+            new_id = "CAST(id AS TEXT)"
+        elif connection.dialect.name == "postgresql":
+            new_id = "CAST(gen_random_uuid() AS TEXT)"
+        else:
+            new_id = "lower(hex(randomblob(16)))"
+        values = [column if column in old_columns else "NULL" for column in VALUE_COLUMNS]
+        connection.exec_driver_sql(
+            f"INSERT INTO {table} ({', '.join(COLUMNS)}) "
+            f"SELECT {new_id}, TRIM(name), CAST(ROUND(serving_g) AS INTEGER), {', '.join(values)} FROM {LEGACY_TABLE} "
+            f"WHERE TRIM(name) <> '' AND serving_g IS NOT NULL AND calories_per_100g IS NOT NULL "
+            f"ON CONFLICT ({', '.join(KEY_COLUMNS)}) DO NOTHING"
+        )
+        after = _count(connection)
+        connection.exec_driver_sql(f"DROP TABLE {LEGACY_TABLE}")
+    return {"migrated": True, "rows_before": before, "rows_after": after, "removed": before - after}
+
+
+def _count(connection) -> int:
+    return connection.execute(text(f"SELECT count(*) FROM {FoodItem.__tablename__}")).scalar()
+
+
+def import_frames(engine: Engine, frames, report=None) -> Dict[str, Any]:
+    """
+    Upsert DataFrames chunk by chunk, one transaction each. Returns rows
+    written, inserted and updated (None when the database cannot tell),
+    skipped, and rows per second.
+    """
+    started = time.perf_counter()
+    with engine.connect() as connection:
+        check_table(connection)
+    written = skipped = 0
+    inserted: Optional[int] = 0
+    for df in frames:
+        cleaned, dropped = clean_chunk(df)
+        with engine.begin() as connection:
+            rows, new = upsert_chunk(connection, cleaned)
+        written += rows
+        inserted = None if inserted is None or new is None else inserted + new
+        skipped += dropped
+        if report is not None:
+            report(f"{written} rows, {time.perf_counter() - started:.1f}s")
+
+    elapsed = time.perf_counter() - started
+    return {
+        "rows": written,
+        "inserted": inserted,
+        "updated": written - inserted if inserted is not None else None,
+        "skipped": skipped,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(written / elapsed) if elapsed > 0 else None
+    }
+
+
+def import_catalog(engine: Engine, path: str, chunk_rows: int = CATALOG_CHUNK_ROWS, report=None) -> Dict[str, Any]:
+    """Stream a CSV or Parquet catalog file into food_items"""
+    return import_frames(engine, read_chunks(path, chunk_rows), report=report)
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    from ..db import Base, engine
+
+    parser = argparse.ArgumentParser(description="Import a food catalog (CSV or Parquet) into food_items")
+    parser.add_argument("path", nargs="?", default=os.path.join("data", "food_sample.csv"))
+    parser.add_argument("--chunk-rows", type=int, default=CATALOG_CHUNK_ROWS)
+    parser.add_argument("--migrate", action="store_true", help="recreate a food_items table without the catalog key")
+    args = parser.parse_args()
+
+    if args.migrate:
+        print(json.dumps(migrate_table(engine), indent=2))
+        raise SystemExit(0)
+    Base.metadata.create_all(bind=engine)
+    result = import_catalog(engine, args.path, args.chunk_rows, report=print)
+    print(json.dumps(result, indent=2))
@@ -0,0 +1,249 @@
+"""HealthSync Food Search
+
+In-memory fuzzy search over the food catalog, used for autocomplete and to
+resolve the free-text food names of a logged meal to catalog rows.
+
+Names are normalized (lowercase, punctuation to spaces) and split into
+trigrams, padded like pg_trgm so word starts weigh more ("  ch", " chi").
+An inverted index maps every trigram to the sorted catalog positions that
+contain it, all postings in one int32 array. A query counts shared trigrams
+per item with one np.bincount over the postings of its trigrams, keeps
+items sharing at least FOOD_SEARCH_MIN_COVERAGE of the query's trigrams
+and ranks them by
+
+    0.7 * shared / query trigrams + 0.3 * shared / union of trigrams
+
+so names containing the whole query rank first and, among those, the
+closest in length. Autocomplete leaves the end of the query unpadded, so a
+partly typed word matches as a prefix. On a 100k item catalog a query
+takes under a millisecond at p99 (scripts/bench_food_search.py).
+
+The index is built once per process from food_items, on first use, and
+rebuilt after FOOD_INDEX_REFRESH_SECONDS, or right away when this process
+changes the catalog (invalidate()). Rebuilds run in a background thread
+with their own session; requests keep using the old index until the new
+one is swapped in.
+
+Meal logging (crud.create_meal_log) resolves each food by "food_id" or
+"name" and computes calories and macros from the catalog per 100 g, for
+"grams" eaten or "servings" (default 1) of the catalog serving size. Names
+scoring below FOOD_MATCH_MIN_SCORE are kept as sent, with whatever
+calories and macros the client gave.
+
+Configuration:
+    FOOD_INDEX_REFRESH_SECONDS   rebuild the index at most this old (default 300)
+    FOOD_MATCH_MIN_SCORE         lowest score that resolves a meal item (default 0.6)
+    FOOD_SEARCH_MIN_COVERAGE     share of query trigrams a search result must contain (default 0.5)
+"""
+
+import logging
+import math
+import os
+import re
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..db import SessionLocal
+from ..models.food_item import FoodItem
+
+logger = logging.getLogger(__name__)
+
+FOOD_INDEX_REFRESH_SECONDS = float(os.getenv("FOOD_INDEX_REFRESH_SECONDS", "300"))
+FOOD_MATCH_MIN_SCORE = float(os.getenv("FOOD_MATCH_MIN_SCORE", "0.6"))
+FOOD_SEARCH_MIN_COVERAGE = float(os.getenv("FOOD_SEARCH_MIN_COVERAGE", "0.5"))
+
+COVERAGE_WEIGHT = 0.7
+NUTRIENTS = ["calories", "protein_g", "fat_g", "carbs_g"]
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(name: str) -> str:
+    return _NON_ALNUM.sub(" ", (name or "").lower()).strip()
+
+
+def trigrams(name: str, prefix: bool = False) -> List[str]:
+    """Distinct padded trigrams of a name; prefix=True leaves the last word open"""
+    words = normalize(name).split()
+    grams = []
+    for i, word in enumerate(words):
+        padded = f"  {word}" if prefix and i == len(words) - 1 else f"  {word} "
+        grams.extend(padded[j:j + 3] for j in range(len(padded) - 2))
+    return list(dict.fromkeys(grams))
+
+
+class FoodSearchIndex:
+    """Trigram inverted index over catalog rows"""
+
+    def __init__(self, rows):
+        """rows: (id, name, serving_g, calories, protein, fat, carbs per 100 g)"""
+        rows = list(rows)
+        self.ids = [row[0] for row in rows]
+        self.names = [row[1] for row in rows]
+        self.serving_g = np.array([row[2] or 100 for row in rows], dtype=np.float64)
+        self.per_100g = np.array([[value or 0.0 for value in row[3:7]] for row in rows], dtype=np.float64).reshape(-1, 4)
+        self.position = {food_id: i for i, food_id in enumerate(self.ids)}
+
+        gram_ids: Dict[str, int] = {}
+        item_grams = [[gram_ids.setdefault(gram, len(gram_ids)) for gram in trigrams(name)] for name in self.names]
+        self.gram_counts = np.array([len(grams) for grams in item_grams], dtype=np.float64)
+        gram = np.fromiter((g for grams in item_grams for g in grams), dtype=np.int32, count=int(self.gram_counts.sum()))
+        item = np.repeat(np.arange(len(rows), dtype=np.int32), self.gram_counts.astype(np.int64))
+        order = np.argsort(gram, kind="stable")
+        self.postings = item[order]
+        bounds = np.searchsorted(gram[order], np.arange(len(gram_ids) + 1))
+        self.slices = {g: (bounds[i], bounds[i + 1]) for g, i in gram_ids.items()}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def search(self, query: str, limit: int = 10, prefix: bool = True,
+               min_coverage: float = FOOD_SEARCH_MIN_COVERAGE) -> List[Tuple[int, float]]:
+        """Best matches as (catalog position, score), best first"""
+        query_grams = trigrams(query, prefix)
+        n_query = len(query_grams)
+        grams = [self.slices[g] for g in query_grams if g in self.slices]
+        if not grams or limit <= 0:
+            return []
+        shared = np.bincount(np.concatenate([self.postings[a:b] for a, b in grams]), minlength=len(self))
+        candidates = np.flatnonzero(shared >= max(1, math.ceil(min_coverage * n_query)))
+        hits = shared[candidates]
+        scores = COVERAGE_WEIGHT * hits / n_query + (1 - COVERAGE_WEIGHT) * hits / (n_query + self.gram_counts[candidates] - hits)
+        if len(candidates) > limit:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            candidates, scores = candidates[top], scores[top]
+        order = np.lexsort((self.gram_counts[candidates], -scores))
+        return [(int(candidates[i]), round(float(scores[i]), 4)) for i in order]
+
+    def resolve(self, name: str, min_score: float = FOOD_MATCH_MIN_SCORE) -> Optional[Tuple[int, float]]:
+        """The catalog position and score of the best match for a whole name, if good enough"""
+        # The score is at most the coverage, so lower coverage cannot reach min_score
+        matches = self.search(name, limit=1, prefix=False, min_coverage=min_score)
+        if matches and matches[0][1] >= min_score:
+            return matches[0]
+        return None
+
+    def describe(self, position: int, score: Optional[float] = None) -> Dict[str, Any]:
+        item = {
+            "id": self.ids[position],
+            "name": self.names[position],
+            "serving_g": float(self.serving_g[position]),
+            **{f"{nutrient}_per_100g": float(value) for nutrient, value in zip(NUTRIENTS, self.per_100g[position])}
+        }
+        if score is not None:
+            item["score"] = score
+        return item
+
+    def nutrition(self, position: int, grams: float) -> Dict[str, float]:
+        values = self.per_100g[position] * grams / 100
+        return {nutrient: round(float(value), 1) for nutrient, value in zip(NUTRIENTS, values)}
+
+
+def _quantity(food: Dict[str, Any], serving_g: float) -> float:
+    if food.get("grams") is not None:
+        return float(food["grams"])
+    return float(food.get("servings") or 1) * serving_g
+
+
+def resolve_meal_items(index: Optional[FoodSearchIndex], foods: List[Dict[str, Any]],
+                       min_score: float = FOOD_MATCH_MIN_SCORE) -> Tuple[List[Dict[str, Any]], Dict[str, float]]:
+    """
+    Match logged foods to the catalog and compute their calories and macros.
+    Returns the items to store and the meal totals.
+    """
+    items = []
+    for food in foods:
+        position, score = None, None
+        if index is not None:
+            if food.get("food_id") in index.position:
+                position, score = index.position[food["food_id"]], 1.0
+            elif food.get("name"):
+                position, score = index.resolve(food["name"], min_score) or (None, None)
+        if position is None:
+            items.append({**food, "food_id": None})
+            continue
+        grams = _quantity(food, index.serving_g[position])
+        item = {"name": index.names[position], "food_id": index.ids[position], "grams": round(grams, 1),
+                **index.nutrition(position, grams), "match_score": score}
+        if food.get("name") and food["name"] != item["name"]:
+            item["logged_name"] = food["name"]
+        items.append(item)
+    totals = {nutrient: round(sum(float(item.get(nutrient) or 0) for item in items), 1) for nutrient in NUTRIENTS}
+    return items, totals
+
+
+class FoodSearch:
+    """Process-wide food index, rebuilt from the database when stale"""
+
+    def __init__(self, refresh_seconds: float = FOOD_INDEX_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._index: Optional[FoodSearchIndex] = None
+        self._built_at = 0.0
+        self._generation = 0
+        self._rebuilding = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _load(db: Session) -> FoodSearchIndex:
+        rows = db.execute(select(
+            FoodItem.id, FoodItem.name, FoodItem.serving_g, FoodItem.calories_per_100g,
+            FoodItem.protein_g_per_100g, FoodItem.fat_g_per_100g, FoodItem.carbs_g_per_100g
+        )).all()
+        return FoodSearchIndex(rows)
+
+    def _swap(self, index: FoodSearchIndex, generation: int):
+        self._index = index
+        # A catalog change during the build leaves the new index stale
+        self._built_at = time.monotonic() if generation == self._generation else float("-inf")
+
+    def current(self, db: Session) -> FoodSearchIndex:
+        index = self._index
+        if index is None:
+            # Nothing to serve yet, so the first build blocks
+            with self._lock:
+                if self._index is None:
+                    generation = self._generation
+                    self._swap(self._load(db), generation)
+            return self._index
+        if time.monotonic() - self._built_at >= self.refresh_seconds:
+            self._start_rebuild()
+        return index
+
+    def _start_rebuild(self):
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+        threading.Thread(target=self._rebuild, name="food-search-rebuild", daemon=True).start()
+
+    def _rebuild(self):
+        try:
+            generation = self._generation
+            db = SessionLocal()
+            try:
+                index = self._load(db)
+            finally:
+                db.close()
+            with self._lock:
+                self._swap(index, generation)
+        except Exception:
+            logger.exception("Rebuilding the food search index failed")
+        finally:
+            self._rebuilding = False
+
+    def invalidate(self):
+        """Rebuild on next use (the catalog changed)"""
+        self._generation += 1
+        self._built_at = float("-inf")
+
+    def search(self, db: Session, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        index = self.current(db)
+        return [index.describe(position, score) for position, score in index.search(query, limit)]
+
+
+# Process-wide index
+food_search = FoodSearch()
@@ -0,0 +1,165 @@
+"""HealthSync Goal Forecasting
+
+Estimates time-to-goal for weight, blood sugar and blood pressure with a
+robust (Theil-Sen) linear trend and Sen's confidence interval for the
+slope. Goal progress results are cached per (user, goal_type, target) and
+only recomputed when the user's progress watermark (row count and latest
+timestamp) changes, or on the next day so the forecast window keeps moving.
+"""
+
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Dict, Any, Optional, Tuple
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..models.progress import Progress
+from .progress_analytics import to_days
+
+# Two-sided 95% normal quantile used for Sen's slope interval
+Z_95 = 1.96
+
+# Pairwise slopes grow quadratically, so only the most recent points are used
+MAX_FORECAST_POINTS = 400
+
+
+def theil_sen(t: np.ndarray, y: np.ndarray) -> Tuple[float, float, float, float]:
+    """
+    Fit y = intercept + slope * t robustly.
+    Returns (slope, intercept, slope_low, slope_high) with a ~95% interval.
+    """
+    i, j = np.triu_indices(len(t), k=1)
+    dt = t[j] - t[i]
+    valid = dt != 0
+    slopes = np.sort((y[j][valid] - y[i][valid]) / dt[valid])
+    if len(slopes) == 0:
+        return 0.0, float(np.median(y)), 0.0, 0.0
+
+    slope = float(np.median(slopes))
+    intercept = float(np.median(y - slope * t))
+
+    # Sen (1968): ranks of the interval bounds among the ordered pairwise slopes
+    n, n_slopes = len(t), len(slopes)
+    c = Z_95 * np.sqrt(n * (n - 1) * (2 * n + 5) / 18.0)
+    lower_rank = int(np.clip(np.floor((n_slopes - c) / 2), 0, n_slopes - 1))
+    upper_rank = int(np.clip(np.ceil((n_slopes + c) / 2), 0, n_slopes - 1))
+    return slope, intercept, float(slopes[lower_rank]), float(slopes[upper_rank])
+
+
+def _days_until(remaining: float, slope: float) -> Optional[float]:
+    """Days needed to cover `remaining` at `slope` per day, None if moving away"""
+    if slope == 0 or np.sign(slope) != np.sign(remaining):
+        return None
+    return remaining / slope
+
+
+def forecast_time_to_goal(timestamps: np.ndarray, values: np.ndarray, target: float,
+                          now: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Forecast when a metric will reach `target` from its recorded samples.
+    `timestamps` and `values` must only contain recorded (non-NaN) samples.
+    """
+    if len(values) < 3:
+        return {
+            "status": "insufficient_data",
+            "message": "Need at least three measurements to forecast"
+        }
+
+    timestamps, values = timestamps[-MAX_FORECAST_POINTS:], values[-MAX_FORECAST_POINTS:]
+    now = now or datetime.utcnow()
+    origin = to_days(timestamps[:1])[0]
+    t = to_days(timestamps) - origin
+    t_now = to_days(np.array([now], dtype="datetime64[us]"))[0] - origin
+
+    slope, intercept, slope_low, slope_high = theil_sen(t, values)
+    projected_now = intercept + slope * t_now
+    remaining = target - projected_now
+
+    forecast = {
+        "status": "success",
+        "method": "theil_sen",
+        "data_points": int(len(values)),
+        "slope_per_week": round(slope * 7, 3),
+        "slope_per_week_ci": [round(slope_low * 7, 3), round(slope_high * 7, 3)],
+        "projected_current_value": round(float(projected_now), 2),
+        "on_track": False,
+        "estimated_days_to_goal": None,
+        "estimated_goal_date": None,
+        "days_to_goal_range": None
+    }
+
+    # At the goal, or the trend crossed it after the first reading and has
+    # moved past it in the direction of the slope since
+    crossed = slope != 0 and 0 < (target - intercept) / slope <= t_now
+    if abs(remaining) < 1e-9 or crossed:
+        forecast.update({"on_track": True, "estimated_days_to_goal": 0,
+                         "estimated_goal_date": now.date().isoformat()})
+        return forecast
+
+    days = _days_until(remaining, slope)
+    if days is None:
+        return forecast
+
+    forecast.update({
+        "on_track": True,
+        "estimated_days_to_goal": int(np.ceil(days)),
+        "estimated_goal_date": (now + timedelta(days=float(days))).date().isoformat()
+    })
+
+    # The interval only bounds the ETA when both slope bounds move toward the goal
+    bounds = [_days_until(remaining, s) for s in (slope_low, slope_high)]
+    if all(b is not None for b in bounds):
+        forecast["days_to_goal_range"] = [int(np.ceil(min(bounds))), int(np.ceil(max(bounds)))]
+    return forecast
+
+
+class ForecastCache:
+    """
+    Bounded LRU cache of goal progress results keyed by
+    (user_id, goal_type, target). Each entry remembers the progress watermark
+    it was computed from and is ignored once the watermark moves.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str, float], Tuple[tuple, Dict[str, Any]]]" = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def watermark(db: Session, user_id: str) -> tuple:
+        """Cheap fingerprint of a user's progress rows plus the current day"""
+        count, latest = db.query(func.count(Progress.id), func.max(Progress.timestamp)).filter(
+            Progress.user_id == user_id
+        ).one()
+        return count, latest, datetime.utcnow().date()
+
+    def get(self, key: Tuple[str, str, float], watermark: tuple) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != watermark:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Tuple[str, str, float], watermark: tuple, result: Dict[str, Any]):
+        with self._lock:
+            self._entries[key] = (watermark, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: str):
+        """Drop every cached forecast for a user"""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == user_id]:
+                del self._entries[key]
+
+
+# Process-wide cache instance
+forecast_cache = ForecastCache()
@@ -0,0 +1,284 @@
+"""HealthSync Daily Rollups
+
+Maintains materialized per-user daily health totals (nutrition, symptoms,
+latest vitals and alerts). The ``record_*`` functions are called from the
+crud write paths before they commit, so a rollup is always updated in the
+same transaction as the row it summarizes.
+
+A day's row is created or locked with one INSERT ... ON CONFLICT DO UPDATE
+on (user_id, day), so concurrent writers for the same user and day neither
+fail on the unique index nor overwrite each other's increments: the second
+writer waits for the first to commit and then reads its totals.
+
+rebuild_user_rollups recomputes a user's rollups from the raw meal, symptom,
+progress and alert rows, e.g. for data written before rollups existed or
+loaded in bulk without them.
+
+Rebuild rollups from the command line with:
+    python -m app.services.health_rollups USER_ID [USER_ID ...]
+    python -m app.services.health_rollups --all
+"""
+
+from datetime import datetime, date, timedelta
+from typing import Dict, Any, Optional, List
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from ..models.daily_rollup import DailyHealthRollup, new_id
+from ..models.health_alert import HealthAlert
+from ..models.meal_log import MealLog
+from ..models.progress import Progress
+from ..models.symptom_log import SymptomLog
+
+SEVERITY_BANDS = ("mild", "moderate", "severe")
+
+
+def severity_band(severity: Optional[int]) -> str:
+    """Map a 1-10 severity score to mild / moderate / severe"""
+    if severity is None or severity <= 3:
+        return "mild"
+    if severity <= 7:
+        return "moderate"
+    return "severe"
+
+
+def _get_or_create_rollup(db: Session, user_id: str, day: date) -> DailyHealthRollup:
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    now = datetime.utcnow()
+    upsert = dialect.insert(DailyHealthRollup).values(
+        id=new_id(),
+        user_id=user_id,
+        day=day,
+        meal_count=0,
+        calories=0.0,
+        protein_g=0.0,
+        carbs_g=0.0,
+        fat_g=0.0,
+        symptom_log_count=0,
+        symptom_class_counts={},
+        symptom_severity_counts={},
+        alert_count=0,
+        alert_severity_counts={},
+        updated_at=now
+    )
+    # Updating an existing row locks it until commit, so the read below sees
+    # the latest committed totals
+    db.execute(upsert.on_conflict_do_update(index_elements=["user_id", "day"], set_={"updated_at": now}))
+    # A row this transaction already changed comes from the session with
+    # its unflushed changes
+    return db.query(DailyHealthRollup).filter(
+        DailyHealthRollup.user_id == user_id,
+        DailyHealthRollup.day == day
+    ).one()
+
+
+def _increment(counts: Optional[Dict[str, int]], key: str) -> Dict[str, int]:
+    # JSON columns are not mutation-tracked, so always assign a new dict
+    updated = dict(counts or {})
+    updated[key] = updated.get(key, 0) + 1
+    return updated
+
+
+def _add_meal(rollup: DailyHealthRollup, calories, protein_g, carbs_g, fat_g):
+    rollup.meal_count += 1
+    rollup.calories += calories or 0.0
+    rollup.protein_g += protein_g or 0.0
+    rollup.carbs_g += carbs_g or 0.0
+    rollup.fat_g += fat_g or 0.0
+
+
+def _add_symptom(rollup: DailyHealthRollup, classification: Optional[str], severity: Optional[int]):
+    rollup.symptom_log_count += 1
+    rollup.symptom_class_counts = _increment(rollup.symptom_class_counts, classification or "unknown")
+    rollup.symptom_severity_counts = _increment(rollup.symptom_severity_counts, severity_band(severity))
+
+
+def _set_vitals(rollup: DailyHealthRollup, progress, timestamp: datetime):
+    # Entries can be back-dated, so only overwrite vitals with newer readings
+    if rollup.vitals_recorded_at is None or timestamp >= rollup.vitals_recorded_at:
+        if progress.weight_kg is not None:
+            rollup.weight_kg = progress.weight_kg
+        if progress.blood_sugar is not None:
+            rollup.blood_sugar = progress.blood_sugar
+        if progress.blood_pressure_systolic is not None:
+            rollup.blood_pressure_systolic = progress.blood_pressure_systolic
+            rollup.blood_pressure_diastolic = progress.blood_pressure_diastolic
+        rollup.vitals_recorded_at = timestamp
+
+
+def _add_alert(rollup: DailyHealthRollup, severity: Optional[str]):
+    rollup.alert_count += 1
+    rollup.alert_severity_counts = _increment(rollup.alert_severity_counts, severity or "medium")
+
+
+def record_meal(db: Session, user_id: str, timestamp: Optional[datetime], calories: float = 0.0,
+                protein_g: float = 0.0, carbs_g: float = 0.0, fat_g: float = 0.0) -> DailyHealthRollup:
+    """Add a logged meal to the user's daily rollup"""
+    day = (timestamp or datetime.utcnow()).date()
+    rollup = _get_or_create_rollup(db, user_id, day)
+    _add_meal(rollup, calories, protein_g, carbs_g, fat_g)
+    return rollup
+
+
+def record_symptom(db: Session, user_id: str, timestamp: Optional[datetime],
+                   classification: Optional[str], severity: Optional[int]) -> DailyHealthRollup:
+    """Add a symptom log to the user's daily rollup"""
+    day = (timestamp or datetime.utcnow()).date()
+    rollup = _get_or_create_rollup(db, user_id, day)
+    _add_symptom(rollup, classification, severity)
+    return rollup
+
+
+def record_progress(db: Session, progress) -> DailyHealthRollup:
+    """Store the latest vitals of a progress entry in the user's daily rollup"""
+    timestamp = progress.timestamp or datetime.utcnow()
+    rollup = _get_or_create_rollup(db, progress.user_id, timestamp.date())
+    _set_vitals(rollup, progress, timestamp)
+    return rollup
+
+
+def record_alert(db: Session, user_id: str, timestamp: Optional[datetime], severity: Optional[str]) -> DailyHealthRollup:
+    """Add a health alert to the user's daily rollup"""
+    day = (timestamp or datetime.utcnow()).date()
+    rollup = _get_or_create_rollup(db, user_id, day)
+    _add_alert(rollup, severity)
+    return rollup
+
+
+def _classification(notes: Optional[str]) -> Optional[str]:
+    # crud.create_symptom_log stores the classifier output in the notes
+    if notes and "AI Classification:" in notes:
+        return notes.split("AI Classification:")[1].strip()
+    return None
+
+
+def rebuild_user_rollups(db: Session, user_id: str, chunk_size: int = 1000) -> int:
+    """
+    Recompute a user's daily rollups from their meal, symptom, progress and
+    alert rows. Returns the number of rollups written.
+    """
+    db.query(DailyHealthRollup).filter(DailyHealthRollup.user_id == user_id).delete(synchronize_session=False)
+
+    rollups: Dict[date, DailyHealthRollup] = {}
+
+    def rollup_for(timestamp: Optional[datetime]) -> DailyHealthRollup:
+        day = (timestamp or datetime.utcnow()).date()
+        rollup = rollups.get(day)
+        if rollup is None:
+            rollup = DailyHealthRollup(
+                user_id=user_id, day=day, meal_count=0, calories=0.0, protein_g=0.0, carbs_g=0.0, fat_g=0.0,
+                symptom_log_count=0, symptom_class_counts={}, symptom_severity_counts={},
+                alert_count=0, alert_severity_counts={}
+            )
+            rollups[day] = rollup
+        return rollup
+
+    for meal in db.query(MealLog).filter(MealLog.user_id == user_id).yield_per(chunk_size):
+        _add_meal(rollup_for(meal.timestamp), meal.calories, meal.protein_grams, meal.carbs_grams, meal.fat_grams)
+    for log in db.query(SymptomLog).filter(SymptomLog.user_id == user_id).yield_per(chunk_size):
+        _add_symptom(rollup_for(log.timestamp), _classification(log.notes), log.severity)
+    progress_rows = db.query(Progress).filter(Progress.user_id == user_id).order_by(Progress.timestamp)
+    for progress in progress_rows.yield_per(chunk_size):
+        timestamp = progress.timestamp or datetime.utcnow()
+        _set_vitals(rollup_for(timestamp), progress, timestamp)
+    alerts = db.query(HealthAlert.created_at, HealthAlert.severity).filter(HealthAlert.user_id == user_id)
+    for created_at, severity in alerts.yield_per(chunk_size):
+        _add_alert(rollup_for(created_at), severity)
+
+    db.add_all(rollups.values())
+    db.commit()
+    return len(rollups)
+
+
+def get_user_rollups(db: Session, user_id: str, days: int = 30) -> List[DailyHealthRollup]:
+    """Get a user's rollups for the last `days` days, newest first"""
+    cutoff = datetime.utcnow().date() - timedelta(days=days - 1)
+    return db.query(DailyHealthRollup).filter(
+        DailyHealthRollup.user_id == user_id,
+        DailyHealthRollup.day >= cutoff
+    ).order_by(DailyHealthRollup.day.desc()).all()
+
+
+def build_health_summary(db: Session, user_id: str, days: int = 7) -> Dict[str, Any]:
+    """
+    Build a health summary for the last `days` days from the user's rollups.
+    Vitals are looked up over a 30 day window so that infrequent measurements
+    still show up; everything comes from a single indexed range read.
+    """
+    rollups = get_user_rollups(db, user_id, days=max(days, 30))
+    cutoff = datetime.utcnow().date() - timedelta(days=days - 1)
+    recent = [r for r in rollups if r.day >= cutoff]
+
+    calories = sum(r.calories for r in recent)
+    days_with_meals = len([r for r in recent if r.meal_count])
+
+    class_counts: Dict[str, int] = {}
+    severity_counts: Dict[str, int] = {band: 0 for band in SEVERITY_BANDS}
+    alert_counts: Dict[str, int] = {}
+    for r in recent:
+        for key, count in (r.symptom_class_counts or {}).items():
+            class_counts[key] = class_counts.get(key, 0) + count
+        for key, count in (r.symptom_severity_counts or {}).items():
+            severity_counts[key] = severity_counts.get(key, 0) + count
+        for key, count in (r.alert_severity_counts or {}).items():
+            alert_counts[key] = alert_counts.get(key, 0) + count
+
+    latest_vitals = None
+    for r in rollups:
+        if r.vitals_recorded_at is not None:
+            latest_vitals = {
+                "recorded_at": r.vitals_recorded_at.isoformat(),
+                "weight_kg": r.weight_kg,
+                "blood_sugar": r.blood_sugar,
+                "blood_pressure_systolic": r.blood_pressure_systolic,
+                "blood_pressure_diastolic": r.blood_pressure_diastolic
+            }
+            break
+
+    last_updated = max((r.updated_at for r in rollups if r.updated_at), default=None)
+
+    return {
+        "user_id": user_id,
+        "window_days": days,
+        "last_updated": last_updated.isoformat() if last_updated else None,
+        "nutrition": {
+            "meals_logged": sum(r.meal_count for r in recent),
+            "total_calories": round(calories, 1),
+            "average_daily_calories": round(calories / days_with_meals, 1) if days_with_meals else None,
+            "protein_g": round(sum(r.protein_g for r in recent), 1),
+            "carbs_g": round(sum(r.carbs_g for r in recent), 1),
+            "fat_g": round(sum(r.fat_g for r in recent), 1)
+        },
+        "symptoms": {
+            "total_logs": sum(r.symptom_log_count for r in recent),
+            "by_classification": class_counts,
+            "by_severity": severity_counts
+        },
+        "latest_vitals": latest_vitals,
+        "alerts": {
+            "total": sum(r.alert_count for r in recent),
+            "by_severity": alert_counts
+        }
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    from ..db import Base, SessionLocal, engine
+    from ..models.user import User
+
+    parser = argparse.ArgumentParser(description="Rebuild daily health rollups from the raw logs")
+    parser.add_argument("user_ids", nargs="*", help="users to rebuild")
+    parser.add_argument("--all", action="store_true", help="rebuild every user")
+    args = parser.parse_args()
+    if not args.user_ids and not args.all:
+        parser.error("give user ids or --all")
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        user_ids = [row[0] for row in db.query(User.id).all()] if args.all else args.user_ids
+        for user_id in user_ids:
+            print(f"{user_id}: {rebuild_user_rollups(db, user_id)} rollups")
+    finally:
+        db.close()
@@ -0,0 +1,106 @@
+"""HealthSync Model Registry
+
+Stores versioned model artifacts in a directory and serves the current one
+to the API without downtime.
+
+Publishing writes the artifact to a temporary file and renames it to
+v<NNNN>.joblib, then atomically replaces the CURRENT pointer file. Readers
+never see a partially written artifact: they keep using the version they
+have in memory until the new one is fully loaded, and the swap itself is a
+single reference assignment. Every process re-checks the pointer at most
+once per poll interval, so a model trained by another process (or worker)
+is picked up without a restart.
+
+Only the newest `keep` versions are kept on disk.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Dict, Any, Optional
+import joblib
+
+logger = logging.getLogger(__name__)
+
+POINTER_FILE = "CURRENT"
+_VERSION_FILE = re.compile(r"^v(\d+)\.joblib$")
+
+
+class ModelRegistry:
+    """Versioned artifacts in `directory` with a hot-swappable current version"""
+
+    def __init__(self, directory: str, poll_seconds: float = 5.0, keep: int = 5):
+        self.directory = directory
+        self.poll_seconds = poll_seconds
+        self.keep = keep
+        self._artifact: Optional[Dict[str, Any]] = None
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> Optional[int]:
+        return self._version
+
+    def _pointer_path(self) -> str:
+        return os.path.join(self.directory, POINTER_FILE)
+
+    def _read_pointer(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._pointer_path()) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _versions(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(int(m.group(1)) for m in map(_VERSION_FILE.match, os.listdir(self.directory)) if m)
+
+    def current(self) -> Optional[Dict[str, Any]]:
+        """The current artifact, reloading it if another process published a newer version"""
+        now = time.monotonic()
+        if self._artifact is not None and now - self._checked_at < self.poll_seconds:
+            return self._artifact
+        with self._lock:
+            if self._artifact is None or now - self._checked_at >= self.poll_seconds:
+                self._checked_at = now
+                pointer = self._read_pointer()
+                if pointer is not None and pointer["version"] != self._version:
+                    path = os.path.join(self.directory, pointer["file"])
+                    try:
+                        artifact = joblib.load(path)
+                    except FileNotFoundError:
+                        logger.warning("Model version %s is missing at %s", pointer["version"], path)
+                    else:
+                        self._artifact, self._version = artifact, pointer["version"]
+        return self._artifact
+
+    def publish(self, artifact: Dict[str, Any]) -> int:
+        """Write a new version, make it current and swap it in. Returns the version number."""
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            version = max(self._versions(), default=0) + 1
+            artifact = {**artifact, "version": version}
+            name = f"v{version:04d}.joblib"
+            partial = os.path.join(self.directory, f".{name}.{os.getpid()}.part")
+            joblib.dump(artifact, partial)
+            os.replace(partial, os.path.join(self.directory, name))
+
+            pointer = os.path.join(self.directory, f".{POINTER_FILE}.{os.getpid()}.part")
+            with open(pointer, "w") as f:
+                json.dump({"version": version, "file": name, "published_at": time.time()}, f)
+            os.replace(pointer, self._pointer_path())
+
+            self._artifact, self._version = artifact, version
+            self._checked_at = time.monotonic()
+
+            for old in self._versions()[:-self.keep]:
+                try:
+                    os.remove(os.path.join(self.directory, f"v{old:04d}.joblib"))
+                except OSError:
+                    pass
+        return version
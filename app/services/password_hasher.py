@@ -0,0 +1,119 @@
+"""HealthSync Password Hashing
+
+bcrypt is deliberately slow (hundreds of milliseconds per hash), so async
+endpoints must not run it on the event loop. PasswordHasher runs hashing and
+verification on a dedicated thread pool (bcrypt releases the GIL), caps how
+many requests may wait for it, and records how long work sat in the queue.
+
+verify() also reports when a stored hash was made with other cost settings
+than the current BCRYPT_ROUNDS, returning a replacement hash so the caller
+can transparently upgrade it at login.
+
+Configuration:
+    BCRYPT_ROUNDS             bcrypt cost factor (default 12)
+    PASSWORD_HASH_WORKERS     hashing threads (default: CPU count, at most 4)
+    PASSWORD_HASH_MAX_QUEUE   requests allowed to wait or run at once (default 64)
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Tuple
+from passlib.context import CryptContext
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(os.cpu_count() or 1, 4))))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+
+# Samples kept for the queue time percentiles
+METRICS_WINDOW = 1000
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+
+class HasherBusyError(Exception):
+    """Raised when too many hashing requests are already queued"""
+
+
+class PasswordHasher:
+    """Runs bcrypt on a bounded thread pool and tracks queue and run times"""
+
+    def __init__(self, context: CryptContext = pwd_context, workers: int = PASSWORD_HASH_WORKERS,
+                 max_queue: int = PASSWORD_HASH_MAX_QUEUE):
+        self.context = context
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._slots = threading.BoundedSemaphore(max_queue)
+        self._lock = threading.Lock()
+        self._queue_times = deque(maxlen=METRICS_WINDOW)
+        self._run_times = deque(maxlen=METRICS_WINDOW)
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+
+    def _timed(self, submitted: float, fn, *args):
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            finished = time.perf_counter()
+            with self._lock:
+                self._queue_times.append(started - submitted)
+                self._run_times.append(finished - started)
+                self.completed += 1
+
+    async def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HasherBusyError("Too many password hashing requests in progress")
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self._timed, time.perf_counter(), fn, *args)
+        finally:
+            self._slots.release()
+
+    async def hash(self, password: str) -> str:
+        """Hash a password with the current cost settings"""
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """
+        Check a password. Returns (valid, new_hash) where new_hash is set when
+        the stored hash should be replaced because the cost settings changed.
+        """
+        valid, new_hash = await self._run(self.context.verify_and_update, password, hashed)
+        if new_hash is not None:
+            with self._lock:
+                self.rehashed += 1
+        return valid, new_hash
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue time and run time metrics over the last METRICS_WINDOW operations"""
+        with self._lock:
+            queue_times = sorted(self._queue_times)
+            run_times = sorted(self._run_times)
+            counters = {"completed": self.completed, "rejected": self.rejected, "rehashed": self.rehashed}
+
+        def percentile(values, q):
+            return round(values[min(int(q * len(values)), len(values) - 1)] * 1000, 2) if values else None
+
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "bcrypt_rounds": BCRYPT_ROUNDS,
+            **counters,
+            "queue_ms_p50": percentile(queue_times, 0.5),
+            "queue_ms_p99": percentile(queue_times, 0.99),
+            "queue_ms_max": percentile(queue_times, 1.0),
+            "run_ms_p50": percentile(run_times, 0.5),
+            "run_ms_p99": percentile(run_times, 0.99)
+        }
+
+
+# Process-wide hasher
+password_hasher = PasswordHasher()
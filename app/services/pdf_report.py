@@ -0,0 +1,122 @@
+"""HealthSync PDF Report Renderer
+
+Minimal text-only PDF writer used by the report export. Pages are written to
+the output file as soon as they fill up, so memory use is bounded by a single
+page regardless of how many rows the report contains. Only the byte offsets
+of written objects are kept until the cross-reference table is emitted.
+"""
+
+from typing import BinaryIO, List, Optional, Tuple
+
+# US Letter in points
+PAGE_WIDTH = 612
+PAGE_HEIGHT = 792
+MARGIN = 40
+
+BODY_FONT_SIZE = 8
+HEADING_FONT_SIZE = 11
+LINE_HEIGHT = 11
+
+# Courier glyphs are 0.6em wide, which keeps table rows aligned
+BODY_CHARS_PER_LINE = int((PAGE_WIDTH - 2 * MARGIN) / (BODY_FONT_SIZE * 0.6))
+
+# Fixed object numbers; page objects are allocated after these
+CATALOG_OBJ = 1
+PAGES_OBJ = 2
+BODY_FONT_OBJ = 3
+HEADING_FONT_OBJ = 4
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+class StreamingPDFWriter:
+    """Write lines of text to a paginated PDF without holding the document in memory"""
+
+    def __init__(self, fileobj: BinaryIO, title: str = "Health Report"):
+        self.fileobj = fileobj
+        self.title = title
+        self.offsets = {}
+        self.page_objects: List[int] = []
+        self.next_obj = HEADING_FONT_OBJ + 1
+        self.lines: List[Tuple[str, str]] = []
+        self.lines_per_page = (PAGE_HEIGHT - 2 * MARGIN) // LINE_HEIGHT - 2  # room for the footer
+
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self._write_object(BODY_FONT_OBJ, "<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>")
+        self._write_object(HEADING_FONT_OBJ, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>")
+
+    def _write(self, data: bytes):
+        self.fileobj.write(data)
+
+    def _write_object(self, number: int, body: str, stream: Optional[bytes] = None):
+        self.offsets[number] = self.fileobj.tell()
+        self._write(f"{number} 0 obj\n{body}\n".encode("latin-1"))
+        if stream is not None:
+            self._write(b"stream\n" + stream + b"\nendstream\n")
+        self._write(b"endobj\n")
+
+    def _allocate(self) -> int:
+        number = self.next_obj
+        self.next_obj += 1
+        return number
+
+    def heading(self, text: str):
+        """Add a heading line, starting a new page if fewer than 3 lines remain"""
+        if self.lines and len(self.lines) > self.lines_per_page - 3:
+            self.flush_page()
+        self._add("heading", text)
+
+    def line(self, text: str = ""):
+        """Add a body line, truncated to the page width"""
+        if len(text) > BODY_CHARS_PER_LINE:
+            text = text[:BODY_CHARS_PER_LINE - 3] + "..."
+        self._add("body", text)
+
+    def _add(self, kind: str, text: str):
+        self.lines.append((kind, text))
+        if len(self.lines) >= self.lines_per_page:
+            self.flush_page()
+
+    def flush_page(self):
+        """Write the buffered lines out as a page"""
+        if not self.lines:
+            return
+        page_number = len(self.page_objects) + 1
+        commands = ["BT", f"{LINE_HEIGHT} TL", f"{MARGIN} {PAGE_HEIGHT - MARGIN} Td"]
+        for kind, text in self.lines:
+            font = "/F2 %d Tf" % HEADING_FONT_SIZE if kind == "heading" else "/F1 %d Tf" % BODY_FONT_SIZE
+            commands.append(f"{font} T* ({_escape(text)}) Tj")
+        commands.append("ET")
+        footer = f"{self.title} - page {page_number}"
+        commands.append(f"BT /F1 {BODY_FONT_SIZE} Tf {MARGIN} {MARGIN // 2} Td ({_escape(footer)}) Tj ET")
+        content = "\n".join(commands).encode("latin-1", errors="replace")
+
+        content_obj, page_obj = self._allocate(), self._allocate()
+        self._write_object(content_obj, f"<< /Length {len(content)} >>", content)
+        self._write_object(
+            page_obj,
+            f"<< /Type /Page /Parent {PAGES_OBJ} 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            f"/Resources << /Font << /F1 {BODY_FONT_OBJ} 0 R /F2 {HEADING_FONT_OBJ} 0 R >> >> "
+            f"/Contents {content_obj} 0 R >>"
+        )
+        self.page_objects.append(page_obj)
+        self.lines = []
+
+    def close(self):
+        """Flush the last page and write the page tree, xref table and trailer"""
+        if not self.lines and not self.page_objects:
+            self.line("")
+        self.flush_page()
+
+        kids = " ".join(f"{n} 0 R" for n in self.page_objects)
+        self._write_object(PAGES_OBJ, f"<< /Type /Pages /Kids [{kids}] /Count {len(self.page_objects)} >>")
+        self._write_object(CATALOG_OBJ, f"<< /Type /Catalog /Pages {PAGES_OBJ} 0 R >>")
+
+        xref_offset = self.fileobj.tell()
+        size = self.next_obj
+        entries = ["0000000000 65535 f "] + [f"{self.offsets[n]:010d} 00000 n " for n in range(1, size)]
+        self._write(f"xref\n0 {size}\n".encode("latin-1"))
+        self._write(("\n".join(entries) + "\n").encode("latin-1"))
+        self._write(f"trailer\n<< /Size {size} /Root {CATALOG_OBJ} 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode("latin-1"))
@@ -0,0 +1,247 @@
+"""HealthSync Progress Analytics
+
+NumPy analytics core for progress metrics. A user's progress rows are loaded
+once as a timestamp vector plus a (metrics x samples) value matrix, with NaN
+marking metrics that were not recorded in a row. All statistics are computed
+for every metric at once with masked array arithmetic instead of per-row
+Python loops.
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+from sqlalchemy.orm import Session
+
+from ..models.progress import Progress
+
+# Row order of the value matrix
+METRIC_COLUMNS = ["weight_kg", "blood_sugar", "blood_pressure_systolic", "blood_pressure_diastolic"]
+
+# Columns stored as integers, reported back as ints for min/max/first/last
+INTEGER_COLUMNS = {"blood_pressure_systolic", "blood_pressure_diastolic"}
+
+SECONDS_PER_DAY = 86400.0
+
+# Robust z-score above which a sample is flagged as an outlier
+OUTLIER_Z_THRESHOLD = 3.5
+
+
+def load_progress_arrays(db: Session, user_id: str, days: int = 30) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Load a user's progress for the last `days` days as arrays.
+
+    Returns (timestamps, values): timestamps is a datetime64[us] vector sorted
+    ascending and values is a float matrix of shape (len(METRIC_COLUMNS), n).
+    """
+    cutoff_date = datetime.utcnow() - timedelta(days=days)
+    rows = db.query(
+        Progress.timestamp, *[getattr(Progress, column) for column in METRIC_COLUMNS]
+    ).filter(
+        Progress.user_id == user_id,
+        Progress.timestamp >= cutoff_date
+    ).order_by(Progress.timestamp).all()
+    return rows_to_arrays(rows)
+
+
+def load_progress_arrays_bulk(db: Session, user_ids: List[str], days: int = 30) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Load progress for many users with a single query.
+
+    Returns (user_ids, timestamps, values) sorted by user and then time, so
+    that group_starts(user_ids) yields the offsets for compute_grouped_stats.
+    """
+    cutoff_date = datetime.utcnow() - timedelta(days=days)
+    rows = db.query(
+        Progress.user_id, Progress.timestamp, *[getattr(Progress, column) for column in METRIC_COLUMNS]
+    ).filter(
+        Progress.user_id.in_(user_ids),
+        Progress.timestamp >= cutoff_date
+    ).order_by(Progress.user_id, Progress.timestamp).all()
+    timestamps, values = rows_to_arrays([r[1:] for r in rows])
+    return np.array([r[0] for r in rows], dtype=object), timestamps, values
+
+
+def rows_to_arrays(rows: List[tuple]) -> Tuple[np.ndarray, np.ndarray]:
+    """Convert (timestamp, *METRIC_COLUMNS) rows into (timestamps, values) arrays"""
+    if not rows:
+        return np.array([], dtype="datetime64[us]"), np.empty((len(METRIC_COLUMNS), 0))
+    timestamps = np.array([r[0] for r in rows], dtype="datetime64[us]")
+    # None becomes NaN under a float dtype
+    values = np.array([r[1:] for r in rows], dtype=float).T
+    return timestamps, values
+
+
+def group_starts(group_ids: np.ndarray) -> np.ndarray:
+    """Start offsets of each run of equal ids in a grouped (sorted) id vector"""
+    if len(group_ids) == 0:
+        return np.array([], dtype=np.intp)
+    return np.flatnonzero(np.r_[True, group_ids[1:] != group_ids[:-1]])
+
+
+def _segments(n_samples: int, starts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Get (lengths, start offset of each sample's group) for grouped samples"""
+    lengths = np.diff(np.r_[starts, n_samples])
+    return lengths, np.repeat(starts, lengths)
+
+
+def to_days(timestamps: np.ndarray) -> np.ndarray:
+    """Convert datetime64 timestamps into fractional days since the epoch"""
+    return timestamps.astype("datetime64[us]").astype(np.int64) / 1e6 / SECONDS_PER_DAY
+
+
+def mask_incomplete_blood_pressure(values: np.ndarray) -> np.ndarray:
+    """Blank out blood pressure samples that lack either systolic or diastolic"""
+    systolic = METRIC_COLUMNS.index("blood_pressure_systolic")
+    diastolic = METRIC_COLUMNS.index("blood_pressure_diastolic")
+    complete = ~np.isnan(values[systolic]) & ~np.isnan(values[diastolic])
+    masked = values.copy()
+    masked[[systolic, diastolic]] = np.where(complete, values[[systolic, diastolic]], np.nan)
+    return masked
+
+
+def least_squares_slope(t: np.ndarray, values: np.ndarray, starts: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Ordinary least-squares slope of each row of `values` against `t`,
+    ignoring NaNs. With `starts`, samples are grouped into consecutive runs
+    and one slope is returned per (row, group). Returns NaN where a group has
+    fewer than two distinct times.
+    """
+    grouped = starts is not None
+    if not grouped:
+        starts = np.array([0])
+    lengths, _ = _segments(values.shape[1], starts)
+    mask = ~np.isnan(values)
+    n = np.add.reduceat(mask, starts, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t_mean = np.add.reduceat(np.where(mask, t, 0.0), starts, axis=1) / n
+        y_mean = np.add.reduceat(np.where(mask, values, 0.0), starts, axis=1) / n
+        dt = np.where(mask, t - np.repeat(t_mean, lengths, axis=1), 0.0)
+        dy = np.where(mask, values - np.repeat(y_mean, lengths, axis=1), 0.0)
+        denom = np.add.reduceat(dt * dt, starts, axis=1)
+        slopes = np.where(denom > 0, np.add.reduceat(dt * dy, starts, axis=1) / denom, np.nan)
+    return slopes if grouped else slopes[:, 0]
+
+
+def rolling_mean(values: np.ndarray, window: int = 7, starts: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Trailing rolling mean over the last `window` samples of each row.
+    Missing samples are skipped; a window with no samples yields NaN.
+    With `starts`, windows never reach back past the start of a sample's group.
+    """
+    mask = ~np.isnan(values)
+    filled = np.where(mask, values, 0.0)
+    zeros = np.zeros((values.shape[0], 1))
+    sums = np.concatenate([zeros, np.cumsum(filled, axis=1)], axis=1)
+    counts = np.concatenate([zeros, np.cumsum(mask, axis=1)], axis=1)
+    end = np.arange(1, values.shape[1] + 1)
+    start = np.maximum(end - window, 0)
+    if starts is not None:
+        start = np.maximum(start, _segments(values.shape[1], starts)[1])
+    window_sums = sums[:, end] - sums[:, start]
+    window_counts = counts[:, end] - counts[:, start]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(window_counts > 0, window_sums / window_counts, np.nan)
+
+
+def _segment_median(values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """NaN-aware median of each (row, group), NaN for groups without samples"""
+    lengths, _ = _segments(values.shape[1], starts)
+    group_ids = np.broadcast_to(np.repeat(np.arange(len(starts)), lengths), values.shape)
+    # Sort by value within each group; NaNs sort to the end of their group
+    order = np.lexsort((np.where(np.isnan(values), np.inf, values), group_ids), axis=-1)
+    ordered = np.take_along_axis(values, order, axis=1)
+    counts = np.add.reduceat(~np.isnan(values), starts, axis=1)
+    lower = np.minimum(starts + (counts - 1) // 2, values.shape[1] - 1)
+    upper = np.minimum(starts + counts // 2, values.shape[1] - 1)
+    median = (np.take_along_axis(ordered, lower, axis=1) + np.take_along_axis(ordered, upper, axis=1)) / 2
+    return np.where(counts > 0, median, np.nan)
+
+
+def outlier_flags(values: np.ndarray, threshold: float = OUTLIER_Z_THRESHOLD,
+                  starts: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Flag samples whose robust (median/MAD based) z-score exceeds `threshold`.
+    With `starts`, the median and MAD are taken per group. Rows or groups
+    with no spread are never flagged.
+    """
+    if values.shape[1] == 0:
+        return np.zeros(values.shape, dtype=bool)
+    if starts is None:
+        starts = np.array([0])
+    lengths, _ = _segments(values.shape[1], starts)
+    mask = ~np.isnan(values)
+    median = np.repeat(_segment_median(values, starts), lengths, axis=1)
+    mad = np.repeat(_segment_median(np.abs(values - median), starts), lengths, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = 0.6745 * (values - median) / mad
+    return mask & (mad > 0) & (np.abs(z) > threshold)
+
+
+def compute_grouped_stats(timestamps: np.ndarray, values: np.ndarray, starts: np.ndarray,
+                          window: int = 7) -> List[Dict[str, Dict[str, Any]]]:
+    """
+    Compute summary statistics for every metric of every group in one pass.
+
+    Samples must be sorted by group and then by time, with `starts` giving
+    the offset of each group (see group_starts). Returns one dict per group,
+    keyed by metric column, with count, first/last value and time, mean,
+    min, max, variance, least-squares slope per day, the latest rolling mean
+    and the number of outliers.
+    """
+    n_groups = len(starts)
+    if values.shape[1] == 0 or n_groups == 0:
+        return [{column: {"count": 0} for column in METRIC_COLUMNS[:values.shape[0]]} for _ in range(n_groups)]
+
+    lengths, _ = _segments(values.shape[1], starts)
+    mask = ~np.isnan(values)
+    counts = np.add.reduceat(mask, starts, axis=1)
+
+    slopes = least_squares_slope(to_days(timestamps), values, starts)
+    rolling = rolling_mean(values, window, starts)
+    outliers = np.add.reduceat(outlier_flags(values, starts=starts), starts, axis=1)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.add.reduceat(np.where(mask, values, 0.0), starts, axis=1) / counts
+        deviations = np.where(mask, values - np.repeat(means, lengths, axis=1), 0.0)
+        variances = np.add.reduceat(deviations * deviations, starts, axis=1) / counts
+    # fmin/fmax ignore NaN samples
+    mins = np.fmin.reduceat(values, starts, axis=1)
+    maxs = np.fmax.reduceat(values, starts, axis=1)
+
+    sample_idx = np.arange(values.shape[1])
+    first_idx = np.minimum.reduceat(np.where(mask, sample_idx, values.shape[1]), starts, axis=1)
+    last_idx = np.maximum.reduceat(np.where(mask, sample_idx, -1), starts, axis=1)
+
+    results = []
+    for g in range(n_groups):
+        stats = {}
+        for i, column in enumerate(METRIC_COLUMNS[:values.shape[0]]):
+            if counts[i, g] == 0:
+                stats[column] = {"count": 0}
+                continue
+            cast = int if column in INTEGER_COLUMNS else float
+            first, last = first_idx[i, g], last_idx[i, g]
+            stats[column] = {
+                "count": int(counts[i, g]),
+                "first_value": cast(values[i, first]),
+                "first_timestamp": timestamps[first].astype(datetime),
+                "last_value": cast(values[i, last]),
+                "last_timestamp": timestamps[last].astype(datetime),
+                "mean": float(means[i, g]),
+                "min": cast(mins[i, g]),
+                "max": cast(maxs[i, g]),
+                "variance": float(variances[i, g]),
+                "slope_per_day": None if np.isnan(slopes[i, g]) else float(slopes[i, g]),
+                "rolling_mean": float(rolling[i, last]),
+                "outliers": int(outliers[i, g])
+            }
+        results.append(stats)
+    return results
+
+
+def compute_metric_stats(timestamps: np.ndarray, values: np.ndarray, window: int = 7) -> Dict[str, Dict[str, Any]]:
+    """
+    Compute summary statistics for every metric row of a single user's
+    samples. See compute_grouped_stats for the returned fields.
+    """
+    return compute_grouped_stats(timestamps, values, np.array([0]), window)[0]
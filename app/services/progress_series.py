@@ -0,0 +1,217 @@
+"""HealthSync Progress Time Series
+
+Time-series storage for progress metrics. Every progress insert also updates
+per-user daily and weekly buckets (min/max/mean/last) for each metric it
+carries, and `get_metric_series` serves charts from the coarsest resolution
+that still fits the requested range.
+
+Each bucket is written with one INSERT ... ON CONFLICT DO UPDATE on
+(user_id, metric, resolution, bucket_start) that does the count, sum, min,
+max and last arithmetic in SQL, so concurrent progress writes for the same
+bucket neither fail on the unique index nor overwrite each other.
+
+Set PROGRESS_STORAGE_MODE=wide to store raw rows only; series queries then
+always read the raw progress table.
+"""
+
+import os
+from datetime import datetime, date, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+from sqlalchemy import case, func, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from ..models.progress import Progress
+from ..models.progress_series import ProgressSeriesBucket, new_id
+
+PROGRESS_STORAGE_MODE = os.getenv("PROGRESS_STORAGE_MODE", "timeseries")
+
+# Public metric name -> Progress column
+SERIES_METRICS = {
+    "weight": "weight_kg",
+    "blood_sugar": "blood_sugar",
+    "blood_pressure_systolic": "blood_pressure_systolic",
+    "blood_pressure_diastolic": "blood_pressure_diastolic"
+}
+
+RESOLUTIONS = ("raw", "day", "week")
+
+# Longest range (in days) served from each resolution when resolution="auto"
+RAW_MAX_DAYS = 31
+DAY_MAX_DAYS = 180
+
+
+def bucket_start(timestamp: datetime, resolution: str) -> date:
+    """Get the first day of the bucket a timestamp falls into"""
+    day = timestamp.date()
+    if resolution == "week":
+        return day - timedelta(days=day.weekday())
+    return day
+
+
+def choose_resolution(days: int) -> str:
+    """Pick the coarsest resolution that still gives a useful chart for `days`"""
+    if days <= RAW_MAX_DAYS:
+        return "raw"
+    if days <= DAY_MAX_DAYS:
+        return "day"
+    return "week"
+
+
+def _apply(bucket: ProgressSeriesBucket, value: float, timestamp: datetime):
+    bucket.count = (bucket.count or 0) + 1
+    bucket.sum_value = (bucket.sum_value or 0.0) + value
+    bucket.min_value = value if bucket.min_value is None else min(bucket.min_value, value)
+    bucket.max_value = value if bucket.max_value is None else max(bucket.max_value, value)
+    # Entries can be back-dated, so "last" follows the measurement time
+    if bucket.last_at is None or timestamp >= bucket.last_at:
+        bucket.last_value = value
+        bucket.last_at = timestamp
+
+
+def record_progress(db: Session, progress: Progress) -> None:
+    """Fold a new progress entry into the user's daily and weekly buckets"""
+    if PROGRESS_STORAGE_MODE != "timeseries":
+        return
+
+    timestamp = progress.timestamp or datetime.utcnow()
+    values = {
+        column: float(getattr(progress, column))
+        for column in SERIES_METRICS.values()
+        if getattr(progress, column) is not None
+    }
+    if not values:
+        return
+
+    now = datetime.utcnow()
+    rows = [
+        {
+            "id": new_id(),
+            "user_id": progress.user_id,
+            "metric": metric,
+            "resolution": resolution,
+            "bucket_start": bucket_start(timestamp, resolution),
+            "count": 1,
+            "sum_value": value,
+            "min_value": value,
+            "max_value": value,
+            "last_value": value,
+            "last_at": timestamp,
+            "updated_at": now
+        }
+        for metric, value in values.items()
+        for resolution in ("day", "week")
+    ]
+
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    upsert = dialect.insert(ProgressSeriesBucket).values(rows)
+    bucket, new = ProgressSeriesBucket.__table__.c, upsert.excluded
+    # Entries can be back-dated, so "last" follows the measurement time
+    newer = or_(bucket.last_at.is_(None), new.last_at >= bucket.last_at)
+    db.execute(upsert.on_conflict_do_update(
+        index_elements=["user_id", "metric", "resolution", "bucket_start"],
+        set_={
+            "count": func.coalesce(bucket.count, 0) + new.count,
+            "sum_value": func.coalesce(bucket.sum_value, 0.0) + new.sum_value,
+            "min_value": case((or_(bucket.min_value.is_(None), new.min_value < bucket.min_value), new.min_value),
+                              else_=bucket.min_value),
+            "max_value": case((or_(bucket.max_value.is_(None), new.max_value > bucket.max_value), new.max_value),
+                              else_=bucket.max_value),
+            "last_value": case((newer, new.last_value), else_=bucket.last_value),
+            "last_at": case((newer, new.last_at), else_=bucket.last_at),
+            "updated_at": new.updated_at
+        }
+    ))
+
+
+def rebuild_user_series(db: Session, user_id: str, chunk_size: int = 1000) -> int:
+    """
+    Recompute a user's buckets from their raw progress rows, e.g. after
+    switching from the wide storage mode. Returns the number of buckets written.
+    """
+    db.query(ProgressSeriesBucket).filter(ProgressSeriesBucket.user_id == user_id).delete(synchronize_session=False)
+
+    buckets: Dict[Tuple[str, str, date], ProgressSeriesBucket] = {}
+    rows = db.query(Progress).filter(Progress.user_id == user_id).yield_per(chunk_size)
+    for p in rows:
+        timestamp = p.timestamp or datetime.utcnow()
+        for column in SERIES_METRICS.values():
+            value = getattr(p, column)
+            if value is None:
+                continue
+            for resolution in ("day", "week"):
+                key = (column, resolution, bucket_start(timestamp, resolution))
+                bucket = buckets.get(key)
+                if bucket is None:
+                    bucket = ProgressSeriesBucket(
+                        user_id=user_id, metric=column, resolution=resolution,
+                        bucket_start=key[2], count=0, sum_value=0.0
+                    )
+                    buckets[key] = bucket
+                _apply(bucket, float(value), timestamp)
+
+    db.add_all(buckets.values())
+    db.commit()
+    return len(buckets)
+
+
+def get_metric_series(db: Session, user_id: str, metric: str, days: int = 30,
+                      resolution: str = "auto") -> Dict[str, Any]:
+    """
+    Get a metric's time series over the last `days` days.
+
+    resolution is one of raw, day, week or auto. With auto, short ranges are
+    served from raw rows and longer ranges from daily or weekly buckets.
+    """
+    column = SERIES_METRICS[metric]
+    if resolution == "auto":
+        resolution = choose_resolution(days)
+    if PROGRESS_STORAGE_MODE != "timeseries":
+        resolution = "raw"
+
+    since = datetime.utcnow() - timedelta(days=days)
+
+    if resolution == "raw":
+        value_column = getattr(Progress, column)
+        rows = db.query(Progress.timestamp, value_column).filter(
+            Progress.user_id == user_id,
+            Progress.timestamp >= since,
+            value_column.isnot(None)
+        ).order_by(Progress.timestamp).all()
+        points = [
+            {
+                "start": ts.isoformat(),
+                "min": float(value),
+                "max": float(value),
+                "mean": float(value),
+                "last": float(value),
+                "count": 1
+            }
+            for ts, value in rows
+        ]
+    else:
+        buckets = db.query(ProgressSeriesBucket).filter(
+            ProgressSeriesBucket.user_id == user_id,
+            ProgressSeriesBucket.metric == column,
+            ProgressSeriesBucket.resolution == resolution,
+            ProgressSeriesBucket.bucket_start >= bucket_start(since, resolution)
+        ).order_by(ProgressSeriesBucket.bucket_start).all()
+        points = [
+            {
+                "start": b.bucket_start.isoformat(),
+                "min": b.min_value,
+                "max": b.max_value,
+                "mean": round(b.sum_value / b.count, 2) if b.count else None,
+                "last": b.last_value,
+                "count": b.count
+            }
+            for b in buckets
+        ]
+
+    return {
+        "user_id": user_id,
+        "metric": metric,
+        "resolution": resolution,
+        "days": days,
+        "points": points
+    }
@@ -4,6 +4,7 @@ import numpy as np
 from sqlalchemy.orm import Session
 from .. import schemas, crud
 from ..models.progress import Progress
+from . import progress_analytics, goal_forecast
 
 class ProgressTracker:
     """
@@ -26,36 +27,45 @@ class ProgressTracker:
         """
         return crud.get_user_progress(self.db, user_id, days)
     
+    def analyze_metrics(self, user_id: str, days: int = 30) -> Dict[str, Dict[str, Any]]:
+        """
+        Compute statistics for all progress metrics in a single pass
+        """
+        timestamps, values = progress_analytics.load_progress_arrays(self.db, user_id, days)
+        return progress_analytics.compute_metric_stats(timestamps, values)
+    
     def analyze_weight_trend(self, user_id: str, days: int = 30) -> Dict[str, Any]:
         """
         Analyze weight trends over time and provide insights
         """
-        progress_history = self.get_progress_history(user_id, days)
+        timestamps, values = progress_analytics.load_progress_arrays(self.db, user_id, days)
         
-        if not progress_history or len(progress_history) < 2:
+        if len(timestamps) < 2:
             return {
                 "status": "insufficient_data",
                 "message": "Need at least two weight measurements to analyze trends"
             }
         
-        # Extract weight data points with timestamps
-        weight_data = [(p.timestamp, p.weight_kg) for p in progress_history if p.weight_kg is not None]
-        weight_data.sort(key=lambda x: x[0])  # Sort by timestamp
-        
-        if len(weight_data) < 2:
+        return self._weight_trend_from_stats(progress_analytics.compute_metric_stats(timestamps, values)["weight_kg"])
+    
+    def _weight_trend_from_stats(self, weight: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Build the weight trend response from precomputed weight statistics
+        """
+        if weight["count"] < 2:
             return {
                 "status": "insufficient_data",
                 "message": "Need at least two weight measurements to analyze trends"
             }
         
         # Calculate overall change
-        first_weight = weight_data[0][1]
-        last_weight = weight_data[-1][1]
+        first_weight = weight["first_value"]
+        last_weight = weight["last_value"]
         total_change = last_weight - first_weight
         percent_change = (total_change / first_weight) * 100
         
         # Calculate rate of change (per week)
-        days_elapsed = (weight_data[-1][0] - weight_data[0][0]).days
+        days_elapsed = (weight["last_timestamp"] - weight["first_timestamp"]).days
         if days_elapsed < 1:
             days_elapsed = 1  # Avoid division by zero
         
@@ -75,22 +85,61 @@ class ProgressTracker:
         return {
             "status": "success",
             "first_measurement": {
-                "date": weight_data[0][0].isoformat(),
-                "weight_kg": weight_data[0][1]
+                "date": weight["first_timestamp"].isoformat(),
+                "weight_kg": first_weight
             },
             "latest_measurement": {
-                "date": weight_data[-1][0].isoformat(),
-                "weight_kg": weight_data[-1][1]
+                "date": weight["last_timestamp"].isoformat(),
+                "weight_kg": last_weight
             },
             "total_change_kg": round(total_change, 2),
             "percent_change": round(percent_change, 2),
             "weekly_change_rate_kg": round(weekly_change_rate, 2),
             "trend": trend,
-            "data_points": len(weight_data),
+            "data_points": weight["count"],
             "days_tracked": days_elapsed,
-            "insights": insights
+            "insights": insights,
+            "statistics": self._format_statistics(weight)
+        }
+    
+    def _format_statistics(self, stats: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Format the regression, spread and outlier statistics of a metric
+        """
+        slope = stats["slope_per_day"]
+        return {
+            "regression_slope_per_week": round(slope * 7, 3) if slope is not None else None,
+            "rolling_mean": round(stats["rolling_mean"], 2),
+            "variance": round(stats["variance"], 3),
+            "outliers": stats["outliers"]
         }
     
+    def analyze_trends_bulk(self, user_ids: List[str], days: int = 30) -> Dict[str, Dict[str, Any]]:
+        """
+        Analyze weight and blood pressure trends for many users at once.
+        All users' progress is fetched with one query and their statistics are
+        computed in a single grouped pass; results are keyed by user ID.
+        """
+        group_ids, timestamps, values = progress_analytics.load_progress_arrays_bulk(self.db, user_ids, days)
+        starts = progress_analytics.group_starts(group_ids)
+        
+        # Weight and blood sugar rows are unaffected by the blood pressure mask
+        values = progress_analytics.mask_incomplete_blood_pressure(values)
+        grouped = progress_analytics.compute_grouped_stats(timestamps, values, starts)
+        stats_by_user = {group_ids[start]: stats for start, stats in zip(starts, grouped)}
+        
+        no_data = {column: {"count": 0} for column in progress_analytics.METRIC_COLUMNS}
+        results = {}
+        for user_id in user_ids:
+            stats = stats_by_user.get(user_id, no_data)
+            results[user_id] = {
+                "weight_trend": self._weight_trend_from_stats(stats["weight_kg"]),
+                "blood_pressure_trend": self._blood_pressure_trend_from_stats(
+                    stats["blood_pressure_systolic"], stats["blood_pressure_diastolic"]
+                )
+            }
+        return results
+    
     def _generate_weight_insights(self, trend: str, weekly_change_rate: float, total_change: float) -> List[str]:
         """
         Generate health insights based on weight trends
@@ -118,35 +167,28 @@ class ProgressTracker:
         """
         Analyze blood pressure trends over time and provide insights
         """
-        progress_history = self.get_progress_history(user_id, days)
-        
-        if not progress_history:
-            return {
-                "status": "insufficient_data",
-                "message": "No blood pressure measurements found"
-            }
+        timestamps, values = progress_analytics.load_progress_arrays(self.db, user_id, days)
         
-        # Extract blood pressure data points with timestamps
-        bp_data = [
-            (p.timestamp, p.blood_pressure_systolic, p.blood_pressure_diastolic) 
-            for p in progress_history 
-            if p.blood_pressure_systolic is not None and p.blood_pressure_diastolic is not None
-        ]
+        # Only readings with both systolic and diastolic values count
+        values = progress_analytics.mask_incomplete_blood_pressure(values)
         
-        if not bp_data:
+        stats = progress_analytics.compute_metric_stats(timestamps, values)
+        return self._blood_pressure_trend_from_stats(
+            stats["blood_pressure_systolic"], stats["blood_pressure_diastolic"]
+        )
+    
+    def _blood_pressure_trend_from_stats(self, systolic: Dict[str, Any], diastolic: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Build the blood pressure trend response from precomputed statistics
+        """
+        if systolic["count"] == 0:
             return {
                 "status": "insufficient_data",
                 "message": "No blood pressure measurements found"
             }
         
-        bp_data.sort(key=lambda x: x[0])  # Sort by timestamp
-        
-        # Calculate averages and ranges
-        systolic_values = [bp[1] for bp in bp_data]
-        diastolic_values = [bp[2] for bp in bp_data]
-        
-        avg_systolic = sum(systolic_values) / len(systolic_values)
-        avg_diastolic = sum(diastolic_values) / len(diastolic_values)
+        avg_systolic = systolic["mean"]
+        avg_diastolic = diastolic["mean"]
         
         # Categorize blood pressure based on average
         category = self._categorize_blood_pressure(avg_systolic, avg_diastolic)
@@ -158,13 +200,17 @@ class ProgressTracker:
             "status": "success",
             "average_systolic": round(avg_systolic, 1),
             "average_diastolic": round(avg_diastolic, 1),
-            "min_systolic": min(systolic_values),
-            "max_systolic": max(systolic_values),
-            "min_diastolic": min(diastolic_values),
-            "max_diastolic": max(diastolic_values),
+            "min_systolic": systolic["min"],
+            "max_systolic": systolic["max"],
+            "min_diastolic": diastolic["min"],
+            "max_diastolic": diastolic["max"],
             "category": category,
-            "data_points": len(bp_data),
-            "insights": insights
+            "data_points": systolic["count"],
+            "insights": insights,
+            "statistics": {
+                "systolic": self._format_statistics(systolic),
+                "diastolic": self._format_statistics(diastolic)
+            }
         }
     
     def _categorize_blood_pressure(self, systolic: float, diastolic: float) -> str:
@@ -208,49 +254,42 @@ class ProgressTracker:
         Track progress toward a specific health goal
         
         goal_type can be: 'weight', 'blood_sugar', 'blood_pressure', etc.
+        Results are cached until the user logs new progress.
         """
-        progress_history = self.get_progress_history(user_id, days=90)  # Get 90 days of history
+        key = (user_id, goal_type, float(target_value))
+        watermark = goal_forecast.forecast_cache.watermark(self.db, user_id)
+        cached = goal_forecast.forecast_cache.get(key, watermark)
+        if cached is not None:
+            return cached
         
-        if not progress_history:
+        result = self._compute_goal_progress(user_id, goal_type, target_value)
+        goal_forecast.forecast_cache.put(key, watermark, result)
+        return result
+    
+    def _compute_goal_progress(self, user_id: str, goal_type: str, target_value: float) -> Dict[str, Any]:
+        """
+        Compute goal progress and a time-to-goal forecast from 90 days of history
+        """
+        timestamps, values = progress_analytics.load_progress_arrays(self.db, user_id, days=90)
+        
+        if len(timestamps) == 0:
             return {
                 "status": "insufficient_data",
                 "message": "No progress data found"
             }
         
-        # Get the latest value based on goal type
-        latest_value = None
-        if goal_type == "weight":
-            latest_entries = [p for p in progress_history if p.weight_kg is not None]
-            if latest_entries:
-                latest_entries.sort(key=lambda x: x.timestamp, reverse=True)
-                latest_value = latest_entries[0].weight_kg
-        elif goal_type == "blood_sugar":
-            latest_entries = [p for p in progress_history if p.blood_sugar is not None]
-            if latest_entries:
-                latest_entries.sort(key=lambda x: x.timestamp, reverse=True)
-                latest_value = latest_entries[0].blood_sugar
-        elif goal_type == "blood_pressure":
-            latest_entries = [p for p in progress_history if p.blood_pressure_systolic is not None]
-            if latest_entries:
-                latest_entries.sort(key=lambda x: x.timestamp, reverse=True)
-                latest_value = latest_entries[0].blood_pressure_systolic  # Using systolic as the tracked value
-        
-        if latest_value is None:
+        row = values[progress_analytics.METRIC_COLUMNS.index(self._get_attribute_for_goal(goal_type))]
+        recorded = ~np.isnan(row)
+        if not recorded.any():
             return {
                 "status": "insufficient_data",
                 "message": f"No {goal_type} data found"
             }
         
-        # Calculate progress percentage
-        initial_entries = [p for p in progress_history if getattr(p, self._get_attribute_for_goal(goal_type)) is not None]
-        if not initial_entries:
-            return {
-                "status": "insufficient_data",
-                "message": f"No initial {goal_type} data found"
-            }
-        
-        initial_entries.sort(key=lambda x: x.timestamp)
-        initial_value = getattr(initial_entries[0], self._get_attribute_for_goal(goal_type))
+        initial_value = row[recorded][0].item()
+        latest_value = row[recorded][-1].item()
+        if self._get_attribute_for_goal(goal_type) in progress_analytics.INTEGER_COLUMNS:
+            initial_value, latest_value = int(initial_value), int(latest_value)
         
         # Calculate progress toward goal
         if goal_type == "weight":
@@ -293,7 +332,8 @@ class ProgressTracker:
             "initial_value": initial_value,
             "current_value": latest_value,
             "progress_percentage": round(progress_percentage, 1),
-            "insights": insights
+            "insights": insights,
+            "forecast": goal_forecast.forecast_time_to_goal(timestamps[recorded], row[recorded], target_value)
         }
     
     def _get_attribute_for_goal(self, goal_type: str) -> str:
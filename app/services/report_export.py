@@ -0,0 +1,310 @@
+"""HealthSync Report Export
+
+Streams a user's full health history (progress, meals, symptoms and alerts)
+to a CSV, NDJSON or PDF file. Each section is read with a chunked query and
+written row by row, and per-section summaries are accumulated on the fly, so
+memory use stays flat no matter how many years of history are exported.
+
+Exports run as background jobs tracked in the report_exports table; the
+job opens its own database session instead of borrowing the request's.
+"""
+
+import csv
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..db import SessionLocal
+from ..models.user import User
+from ..models.progress import Progress
+from ..models.meal_log import MealLog
+from ..models.symptom_log import SymptomLog
+from ..models.health_alert import HealthAlert
+from ..models.report_export import ReportExport
+from .pdf_report import StreamingPDFWriter
+
+REPORT_EXPORT_DIR = os.getenv("REPORT_EXPORT_DIR", "exports")
+EXPORT_CHUNK_SIZE = int(os.getenv("REPORT_EXPORT_CHUNK_SIZE", "2000"))
+
+# Format -> (file extension, media type)
+EXPORT_FORMATS = {
+    "csv": ("csv", "text/csv"),
+    "ndjson": ("ndjson", "application/x-ndjson"),
+    "pdf": ("pdf", "application/pdf"),
+}
+
+# (section, model, time column, exported columns)
+SECTIONS = [
+    ("progress", Progress, "timestamp",
+     ["weight_kg", "blood_sugar", "blood_pressure_systolic", "blood_pressure_diastolic", "notes"]),
+    ("meals", MealLog, "timestamp",
+     ["meal_type", "calories", "protein_grams", "carbs_grams", "fat_grams", "notes"]),
+    ("symptoms", SymptomLog, "timestamp", ["symptom", "severity", "notes"]),
+    ("alerts", HealthAlert, "created_at", ["alert_type", "severity", "message", "is_read"]),
+]
+
+
+def _format_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+class SectionSummary:
+    """Running count and min/max/mean of the numeric columns of a section"""
+
+    def __init__(self, columns: List[str]):
+        self.rows = 0
+        self.first_at: Optional[datetime] = None
+        self.last_at: Optional[datetime] = None
+        self.numeric: Dict[str, List[float]] = {}  # column -> [count, sum, min, max]
+        self.columns = columns
+
+    def add(self, timestamp: Optional[datetime], record: Dict[str, Any]):
+        self.rows += 1
+        if timestamp is not None:
+            self.first_at = self.first_at or timestamp
+            self.last_at = timestamp
+        for column in self.columns:
+            value = record.get(column)
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            stats = self.numeric.get(column)
+            if stats is None:
+                self.numeric[column] = [1, value, value, value]
+            else:
+                stats[0] += 1
+                stats[1] += value
+                stats[2] = min(stats[2], value)
+                stats[3] = max(stats[3], value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "rows": self.rows,
+            "first_at": _format_value(self.first_at),
+            "last_at": _format_value(self.last_at),
+            "metrics": {
+                column: {"count": n, "mean": round(total / n, 2), "min": low, "max": high}
+                for column, (n, total, low, high) in self.numeric.items()
+            }
+        }
+
+
+class CsvReportWriter:
+    """One CSV table with a section column and the union of all section columns"""
+
+    def __init__(self, fileobj):
+        self.columns = ["section", "timestamp"]
+        for _, _, _, columns in SECTIONS:
+            self.columns += [c for c in columns if c not in self.columns]
+        self.writer = csv.DictWriter(fileobj, fieldnames=self.columns, extrasaction="ignore")
+
+    def begin(self, meta: Dict[str, Any]):
+        self.writer.writeheader()
+
+    def begin_section(self, section: str, columns: List[str]):
+        pass
+
+    def row(self, section: str, record: Dict[str, Any]):
+        self.writer.writerow({"section": section, **{k: _format_value(v) for k, v in record.items()}})
+
+    def end_section(self, section: str, summary: Dict[str, Any]):
+        pass
+
+    def close(self):
+        pass
+
+
+class NdjsonReportWriter:
+    """One JSON object per line: a report header, the rows, then a summary per section"""
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+
+    def _emit(self, obj: Dict[str, Any]):
+        self.fileobj.write(json.dumps(obj, default=_format_value) + "\n")
+
+    def begin(self, meta: Dict[str, Any]):
+        self._emit({"type": "report", **meta})
+
+    def begin_section(self, section: str, columns: List[str]):
+        pass
+
+    def row(self, section: str, record: Dict[str, Any]):
+        self._emit({"type": section, **record})
+
+    def end_section(self, section: str, summary: Dict[str, Any]):
+        self._emit({"type": "section_summary", "section": section, **summary})
+
+    def close(self):
+        pass
+
+
+class PdfReportWriter:
+    """Paginated plain-text tables, one per section, followed by the section summary"""
+
+    COLUMN_WIDTH = 14
+
+    def __init__(self, fileobj):
+        self.pdf = StreamingPDFWriter(fileobj)
+
+    def begin(self, meta: Dict[str, Any]):
+        self.pdf.title = f"Health Report - {meta['user']['name'] or meta['user_id']}"
+        self.pdf.heading(self.pdf.title)
+        self.pdf.line(f"Generated: {meta['generated_at']}")
+        self.pdf.line(f"Period: {meta['since']} to {meta['until']}")
+        for key, value in meta["user"].items():
+            if value is not None:
+                self.pdf.line(f"{key.replace('_', ' ').title()}: {value}")
+        self.pdf.line()
+
+    def _cells(self, values: List[Any]) -> str:
+        cells = []
+        for value in values:
+            text = "" if value is None else str(_format_value(value))
+            cells.append(text[:self.COLUMN_WIDTH - 1].ljust(self.COLUMN_WIDTH))
+        return "".join(cells).rstrip()
+
+    def begin_section(self, section: str, columns: List[str]):
+        self.columns = columns
+        self.pdf.heading(section.title())
+        self.pdf.line("timestamp".ljust(20) + self._cells(columns))
+
+    def row(self, section: str, record: Dict[str, Any]):
+        timestamp = record["timestamp"].strftime("%Y-%m-%d %H:%M") if record["timestamp"] else ""
+        self.pdf.line(timestamp.ljust(20) + self._cells([record.get(c) for c in self.columns]))
+
+    def end_section(self, section: str, summary: Dict[str, Any]):
+        self.pdf.line(f"{summary['rows']} rows")
+        for column, stats in summary["metrics"].items():
+            self.pdf.line(f"  {column}: mean {stats['mean']}, min {stats['min']}, max {stats['max']}")
+        self.pdf.line()
+
+    def close(self):
+        self.pdf.close()
+
+
+WRITERS = {"csv": CsvReportWriter, "ndjson": NdjsonReportWriter, "pdf": PdfReportWriter}
+
+
+def iter_section_rows(db: Session, user_id: str, since: datetime, model, time_column: str,
+                      columns: List[str], chunk_size: int = EXPORT_CHUNK_SIZE):
+    """Yield (timestamp, record) for a user's rows of `model`, fetched `chunk_size` rows at a time"""
+    time_attr = getattr(model, time_column)
+    stmt = select(time_attr, *[getattr(model, c) for c in columns]).where(
+        model.user_id == user_id,
+        time_attr >= since
+    ).order_by(time_attr).execution_options(yield_per=chunk_size)
+    for row in db.execute(stmt):
+        yield row[0], dict(zip(columns, row[1:]))
+
+
+def write_report(db: Session, user_id: str, fileobj, fmt: str, days: int,
+                 chunk_size: int = EXPORT_CHUNK_SIZE) -> int:
+    """Stream a user's report in `fmt` to `fileobj`. Returns the number of data rows written."""
+    user = db.query(User).filter(User.id == user_id).first()
+    until = datetime.utcnow()
+    since = until - timedelta(days=days)
+
+    writer = WRITERS[fmt](fileobj)
+    writer.begin({
+        "user_id": user_id,
+        "generated_at": until.isoformat(),
+        "since": since.date().isoformat(),
+        "until": until.date().isoformat(),
+        "user": {
+            "name": user.full_name if user else None,
+            "age": user.age if user else None,
+            "gender": user.gender if user else None,
+            "height_cm": user.height_cm if user else None
+        }
+    })
+
+    total = 0
+    for section, model, time_column, columns in SECTIONS:
+        summary = SectionSummary(columns)
+        writer.begin_section(section, columns)
+        for timestamp, record in iter_section_rows(db, user_id, since, model, time_column, columns, chunk_size):
+            writer.row(section, {"timestamp": timestamp, **record})
+            summary.add(timestamp, record)
+        writer.end_section(section, summary.to_dict())
+        total += summary.rows
+    writer.close()
+    return total
+
+
+def create_export(db: Session, user_id: str, fmt: str, days: int) -> ReportExport:
+    """Record a pending export job; run it with run_export"""
+    export = ReportExport(user_id=user_id, format=fmt, days=days, status="pending")
+    db.add(export)
+    db.commit()
+    db.refresh(export)
+    return export
+
+
+def export_path(export: ReportExport) -> str:
+    extension, _ = EXPORT_FORMATS[export.format]
+    return os.path.join(REPORT_EXPORT_DIR, f"{export.id}.{extension}")
+
+
+def run_export(export_id: str) -> None:
+    """
+    Run a pending export job in its own session. The file is written under a
+    temporary name and moved into place only once it is complete.
+    """
+    db = SessionLocal()
+    try:
+        export = db.query(ReportExport).filter(ReportExport.id == export_id).first()
+        if export is None or export.status != "pending":
+            return
+        export.status = "running"
+        export.started_at = datetime.utcnow()
+        db.commit()
+
+        path = export_path(export)
+        partial_path = path + ".part"
+        try:
+            os.makedirs(REPORT_EXPORT_DIR, exist_ok=True)
+            if export.format == "pdf":
+                f = open(partial_path, "wb")
+            else:
+                f = open(partial_path, "w", newline="", encoding="utf-8")
+            with f:
+                rows = write_report(db, export.user_id, f, export.format, export.days)
+            os.replace(partial_path, path)
+        except Exception as e:
+            db.rollback()
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            export.status = "failed"
+            export.error = str(e)
+            export.completed_at = datetime.utcnow()
+            db.commit()
+            return
+
+        export.status = "completed"
+        export.rows_written = rows
+        export.file_path = path
+        export.completed_at = datetime.utcnow()
+        db.commit()
+    finally:
+        db.close()
+
+
+def export_status(export: ReportExport) -> Dict[str, Any]:
+    """Public view of an export job"""
+    return {
+        "export_id": export.id,
+        "user_id": export.user_id,
+        "format": export.format,
+        "days": export.days,
+        "status": export.status,
+        "rows_written": export.rows_written,
+        "error": export.error,
+        "created_at": _format_value(export.created_at),
+        "started_at": _format_value(export.started_at),
+        "completed_at": _format_value(export.completed_at)
+    }
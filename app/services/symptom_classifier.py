@@ -0,0 +1,220 @@
+"""HealthSync Symptom Classifier
+
+Classifies a logged symptom set as none, flu-like or food-intolerance with
+the random forest trained by train_symptom_model.py.
+
+The forest is stored as flat NumPy arrays (the nodes of all trees
+concatenated) written with joblib.dump(compress=0) and loaded with
+mmap_mode="r". The arrays stay pages of the file in the OS page cache, so
+every uvicorn worker on a host shares one copy instead of holding its own.
+Memory-mapping a pickled RandomForestClassifier would not help: unpickling
+a sklearn tree copies its nodes into memory owned by the process.
+
+Prediction walks every tree at once with NumPy, one level per step, and
+gives the same probabilities as RandomForestClassifier.predict_proba.
+
+The artifact is loaded once per process and reloaded when the file is
+replaced (checked at most once per SYMPTOM_MODEL_POLL_SECONDS). Artifacts in
+the old format (a pickled forest) still load, converted in memory.
+
+The symptom vocabulary is tiny, so results are memoized in a bounded LRU
+keyed by (model version, feature tuple). Symptom lists that differ only in
+order, case, duplicates or unknown names share one entry; the memo is
+cleared whenever a different model version is loaded.
+
+Configuration:
+    SYMPTOM_MODEL_PATH                 classifier artifact (default models/symptom_model.joblib)
+    SYMPTOM_MODEL_POLL_SECONDS         how often to check the file for a new model (default 5)
+    SYMPTOM_CLASSIFICATION_CACHE_SIZE  memoized symptom sets (default 1024, 0 disables)
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+import joblib
+import numpy as np
+
+from .symptom_sequences import SYMPTOM_FEATURES
+
+logger = logging.getLogger(__name__)
+
+SYMPTOM_MODEL_PATH = os.getenv("SYMPTOM_MODEL_PATH", "models/symptom_model.joblib")
+SYMPTOM_MODEL_POLL_SECONDS = float(os.getenv("SYMPTOM_MODEL_POLL_SECONDS", "5"))
+SYMPTOM_CLASSIFICATION_CACHE_SIZE = int(os.getenv("SYMPTOM_CLASSIFICATION_CACHE_SIZE", "1024"))
+
+CLASSIFICATION_MAP = {0: "none", 1: "flu-like", 2: "food-intolerance"}
+
+FLAT_FOREST_FORMAT = "flat-forest-v1"
+
+
+class FlatForest:
+    """A random forest as flat node arrays"""
+
+    ARRAYS = ("left", "right", "feature", "threshold", "value", "roots")
+
+    def __init__(self, arrays: Dict[str, np.ndarray], classes: np.ndarray, max_depth: int,
+                 features: List[str], version: str):
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+        self.classes = np.asarray(classes)
+        self.max_depth = max_depth
+        self.features = list(features)
+        self.version = version
+
+    @classmethod
+    def from_estimator(cls, forest) -> "FlatForest":
+        """Flatten a fitted RandomForestClassifier (or a single DecisionTreeClassifier)"""
+        trees = [estimator.tree_ for estimator in getattr(forest, "estimators_", [forest])]
+        offsets = np.cumsum([0] + [tree.node_count for tree in trees])
+        arrays = {
+            # Children become global node indices; leaves keep -1
+            "left": np.concatenate([np.where(t.children_left >= 0, t.children_left + o, -1) for t, o in zip(trees, offsets)]),
+            "right": np.concatenate([np.where(t.children_right >= 0, t.children_right + o, -1) for t, o in zip(trees, offsets)]),
+            "feature": np.concatenate([np.maximum(t.feature, 0) for t in trees]),
+            "threshold": np.concatenate([t.threshold for t in trees]),
+            # Class proportions per node, as DecisionTreeClassifier.predict_proba returns them
+            "value": np.concatenate([t.value[:, 0, :] / t.value[:, 0, :].sum(axis=1, keepdims=True) for t in trees]),
+            "roots": offsets[:-1],
+        }
+        arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+        digest = hashlib.sha1()
+        for name in cls.ARRAYS:
+            digest.update(arrays[name].tobytes())
+        features = list(getattr(forest, "feature_names_in_", SYMPTOM_FEATURES))
+        return cls(arrays, forest.classes_, max(tree.max_depth for tree in trees), features, digest.hexdigest()[:12])
+
+    def save(self, path: str):
+        """Write the artifact uncompressed (so it can be memory-mapped), atomically"""
+        payload = {name: getattr(self, name) for name in self.ARRAYS}
+        payload.update({
+            "format": FLAT_FOREST_FORMAT, "classes": np.asarray(self.classes), "max_depth": self.max_depth,
+            "features": self.features, "version": self.version
+        })
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        partial = f"{path}.{os.getpid()}.part"
+        joblib.dump(payload, partial, compress=0)
+        os.replace(partial, path)
+
+    @classmethod
+    def load(cls, path: str, mmap_mode: Optional[str] = "r") -> "FlatForest":
+        payload = joblib.load(path, mmap_mode=mmap_mode)
+        if isinstance(payload, dict) and payload.get("format") == FLAT_FOREST_FORMAT:
+            return cls(payload, payload["classes"], payload["max_depth"], payload["features"], payload["version"])
+        # A pickled sklearn forest: usable, but private to this process
+        logger.warning("%s is a pickled estimator; re-run train_symptom_model.py to share it between workers", path)
+        return cls.from_estimator(payload)
+
+    def predict_proba(self, X) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(len(X))[:, None]
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots))).copy()
+        for _ in range(self.max_depth):
+            left = self.left[node]
+            internal = left >= 0
+            if not internal.any():
+                break
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(internal, np.where(go_left, left, self.right[node]), node)
+        return self.value[node].mean(axis=1)
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes[self.predict_proba(X).argmax(axis=1)]
+
+
+def symptom_features(symptoms: List[str]) -> List[int]:
+    """0/1 feature vector (SYMPTOM_FEATURES order) for a list of symptom names"""
+    names = {s.lower() for s in symptoms}
+    return [1 if feature in names else 0 for feature in SYMPTOM_FEATURES]
+
+
+class SymptomClassifier:
+    """Process-wide classifier that reloads its artifact when the file changes"""
+
+    def __init__(self, path: str = SYMPTOM_MODEL_PATH, poll_seconds: float = SYMPTOM_MODEL_POLL_SECONDS,
+                 cache_size: int = SYMPTOM_CLASSIFICATION_CACHE_SIZE):
+        self.path = path
+        self.poll_seconds = poll_seconds
+        self.cache_size = cache_size
+        self._model: Optional[FlatForest] = None
+        self._stat = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[Tuple[str, Tuple[int, ...]], str]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def current(self) -> Optional[FlatForest]:
+        """The loaded model, reloading it if the artifact file was replaced"""
+        now = time.monotonic()
+        if self._model is not None and now - self._checked_at < self.poll_seconds:
+            return self._model
+        with self._lock:
+            if self._model is None or now - self._checked_at >= self.poll_seconds:
+                self._checked_at = now
+                try:
+                    stat = os.stat(self.path)
+                except FileNotFoundError:
+                    return self._model
+                key = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+                if key != self._stat:
+                    try:
+                        model = FlatForest.load(self.path)
+                        if self._model is None or model.version != self._model.version:
+                            self.clear_cache()
+                        self._model = model
+                        self._stat = key
+                    except Exception:
+                        logger.exception("Could not load symptom model from %s", self.path)
+        return self._model
+
+    def clear_cache(self):
+        with self._cache_lock:
+            self._cache.clear()
+
+    def classify_many(self, symptom_sets: List[List[str]]) -> List[str]:
+        """
+        Classify several symptom sets; "unknown" without a model. Sets not in
+        the memo are predicted together, each distinct one once.
+        """
+        model = self.current()
+        if model is None or not symptom_sets:
+            return ["unknown"] * len(symptom_sets)
+        keys = [(model.version, tuple(symptom_features(symptoms))) for symptoms in symptom_sets]
+        results: Dict[Tuple[str, Tuple[int, ...]], str] = {}
+        with self._cache_lock:
+            for key in keys:
+                if key in results:
+                    continue
+                label = self._cache.get(key)
+                if label is not None:
+                    self._cache.move_to_end(key)
+                    results[key] = label
+                    self.hits += 1
+        missing = list(dict.fromkeys(key for key in keys if key not in results))
+        if missing:
+            predicted = model.predict([features for _, features in missing])
+            with self._cache_lock:
+                for key, label in zip(missing, predicted):
+                    results[key] = CLASSIFICATION_MAP.get(int(label), "unknown")
+                    self.misses += 1
+                    if self.cache_size > 0:
+                        self._cache[key] = results[key]
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return [results[key] for key in keys]
+
+    def classify(self, symptoms: List[str]) -> str:
+        return self.classify_many([symptoms])[0]
+
+
+# Process-wide classifier
+symptom_classifier = SymptomClassifier()
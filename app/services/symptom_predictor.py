@@ -1,63 +1,166 @@
-# app/services/symptom_predictor.py
+"""HealthSync Symptom Forecasting
+
+Forecasts a user's symptom classification (none, flu-like, food-intolerance)
+for the coming days from their recent daily symptom history.
+
+Symptom logs are turned into a daily grid per user with one row of
+DAY_FEATURES per day (the four tracked symptoms, the day's peak severity and
+whether anything was logged) by symptom_sequences. The model is a small
+scikit-learn MLP over the last SEQUENCE_LENGTH days, flattened, predicting
+the next day's class. Longer horizons are rolled forward one day at a time,
+feeding each predicted day back into the window.
+
+Inference is batched: a forecast for many users runs one forward pass per
+forecast day over all of them. Models live in a ModelRegistry, so each
+process loads a version once and swaps in newer versions as they are
+published.
+
+Training is incremental. Each artifact records the day its training data
+ends (trained_until); the next run only reads days after it and continues
+training a copy of the current network with partial_fit. Only complete days
+are used, so today's logs are picked up by the first run tomorrow. Training
+runs in the training_worker process, never in the API workers.
+
+Configuration:
+    SYMPTOM_FORECAST_MODEL_DIR           versioned artifacts (default models/symptom_forecaster)
+    SYMPTOM_FORECAST_POLL_SECONDS        how often to check for a newer version (default 5)
+    SYMPTOM_FORECAST_EPOCHS              epochs for a training run from scratch (default 50)
+    SYMPTOM_FORECAST_INCREMENTAL_EPOCHS  epochs over new data in an incremental run (default 5)
+"""
+
+import copy
+import os
+from datetime import datetime, timedelta, time
+from typing import List, Dict, Any, Tuple, Optional, Callable
 import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
-import os
-import json
-from typing import List, Dict, Any, Tuple, Optional
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from random import choice, random
+from sklearn.neural_network import MLPClassifier
 
-from .. import crud, models, schemas
+from ..models.symptom_log import SymptomLog
+from . import symptom_sequences
+from .model_registry import ModelRegistry
+from .symptom_sequences import SYMPTOM_FEATURES, DAY_FEATURES, SEVERITY, LOGGED, classify_days
 
 # Constants
-SYMPTOM_FEATURES = ['fever', 'nausea', 'bloating', 'headache']
+CLASSES = ["none", "flu-like", "food-intolerance"]
+SEQUENCE_LENGTH = 14
+
+# Days with at least one log needed inside the window to forecast
+MIN_LOGGED_DAYS = 3
+
+# Fewer new windows than this are left for the next run
+MIN_TRAINING_WINDOWS = 10
+
+SYMPTOM_FORECAST_MODEL_DIR = os.getenv("SYMPTOM_FORECAST_MODEL_DIR", "models/symptom_forecaster")
+SYMPTOM_FORECAST_POLL_SECONDS = float(os.getenv("SYMPTOM_FORECAST_POLL_SECONDS", "5"))
+SYMPTOM_FORECAST_EPOCHS = int(os.getenv("SYMPTOM_FORECAST_EPOCHS", "50"))
+SYMPTOM_FORECAST_INCREMENTAL_EPOCHS = int(os.getenv("SYMPTOM_FORECAST_INCREMENTAL_EPOCHS", "5"))
+
+# Symptoms a forecast day is assumed to have when fed back into the window
+CLASS_SYMPTOMS = {
+    "none": [],
+    "flu-like": ["fever", "headache"],
+    "food-intolerance": ["nausea", "bloating"]
+}
+
 
 class SymptomPredictor:
-    """Mock symptom predictor for testing without TensorFlow"""
-    def __init__(self):
-        self.is_model_loaded = True
-        print("Using mock symptom predictor for testing")
-        
-    def load_model(self):
-        """Mock model loading for testing"""
-        self.is_model_loaded = True
-        return True
-        
+    """Symptom forecaster over daily symptom windows"""
+
+    SYMPTOM_FEATURES = SYMPTOM_FEATURES
+    SEQUENCE_LENGTH = SEQUENCE_LENGTH
+
+    def __init__(self, registry: Optional[ModelRegistry] = None):
+        self.registry = registry or ModelRegistry(SYMPTOM_FORECAST_MODEL_DIR, SYMPTOM_FORECAST_POLL_SECONDS)
+
+    @property
+    def is_model_loaded(self) -> bool:
+        return self.registry.current() is not None
+
+    def load_model(self) -> bool:
+        """Load the current model version. Returns False if none has been trained."""
+        return self.registry.current() is not None
+
+    def _load_logs(self, db: Session, user_id: str, since: datetime) -> list:
+        query = (
+            select(SymptomLog.user_id, SymptomLog.symptom, SymptomLog.severity, SymptomLog.timestamp)
+            .where(SymptomLog.user_id == user_id, SymptomLog.timestamp >= since)
+            .order_by(SymptomLog.timestamp)
+        )
+        return db.execute(query).all()
+
     def preprocess_symptom_data(self, db: Session, user_id: str, days: int = 30) -> Tuple[np.ndarray, np.ndarray]:
-        """Mock preprocessing for testing"""
-        # Get user's symptom history
-        symptoms = crud.get_user_symptoms(db, user_id, days=days)
-        
-        if not symptoms:
+        """Training windows and next-day labels from one user's last `days` days"""
+        X, y, _ = symptom_sequences.build_training_set(
+            db, [user_id], SEQUENCE_LENGTH, since=datetime.utcnow() - timedelta(days=days)
+        )
+        if len(X) == 0:
             return None, None
-        
-        # For mock implementation, just return dummy data
-        return np.array([1]), np.array([1])
-    
-    def _create_sequences(self, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
-        """Mock sequence creation for testing"""
-        return np.array([1]), np.array([1])
-        
+        return X, y
+
+    def _forecast_day(self, artifact: Dict[str, Any], predicted: np.ndarray) -> np.ndarray:
+        """DAY_FEATURES rows for predicted class indices, to extend the windows with"""
+        rows = np.zeros((len(predicted), len(DAY_FEATURES)), np.float32)
+        for index, name in enumerate(CLASSES):
+            mask = predicted == index
+            for symptom in CLASS_SYMPTOMS[name]:
+                rows[mask, SYMPTOM_FEATURES.index(symptom)] = 1.0
+            rows[mask, SEVERITY] = artifact["class_severity"][index]
+        rows[:, LOGGED] = 1.0
+        return rows
+
+    def predict_batch(self, db: Session, user_ids: List[str], days_ahead: int = 7) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Forecast the next `days_ahead` days for many users, with one forward
+        pass per forecast day. Users without enough recent history get a
+        single {"error": ...} entry.
+        """
+        # One version for the whole call, even if a new one is swapped in meanwhile
+        artifact = self.registry.current()
+        if artifact is None:
+            return {user_id: [{"error": "Model not trained"}] for user_id in user_ids}
+
+        today = datetime.utcnow().date()
+        users, windows = symptom_sequences.latest_windows(db, user_ids, SEQUENCE_LENGTH, today)
+        enough = windows[:, :, LOGGED].sum(axis=1) >= MIN_LOGGED_DAYS
+        ready = list(users[enough])
+        batch = np.ascontiguousarray(windows[enough])
+
+        ready_ids = set(ready)
+        results = {user_id: [{"error": "Not enough symptom history for prediction"}]
+                   for user_id in user_ids if user_id not in ready_ids}
+        if not ready:
+            return results
+
+        model = artifact["model"]
+        forecasts = {user_id: [] for user_id in ready}
+        for step in range(days_ahead):
+            probabilities = model.predict_proba(batch.reshape(len(batch), -1))
+            predicted = model.classes_[probabilities.argmax(axis=1)]
+            confidence = probabilities.max(axis=1)
+            date = (today + timedelta(days=step + 1)).strftime("%Y-%m-%d")
+            for row, user_id in enumerate(ready):
+                classification = CLASSES[predicted[row]]
+                forecasts[user_id].append({
+                    "date": date,
+                    "predicted_classification": classification,
+                    "confidence": round(float(confidence[row]), 4),
+                    "possible_symptoms": self._suggest_possible_symptoms(classification)
+                })
+            batch = np.concatenate([batch[:, 1:], self._forecast_day(artifact, predicted)[:, None, :]], axis=1)
+
+        results.update(forecasts)
+        return results
+
+    def predict_future_symptoms(self, db: Session, user_id: str, days_ahead: int = 7) -> List[Dict[str, Any]]:
+        """Forecast the next `days_ahead` days for one user"""
+        return self.predict_batch(db, [user_id], days_ahead)[user_id]
+
     def predict(self, db: Session, user_id: str, days_to_predict: int = 7) -> List[Dict[str, Any]]:
-        """Mock prediction for testing"""
-        predictions = []
-        
-        # Generate mock predictions
-        for i in range(days_to_predict):
-            pred_date = datetime.now() + timedelta(days=i+1)
-            pred_class = choice(["flu-like", "food-intolerance", "none"])
-            pred_confidence = random() * 0.5 + 0.5  # Random confidence between 0.5 and 1.0
-            
-            predictions.append({
-                "date": pred_date.strftime("%Y-%m-%d"),
-                "predicted_classification": pred_class,
-                "confidence": pred_confidence,
-                "possible_symptoms": self._suggest_possible_symptoms(pred_class)
-            })
-        
-        return predictions
-    
+        return self.predict_future_symptoms(db, user_id, days_to_predict)
+
     def _suggest_possible_symptoms(self, classification: str) -> List[str]:
         """Suggest possible symptoms based on the predicted classification"""
         if classification == "flu-like":
@@ -66,20 +169,125 @@ class SymptomPredictor:
             return ["nausea", "bloating", "stomach pain", "indigestion"]
         else:  # "none"
             return []
-    
-    def analyze_symptom_patterns(self, db: Session, user_id: str) -> Dict[str, Any]:
-        """Mock symptom pattern analysis for testing"""
+
+    def analyze_symptom_patterns(self, db: Session, user_id: str, days: int = 90) -> Dict[str, Any]:
+        """Symptom frequencies and severity trend over the user's recent logs"""
+        rows = self._load_logs(db, user_id, datetime.utcnow() - timedelta(days=days))
+        if len(rows) < MIN_LOGGED_DAYS:
+            return {"message": "Not enough symptom history for analysis"}
+        logs = pd.DataFrame(rows, columns=["user_id", "symptom", "severity", "timestamp"])
+
+        frequency = (
+            logs["symptom"].fillna("").str.lower().str.split(",").explode().str.strip()
+            .replace("", np.nan).dropna().value_counts()
+        )
+        elapsed = (pd.to_datetime(logs["timestamp"]) - pd.to_datetime(logs["timestamp"]).iloc[0]).dt.total_seconds() / 86400.0
+        severity = logs["severity"].fillna(0).to_numpy(dtype=float)
+        slope = float(np.polyfit(elapsed, severity, 1)[0]) if elapsed.iloc[-1] > 0 else 0.0
+        trend = "increasing" if slope > 0.05 else "decreasing" if slope < -0.05 else "stable"
+
+        grid, _ = symptom_sequences.daily_grid(symptom_sequences.columns_from_rows(rows), forward_fill_days=0)
+        logged_days = grid[0][grid[0, :, LOGGED] > 0]
+        classes = pd.Series(classify_days(logged_days[:, :SEVERITY])).map(dict(enumerate(CLASSES)))
+        dominant = classes.value_counts().idxmax()
+
+        insights = []
+        if len(frequency):
+            insights.append(f"Most frequent symptom: {frequency.index[0]} ({int(frequency.iloc[0])} logs)")
+        if dominant != "none":
+            insights.append(f"Most logged days match a {dominant} pattern")
+        recommendations = []
+        if trend == "increasing":
+            recommendations.append("Severity is rising; consider consulting a healthcare provider")
+        if dominant == "food-intolerance":
+            recommendations.append("Review meals logged before symptom days for possible triggers")
+
+        return {
+            "total_logs": int(len(logs)),
+            "symptom_frequency": {symptom: int(count) for symptom, count in frequency.items()},
+            "severity_trend": {"trend": trend, "slope_per_day": round(slope, 4)},
+            "dominant_pattern": dominant,
+            "insights": insights,
+            "recommendations": recommendations
+        }
+
+    def train(self, db: Session, user_ids: Optional[List[str]] = None, full: bool = False,
+              epochs: Optional[int] = None, batch_size: int = 32, until: Optional[datetime] = None,
+              progress: Optional[Callable[[int, int, float], None]] = None) -> Dict[str, Any]:
+        """
+        Train on the days after the current version's trained_until (all
+        history when there is no version yet or `full` is set) up to `until`
+        (default: the start of today), then publish the result as a new version.
+        `progress(epoch, epochs, loss)` is called after every epoch.
+        """
+        current = None if full else self.registry.current()
+        since = current["trained_until"] if current is not None else None
+        until = until or datetime.combine(datetime.utcnow().date(), time.min)
+        if since is not None and since >= until:
+            return {"success": True, "message": "Model is up to date", "version": self.registry.version, "samples": 0}
+
+        X, y, day_rows = symptom_sequences.build_training_set(db, user_ids, SEQUENCE_LENGTH, since=since, until=until)
+        if len(X) < MIN_TRAINING_WINDOWS:
+            return {"success": False, "message": f"Only {len(X)} new training windows, need at least {MIN_TRAINING_WINDOWS}",
+                    "version": self.registry.version, "samples": int(len(X))}
+
+        if current is not None:
+            # Keep training a copy; the registered model keeps serving until the swap
+            model = copy.deepcopy(current["model"])
+            epochs = epochs or SYMPTOM_FORECAST_INCREMENTAL_EPOCHS
+        else:
+            model = MLPClassifier(hidden_layer_sizes=(32,), batch_size=batch_size, random_state=0)
+            epochs = epochs or SYMPTOM_FORECAST_EPOCHS
+
+        # Hold out a random fifth of the new windows for validation
+        order = np.random.default_rng(0).permutation(len(X))
+        split = int(len(X) * 0.8)
+        train, val = order[:split], order[split:]
+        X_train, X_val = X[train].reshape(len(train), -1), X[val].reshape(len(val), -1)
+        classes = np.arange(len(CLASSES))
+        for epoch in range(1, epochs + 1):
+            model.partial_fit(X_train, y[train], classes=classes)
+            if progress is not None:
+                progress(epoch, epochs, float(model.loss_))
+
+        # Running per-class severity, given to forecast days when rolling forward
+        day_classes = classify_days(day_rows[:, :SEVERITY])
+        class_days = np.bincount(day_classes, minlength=len(CLASSES)).astype(float)
+        class_severity_sum = np.bincount(day_classes, weights=day_rows[:, SEVERITY], minlength=len(CLASSES))
+        if current is not None:
+            class_days += current["class_days"]
+            class_severity_sum += current["class_severity_sum"]
+
+        artifact = {
+            "model": model,
+            "features": DAY_FEATURES,
+            "sequence_length": SEQUENCE_LENGTH,
+            "class_days": class_days,
+            "class_severity_sum": class_severity_sum,
+            "class_severity": list(np.divide(class_severity_sum, class_days, out=np.zeros(len(CLASSES)), where=class_days > 0)),
+            "trained_from": since,
+            "trained_until": until,
+            "trained_at": datetime.utcnow(),
+            "parent_version": self.registry.version if current is not None else None,
+            "samples": int(len(X)) + (current["samples"] if current is not None else 0)
+        }
+        version = self.registry.publish(artifact)
+
         return {
-            "message": "Symptom pattern analysis",
-            "common_symptoms": ["headache", "nausea"],
-            "symptom_frequency": {"headache": 0.7, "nausea": 0.4},
-            "severity_trend": "decreasing",
-            "possible_triggers": ["stress", "certain foods"]
+            "success": True,
+            "version": version,
+            "incremental": current is not None,
+            "accuracy": float(model.score(X_train, y[train])),
+            "val_accuracy": float(model.score(X_val, y[val])) if len(val) else 0.0,
+            "epochs_trained": epochs,
+            "samples": int(len(X))
         }
-    
-    def train_model(self, db: Session, user_ids: List[str], epochs: int = 50, batch_size: int = 32) -> Dict[str, Any]:
-        """Mock training function for testing"""
-        return {"success": True, "message": "Mock model training completed"}
+
+    def train_model(self, db: Session, user_ids: List[str], epochs: int = SYMPTOM_FORECAST_EPOCHS,
+                    batch_size: int = 32) -> Dict[str, Any]:
+        """Retrain from scratch on the full history of the given users"""
+        return self.train(db, user_ids, full=True, epochs=epochs, batch_size=batch_size)
+
 
 # Create an instance of the predictor
-symptom_predictor = SymptomPredictor()
\ No newline at end of file
+symptom_predictor = SymptomPredictor()
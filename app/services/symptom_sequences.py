@@ -0,0 +1,222 @@
+"""HealthSync Symptom Sequences
+
+Turns symptom logs into the fixed-length daily windows used by the symptom
+forecaster, for training and online inference alike, without per-user or
+per-day Python loops.
+
+Logs for any number of users are loaded as one set of columns (user code,
+day number, symptom flags, severity). They are aggregated onto a dense
+(users, days, DAY_FEATURES) grid with one sort and reduceat: flags and
+severity take the day's maximum, and a logged marker records which days had
+logs. Days without logs carry the previous logged day's flags and severity
+forward for up to FORWARD_FILL_DAYS days. Windows over the grid are strided
+views, so only the windows that are actually selected get copied.
+
+Configuration:
+    SYMPTOM_FORWARD_FILL_DAYS   days a logged day carries forward (default 2)
+"""
+
+import os
+from datetime import datetime, date, timedelta
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..models.symptom_log import SymptomLog
+
+SYMPTOM_FEATURES = ['fever', 'nausea', 'bloating', 'headache']
+DAY_FEATURES = SYMPTOM_FEATURES + ['severity', 'logged']
+SEVERITY = len(SYMPTOM_FEATURES)
+LOGGED = len(SYMPTOM_FEATURES) + 1
+
+EPOCH = datetime(1970, 1, 1)
+
+FORWARD_FILL_DAYS = int(os.getenv("SYMPTOM_FORWARD_FILL_DAYS", "2"))
+
+
+def classify_days(flags: np.ndarray) -> np.ndarray:
+    """
+    Label days from their symptom flags (..., SYMPTOM_FEATURES), using the
+    same rule the symptom classifier was trained on.
+    """
+    fever, nausea, bloating, headache = (flags[..., i] > 0 for i in range(len(SYMPTOM_FEATURES)))
+    return np.where(fever & headache, 1, np.where(nausea | bloating, 2, 0))
+
+
+def day_number(value) -> int:
+    """Days since the epoch for a date, datetime or timestamp"""
+    return int(np.datetime64(pd.Timestamp(value).date(), "D").astype(np.int64))
+
+
+def load_columns(db: Session, user_ids: Optional[List[str]] = None, since: Optional[datetime] = None,
+                 until: Optional[datetime] = None) -> Dict[str, np.ndarray]:
+    """
+    Symptom logs as columns:
+        users     distinct user ids, sorted
+        user      index into users for every log
+        day       day number of every log
+        flags     (logs, SYMPTOM_FEATURES) 0/1 flags
+        severity  severity scaled to 0..1
+    """
+    query = select(SymptomLog.user_id, SymptomLog.symptom, SymptomLog.severity, SymptomLog.timestamp)
+    if user_ids is not None:
+        query = query.where(SymptomLog.user_id.in_(user_ids))
+    if since is not None:
+        query = query.where(SymptomLog.timestamp >= since)
+    if until is not None:
+        query = query.where(SymptomLog.timestamp < until)
+    rows = db.execute(query).all()
+    return columns_from_rows(rows)
+
+
+def columns_from_rows(rows) -> Dict[str, np.ndarray]:
+    """Build the column set from (user_id, symptom, severity, timestamp) rows"""
+    if not rows:
+        return {
+            "users": np.empty(0, dtype=object), "user": np.empty(0, np.int64), "day": np.empty(0, np.int64),
+            "flags": np.empty((0, len(SYMPTOM_FEATURES)), np.float32), "severity": np.empty(0, np.float32)
+        }
+    user_ids, symptoms, severities, timestamps = zip(*rows)
+    users, user = np.unique(np.array(user_ids, dtype=object), return_inverse=True)
+    lowered = pd.Series(symptoms, dtype=object).fillna("").str.lower()
+    flags = np.stack([
+        lowered.str.contains(rf"(?:^|,)\s*{name}\s*(?:,|$)").to_numpy()
+        for name in SYMPTOM_FEATURES
+    ], axis=1).astype(np.float32)
+    severity = pd.Series(severities, dtype=float).fillna(0).clip(0, 10).to_numpy(dtype=np.float32) / 10.0
+    day = pd.to_datetime(pd.Series(timestamps)).to_numpy().astype("datetime64[D]").astype(np.int64)
+    return {"users": users, "user": user.astype(np.int64), "day": day, "flags": flags, "severity": severity}
+
+
+def daily_grid(columns: Dict[str, np.ndarray], first_day: Optional[int] = None, last_day: Optional[int] = None,
+               forward_fill_days: int = FORWARD_FILL_DAYS) -> Tuple[np.ndarray, int]:
+    """
+    Aggregate the columns onto a (users, days, DAY_FEATURES) grid covering
+    first_day..last_day (default: the span of the logs). Logs outside the
+    span are ignored. Returns (grid, first_day).
+    """
+    day = columns["day"]
+    if first_day is None:
+        first_day = int(day.min()) if len(day) else 0
+    if last_day is None:
+        last_day = int(day.max()) if len(day) else first_day
+    n_users, n_days = len(columns["users"]), last_day - first_day + 1
+    grid = np.zeros((n_users, n_days, len(DAY_FEATURES)), np.float32)
+
+    inside = (day >= first_day) & (day <= last_day)
+    if inside.any():
+        # One row per log, sorted by (user, day), then the maximum per cell
+        cell = columns["user"][inside] * n_days + (day[inside] - first_day)
+        values = np.concatenate([
+            columns["flags"][inside], columns["severity"][inside, None], np.ones((int(inside.sum()), 1), np.float32)
+        ], axis=1)
+        order = np.argsort(cell, kind="stable")
+        cell, values = cell[order], values[order]
+        starts = np.flatnonzero(np.r_[True, cell[1:] != cell[:-1]])
+        grid.reshape(-1, len(DAY_FEATURES))[cell[starts]] = np.maximum.reduceat(values, starts, axis=0)
+
+    if forward_fill_days > 0:
+        forward_fill(grid, forward_fill_days)
+    return grid, first_day
+
+
+def forward_fill(grid: np.ndarray, limit: int):
+    """
+    Copy each logged day's flags and severity into the following unlogged
+    days, at most `limit` days ahead. The logged marker is left untouched.
+    """
+    n_days = grid.shape[1]
+    positions = np.arange(n_days)
+    last_logged = np.where(grid[:, :, LOGGED] > 0, positions, -1)
+    np.maximum.accumulate(last_logged, axis=1, out=last_logged)
+    fill = (last_logged >= 0) & (last_logged != positions) & (positions - last_logged <= limit)
+    if fill.any():
+        users, days = np.nonzero(fill)
+        grid[users, days, :LOGGED] = grid[users, last_logged[users, days], :LOGGED]
+
+
+def sliding_windows(grid: np.ndarray, length: int) -> np.ndarray:
+    """
+    Read-only strided view (users, days - length + 1, length, DAY_FEATURES)
+    of every window of `length` consecutive days
+    """
+    n_users, n_days, n_features = grid.shape
+    count = max(n_days - length + 1, 0)
+    user_stride, day_stride, feature_stride = grid.strides
+    return np.lib.stride_tricks.as_strided(
+        grid, shape=(n_users, count, length, n_features),
+        strides=(user_stride, day_stride, day_stride, feature_stride), writeable=False
+    )
+
+
+def training_windows(grid: np.ndarray, length: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Windows of `length` days and the class of the day after each, kept only
+    where that next day was actually logged. Returns (X, y) with X shaped
+    (samples, length, DAY_FEATURES).
+    """
+    if grid.shape[1] <= length:
+        return np.empty((0, length, len(DAY_FEATURES)), np.float32), np.empty(0, np.int64)
+    windows = sliding_windows(grid[:, :-1], length)
+    following = grid[:, length:]
+    labels = classify_days(following[..., :SEVERITY])
+    keep = following[..., LOGGED] > 0
+    return windows[keep], labels[keep]
+
+
+def build_training_set(db: Session, user_ids: Optional[List[str]], length: int, since: Optional[datetime] = None,
+                       until: Optional[datetime] = None, users_per_chunk: int = 2000) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Training windows for the given users (all users when None). Users are
+    gridded in chunks so the dense grid stays small. Windows may start up
+    to `length` days before `since`, so the first new day keeps its context.
+    Returns (X, y, grid_rows) where grid_rows are the logged day rows seen,
+    used for per-class statistics.
+    """
+    context_since = since - timedelta(days=length + FORWARD_FILL_DAYS) if since is not None else None
+    columns = load_columns(db, user_ids, context_since, until)
+    first_target = day_number(since) if since is not None else None
+
+    X_parts, y_parts, day_parts = [], [], []
+    for start in range(0, len(columns["users"]), users_per_chunk):
+        chunk = (columns["user"] >= start) & (columns["user"] < start + users_per_chunk)
+        chunk_columns = {
+            "users": columns["users"][start:start + users_per_chunk],
+            "user": columns["user"][chunk] - start,
+            "day": columns["day"][chunk],
+            "flags": columns["flags"][chunk],
+            "severity": columns["severity"][chunk]
+        }
+        # Start the grid `length` days early so the first log can be a target
+        first_day = int(chunk_columns["day"].min()) - length
+        grid, first_day = daily_grid(chunk_columns, first_day=first_day)
+        if first_target is not None:
+            # Only targets on or after `since`: drop windows whose next day is earlier
+            offset = max(first_target - first_day - length, 0)
+            grid = grid[:, offset:]
+        X, y = training_windows(grid, length)
+        X_parts.append(X)
+        y_parts.append(y)
+        day_parts.append(grid[grid[:, :, LOGGED] > 0])
+
+    if not X_parts:
+        empty = np.empty((0, length, len(DAY_FEATURES)), np.float32)
+        return empty, np.empty(0, np.int64), np.empty((0, len(DAY_FEATURES)), np.float32)
+    return np.concatenate(X_parts), np.concatenate(y_parts), np.concatenate(day_parts)
+
+
+def latest_windows(db: Session, user_ids: List[str], length: int,
+                   today: Optional[date] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    The window of `length` days ending today for each user that has logs in
+    it. Returns (users, windows) with windows shaped (users, length, DAY_FEATURES).
+    """
+    last_day = day_number(today or datetime.utcnow())
+    # Load a few extra days so forward fill reaches into the window
+    first_day = last_day - length + 1 - FORWARD_FILL_DAYS
+    since = EPOCH + timedelta(days=first_day)
+    columns = load_columns(db, user_ids, since)
+    grid, _ = daily_grid(columns, first_day=first_day, last_day=last_day)
+    return columns["users"], grid[:, -length:]
@@ -0,0 +1,329 @@
+"""HealthSync Synthetic Data
+
+Generates users, meal logs, symptom logs and progress readings at scale
+for load testing and for training the symptom models.
+
+Everything is drawn with a seeded NumPy generator, one block of users at a
+time, and written with PostgreSQL COPY (or a driver executemany on other
+databases) in batches, so millions of rows never exist as ORM objects. The
+same seed, start date, user count, day count and block size always produce
+the same rows.
+
+The data has planted causal links so correlation features can be checked
+against a known answer:
+    - each user may be sensitive to dairy, gluten or nuts (recorded in
+      medical_conditions as "<tag> sensitivity"); meals containing a food
+      with that tag are followed 1-6 hours later by nausea/bloating with
+      probability TRIGGER_REACTION_RATE
+    - flu episodes of 3-7 days produce daily fever/headache logs
+    - a low rate of unrelated headache/fatigue logs is added as noise
+
+Derived tables (daily rollups, progress series) are not filled in; rebuild
+them if a test relies on them.
+
+Run from the command line with:
+    python -m app.services.synthetic_data --users 100000 --days 90 --seed 42
+"""
+
+import csv
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+
+from ..models.user import User
+from ..models.meal_log import MealLog
+from ..models.symptom_log import SymptomLog
+from ..models.progress import Progress
+from .bulk_write import write_rows
+from .password_hasher import pwd_context
+
+# Users generated and written per transaction
+CHUNK_USERS = 1000
+
+SYNTHETIC_PASSWORD = "synthetic-password"
+SENSITIVITY_TAGS = ["dairy", "gluten", "nuts"]
+SENSITIVITY_RATES = [0.15, 0.10, 0.05]
+TRIGGER_REACTION_RATE = 0.7
+FLU_EPISODES_PER_YEAR = 3.0
+NOISE_SYMPTOM_RATE = 0.03
+
+# (meal_type, probability per day, hour)
+MEAL_SLOTS = [("breakfast", 0.9, 8), ("lunch", 0.85, 13), ("dinner", 0.9, 19), ("snack", 0.4, 16)]
+
+# Used when data/food_sample.csv is not available
+DEFAULT_FOODS = [
+    ("Oats", 100, 389, 16.9, 6.9, 66.3, "vegetarian;gluten"),
+    ("Milk (whole)", 100, 61, 3.2, 3.3, 4.8, "dairy"),
+    ("Apple", 150, 52, 0.3, 0.2, 14, "vegan;fruit"),
+    ("Egg (boiled)", 50, 155, 13, 11, 1.1, "vegetarian"),
+    ("Chicken breast", 100, 165, 31, 3.6, 0, "meat;high-protein"),
+    ("Brown rice", 100, 111, 2.6, 0.9, 23, "vegan;grain"),
+    ("Broccoli", 91, 55, 3.7, 0.6, 11.1, "vegan;veg"),
+    ("Peanut butter", 32, 588, 25, 50, 20, "vegan;nuts"),
+]
+
+TRIGGER_SYMPTOMS = ["nausea", "bloating", "nausea,bloating", "bloating,stomach pain"]
+FLU_SYMPTOMS = ["fever,headache", "fever,headache,fatigue", "fever", "headache,fatigue"]
+NOISE_SYMPTOMS = ["headache", "fatigue", "dizziness"]
+
+TABLE_COLUMNS = {
+    User.__tablename__: [
+        "id", "username", "email", "hashed_password", "full_name", "age", "gender", "height_cm",
+        "weight_kg", "medical_conditions", "allergies", "medications", "created_at", "updated_at"
+    ],
+    MealLog.__tablename__: [
+        "id", "user_id", "meal_type", "food_items", "calories", "protein_grams", "carbs_grams",
+        "fat_grams", "notes", "timestamp"
+    ],
+    SymptomLog.__tablename__: ["id", "user_id", "symptom", "severity", "notes", "timestamp"],
+    Progress.__tablename__: [
+        "id", "user_id", "weight_kg", "blood_sugar", "blood_pressure_systolic",
+        "blood_pressure_diastolic", "notes", "timestamp"
+    ],
+}
+
+
+def load_foods(path: str = "data/food_sample.csv") -> List[Tuple]:
+    """Food catalog rows (name, serving_g, kcal/100g, protein, fat, carbs, tags)"""
+    if not os.path.exists(path):
+        return DEFAULT_FOODS
+    with open(path, newline="") as f:
+        return [
+            (row["name"], float(row["serving_g"]), float(row["calories_per_100g"]), float(row["protein_g_per_100g"]),
+             float(row["fat_g_per_100g"]), float(row["carbs_g_per_100g"]), row.get("tags") or "")
+            for row in csv.DictReader(f)
+        ]
+
+
+def _classification(symptom: str) -> str:
+    names = set(symptom.split(","))
+    if "fever" in names and "headache" in names:
+        return "flu-like"
+    if "nausea" in names or "bloating" in names:
+        return "food-intolerance"
+    return "none"
+
+
+def _ids(rng: np.random.Generator, n: int) -> List[str]:
+    raw = rng.bytes(16 * n).hex()
+    return [raw[i:i + 32] for i in range(0, 32 * n, 32)]
+
+
+def _timestamps(start: np.datetime64, day: np.ndarray, minutes: np.ndarray) -> list:
+    return (start + day.astype("timedelta64[D]") + minutes.astype("timedelta64[m]")).astype("datetime64[us]").tolist()
+
+
+def _expand(user: np.ndarray, first: np.ndarray, length: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(user, day) pairs covering first..first+length-1 for every episode"""
+    user = np.repeat(user, length)
+    offsets = np.arange(len(user)) - np.repeat(np.cumsum(length) - length, length)
+    return user, np.repeat(first, length) + offsets
+
+
+def generate_chunk(rng: np.random.Generator, first_user: int, n_users: int, days: int, start: datetime,
+                   foods: List[Tuple], seed: int, password_hash: str) -> Dict[str, List[list]]:
+    """Columns for every table for users first_user..first_user+n_users-1"""
+    start64 = np.datetime64(start, "m")
+    numbers = np.arange(first_user, first_user + n_users)
+    user_ids = _ids(rng, n_users)
+    user_index = np.array(user_ids, dtype=object)
+
+    # Users
+    gender = rng.choice(["female", "male", "other"], size=n_users, p=[0.49, 0.49, 0.02])
+    height = np.round(np.where(gender == "male", rng.normal(177, 7, n_users), rng.normal(164, 7, n_users)), 1)
+    bmi = rng.normal(26, 4, n_users).clip(17, 45)
+    weight = np.round(bmi * (height / 100) ** 2, 1)
+    sensitive = rng.random((n_users, len(SENSITIVITY_TAGS))) < np.array(SENSITIVITY_RATES)
+    diabetic = rng.random(n_users) < 0.08
+    conditions = [
+        ";".join([f"{tag} sensitivity" for tag, on in zip(SENSITIVITY_TAGS, row) if on] + (["type 2 diabetes"] if d else []))
+        or None
+        for row, d in zip(sensitive.tolist(), diabetic.tolist())
+    ]
+    created = [start] * n_users
+    users = [
+        user_ids,
+        [f"synthetic_{seed}_{i}" for i in numbers.tolist()],
+        [f"synthetic_{seed}_{i}@example.com" for i in numbers.tolist()],
+        [password_hash] * n_users,
+        [f"Synthetic User {i}" for i in numbers.tolist()],
+        rng.integers(18, 85, n_users).tolist(),
+        gender.tolist(),
+        height.tolist(),
+        weight.tolist(),
+        conditions,
+        [None] * n_users,
+        [None] * n_users,
+        created,
+        created,
+    ]
+
+    # Meals: each logged slot has two foods at 0.5-2 servings each
+    food_names = [food[0] for food in foods]
+    serving = np.array([food[1] for food in foods])
+    per_100g = np.array([food[2:6] for food in foods])  # kcal, protein, fat, carbs
+    food_tags = np.array([[tag in food[6].split(";") for tag in SENSITIVITY_TAGS] for food in foods])
+
+    meal_user, meal_day, meal_minute, meal_type = [], [], [], []
+    for slot, probability, hour in MEAL_SLOTS:
+        user, day = np.nonzero(rng.random((n_users, days)) < probability)
+        meal_user.append(user)
+        meal_day.append(day)
+        meal_minute.append(hour * 60 + rng.integers(-45, 46, len(user)))
+        meal_type.append(np.full(len(user), slot, dtype=object))
+    meal_user, meal_day = np.concatenate(meal_user), np.concatenate(meal_day)
+    meal_minute, meal_type = np.concatenate(meal_minute), np.concatenate(meal_type)
+    n_meals = len(meal_user)
+
+    choice = rng.integers(0, len(foods), (n_meals, 2))
+    servings = np.round(rng.uniform(0.5, 2.0, (n_meals, 2)) * 2) / 2
+    grams = serving[choice] * servings
+    macros = (grams[..., None] * per_100g[choice] / 100.0).sum(axis=1).round(1)
+    food_items = [
+        json.dumps([{"name": food_names[a], "grams": float(ga)}, {"name": food_names[b], "grams": float(gb)}])
+        for (a, b), (ga, gb) in zip(choice.tolist(), grams.tolist())
+    ]
+    meals = [
+        _ids(rng, n_meals), user_index[meal_user].tolist(), meal_type.tolist(), food_items,
+        macros[:, 0].tolist(), macros[:, 1].tolist(), macros[:, 3].tolist(), macros[:, 2].tolist(),
+        [None] * n_meals, _timestamps(start64, meal_day, meal_minute)
+    ]
+
+    # Symptoms caused by trigger foods
+    triggered = ((food_tags[choice[:, 0]] | food_tags[choice[:, 1]]) & sensitive[meal_user]).any(axis=1)
+    reacts = triggered & (rng.random(n_meals) < TRIGGER_REACTION_RATE)
+    trigger_user, trigger_day = meal_user[reacts], meal_day[reacts]
+    trigger_minute = meal_minute[reacts] + rng.integers(60, 361, int(reacts.sum()))
+    trigger_symptom = rng.choice(TRIGGER_SYMPTOMS, len(trigger_user))
+    trigger_severity = rng.integers(3, 8, len(trigger_user))
+
+    # Flu episodes
+    episodes = rng.poisson(FLU_EPISODES_PER_YEAR * days / 365.0, n_users)
+    episode_user = np.repeat(np.arange(n_users), episodes)
+    flu_user, flu_day = _expand(
+        episode_user, rng.integers(0, max(days, 1), len(episode_user)), rng.integers(3, 8, len(episode_user))
+    )
+    in_range = flu_day < days
+    flu_user, flu_day = flu_user[in_range], flu_day[in_range]
+    flu_minute = rng.integers(7 * 60, 22 * 60, len(flu_user))
+    flu_symptom = rng.choice(FLU_SYMPTOMS, len(flu_user))
+    flu_severity = rng.integers(5, 10, len(flu_user))
+
+    # Unrelated noise
+    noise_user, noise_day = np.nonzero(rng.random((n_users, days)) < NOISE_SYMPTOM_RATE)
+    noise_minute = rng.integers(7 * 60, 22 * 60, len(noise_user))
+    noise_symptom = rng.choice(NOISE_SYMPTOMS, len(noise_user))
+    noise_severity = rng.integers(1, 5, len(noise_user))
+
+    symptom_user = np.concatenate([trigger_user, flu_user, noise_user])
+    symptom_day = np.concatenate([trigger_day, flu_day, noise_day])
+    symptom_minute = np.concatenate([trigger_minute, flu_minute, noise_minute])
+    symptom_text = np.concatenate([trigger_symptom, flu_symptom, noise_symptom]).tolist()
+    n_symptoms = len(symptom_user)
+    classification = {text: f"AI Classification: {_classification(text)}"
+                      for text in TRIGGER_SYMPTOMS + FLU_SYMPTOMS + NOISE_SYMPTOMS}
+    symptoms = [
+        _ids(rng, n_symptoms), user_index[symptom_user].tolist(), symptom_text,
+        np.concatenate([trigger_severity, flu_severity, noise_severity]).tolist(),
+        [classification[text] for text in symptom_text],
+        _timestamps(start64, symptom_day, symptom_minute)
+    ]
+
+    # Progress: weight follows a random walk from the user's starting weight
+    walk = weight[:, None] + np.cumsum(rng.normal(0, 0.1, (n_users, days)), axis=1)
+    progress_user, progress_day = np.nonzero(rng.random((n_users, days)) < 0.5)
+    n_progress = len(progress_user)
+    sugar_mean = np.where(diabetic, 150.0, 95.0)[progress_user]
+    systolic = rng.normal(118, 12, n_progress) + (bmi[progress_user] - 26) * 1.2
+    progress = [
+        _ids(rng, n_progress), user_index[progress_user].tolist(),
+        walk[progress_user, progress_day].round(1).tolist(),
+        rng.normal(sugar_mean, 15).clip(60, 350).round(0).tolist(),
+        systolic.clip(85, 200).round().astype(int).tolist(),
+        (systolic * 0.65 + rng.normal(0, 5, n_progress)).clip(50, 130).round().astype(int).tolist(),
+        [None] * n_progress,
+        _timestamps(start64, progress_day, rng.integers(6 * 60, 10 * 60, n_progress))
+    ]
+
+    return {"users": users, "meal_logs": meals, "symptom_logs": symptoms, "progress": progress}
+
+
+def unused_seed(engine: Engine) -> int:
+    """
+    A seed no earlier run wrote users with. Usernames, emails and ids all
+    derive from the seed, so reusing one collides with the unique columns.
+    """
+    # Every run writes user 0 as synthetic_<seed>_0
+    with engine.connect() as connection:
+        usernames = connection.execute(
+            select(User.username).where(User.username.like("synthetic!_%!_0", escape="!"))
+        ).scalars()
+        seeds = [int(name.split("_")[1]) for name in usernames if name.split("_")[1].lstrip("-").isdigit()]
+    return max(seeds, default=-1) + 1
+
+
+def generate(engine: Engine, users: int, days: int = 90, seed: int = 0, chunk_users: int = CHUNK_USERS,
+             start: Optional[datetime] = None, tables: Optional[List[str]] = None,
+             report=None) -> Dict[str, Any]:
+    """
+    Generate and write `users` users with `days` days of history ending now.
+    `tables` limits what is written (users are always written). Returns row
+    counts and rows per second per table.
+    """
+    start = (start or datetime.utcnow() - timedelta(days=days)).replace(hour=0, minute=0, second=0, microsecond=0)
+    tables = ["users"] + [t for t in (tables or TABLE_COLUMNS) if t != "users"]
+    foods = load_foods()
+    password_hash = pwd_context.hash(SYNTHETIC_PASSWORD)
+    counts = {table: 0 for table in tables}
+    write_seconds = {table: 0.0 for table in tables}
+    started = time.perf_counter()
+
+    for chunk, first_user in enumerate(range(0, users, chunk_users)):
+        n_users = min(chunk_users, users - first_user)
+        # One stream per block, so blocks are independent of each other
+        rng = np.random.default_rng([seed, chunk])
+        data = generate_chunk(rng, first_user, n_users, days, start, foods, seed, password_hash)
+        with engine.begin() as connection:
+            for table in tables:
+                t0 = time.perf_counter()
+                counts[table] += write_rows(connection, table, TABLE_COLUMNS[table], data[table])
+                write_seconds[table] += time.perf_counter() - t0
+        if report is not None:
+            report(f"{first_user + n_users}/{users} users, {sum(counts.values())} rows, "
+                   f"{time.perf_counter() - started:.1f}s")
+
+    elapsed = time.perf_counter() - started
+    return {
+        "rows": counts,
+        "seconds": round(elapsed, 2),
+        "rows_per_second": round(sum(counts.values()) / elapsed) if elapsed > 0 else None,
+        "write_rows_per_second": {
+            table: round(counts[table] / write_seconds[table]) if write_seconds[table] > 0 else None for table in tables
+        }
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    from ..db import Base, engine
+
+    parser = argparse.ArgumentParser(description="Generate synthetic HealthSync data")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--start", type=datetime.fromisoformat, default=None,
+                        help="first day of history (YYYY-MM-DD), default: --days before today")
+    parser.add_argument("--chunk-users", type=int, default=CHUNK_USERS)
+    parser.add_argument("--tables", default=",".join(TABLE_COLUMNS),
+                        help="comma separated subset of " + ", ".join(TABLE_COLUMNS))
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    result = generate(engine, args.users, args.days, args.seed, args.chunk_users, start=args.start,
+                      tables=args.tables.split(","), report=print)
+    print(json.dumps(result, indent=2))
@@ -0,0 +1,188 @@
+"""HealthSync Training Worker
+
+Trains the symptom forecaster in its own process so model training never
+competes with request handling in the API workers.
+
+The API only enqueues a row in model_training_runs. The worker claims the
+oldest queued run (with SKIP LOCKED where the database supports it, so
+several workers can share the queue), trains, and writes epoch progress,
+loss and a heartbeat to the run row as it goes. The finished run holds the
+metrics and the published model version, which the API processes pick up
+through the model registry. Runs whose heartbeat stops (the worker died)
+are marked failed after TRAINING_WORKER_STALE_SECONDS.
+
+The worker lowers its own CPU priority and caps BLAS threads so it stays out
+of the way of API workers on the same host.
+
+Configuration:
+    TRAINING_WORKER_POLL_SECONDS   seconds between queue checks (default 5)
+    TRAINING_WORKER_THREADS        BLAS/OpenMP threads used for training (default 1)
+    TRAINING_WORKER_NICE           niceness added to the worker process (default 10)
+    TRAINING_WORKER_STALE_SECONDS  heartbeat age after which a running job is failed (default 600)
+
+Run the worker with:
+    python -m app.services.training_worker [--once]
+"""
+
+import json
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy.orm import Session
+
+from ..db import SessionLocal
+from ..models.model_training_run import ModelTrainingRun
+from .symptom_predictor import symptom_predictor
+
+logger = logging.getLogger(__name__)
+
+TRAINING_WORKER_POLL_SECONDS = float(os.getenv("TRAINING_WORKER_POLL_SECONDS", "5"))
+TRAINING_WORKER_THREADS = int(os.getenv("TRAINING_WORKER_THREADS", "1"))
+TRAINING_WORKER_NICE = int(os.getenv("TRAINING_WORKER_NICE", "10"))
+TRAINING_WORKER_STALE_SECONDS = int(os.getenv("TRAINING_WORKER_STALE_SECONDS", "600"))
+
+TRAINING_MODES = ("incremental", "full")
+
+
+def enqueue_training(db: Session, mode: str = "incremental") -> ModelTrainingRun:
+    """Queue a training run, reusing a run of the same mode that is still queued"""
+    queued = db.query(ModelTrainingRun).filter(
+        ModelTrainingRun.status == "queued", ModelTrainingRun.mode == mode
+    ).first()
+    if queued is not None:
+        return queued
+    run = ModelTrainingRun(mode=mode, status="queued")
+    db.add(run)
+    db.commit()
+    db.refresh(run)
+    return run
+
+
+def get_recent_runs(db: Session, limit: int = 10) -> List[ModelTrainingRun]:
+    """Get the most recent training runs, newest first"""
+    return db.query(ModelTrainingRun).order_by(ModelTrainingRun.requested_at.desc()).limit(limit).all()
+
+
+def fail_stale_runs(db: Session) -> int:
+    """Mark running jobs whose worker stopped sending heartbeats as failed"""
+    cutoff = datetime.utcnow() - timedelta(seconds=TRAINING_WORKER_STALE_SECONDS)
+    count = db.query(ModelTrainingRun).filter(
+        ModelTrainingRun.status == "running", ModelTrainingRun.heartbeat_at < cutoff
+    ).update({
+        ModelTrainingRun.status: "failed",
+        ModelTrainingRun.error: "Training worker stopped responding",
+        ModelTrainingRun.finished_at: datetime.utcnow()
+    }, synchronize_session=False)
+    db.commit()
+    return count
+
+
+def claim_next(db: Session, worker: str) -> Optional[ModelTrainingRun]:
+    """Claim the oldest queued run for this worker"""
+    run = db.query(ModelTrainingRun).filter(
+        ModelTrainingRun.status == "queued"
+    ).order_by(ModelTrainingRun.requested_at).limit(1).with_for_update(skip_locked=True).first()
+    if run is None:
+        db.rollback()
+        return None
+    now = datetime.utcnow()
+    run.status = "running"
+    run.worker = worker
+    run.started_at = now
+    run.heartbeat_at = now
+    db.commit()
+    return run
+
+
+def execute(db: Session, run: ModelTrainingRun) -> ModelTrainingRun:
+    """Train for a claimed run, recording progress on the run row"""
+    def progress(epoch: int, epochs: int, loss: float):
+        run.epoch = epoch
+        run.epochs = epochs
+        run.progress = round(epoch / epochs, 4)
+        run.loss = round(loss, 6)
+        run.heartbeat_at = datetime.utcnow()
+        db.commit()
+
+    try:
+        result = symptom_predictor.train(db, full=run.mode == "full", progress=progress)
+    except Exception as e:
+        logger.exception("Training run %s failed", run.id)
+        db.rollback()
+        run.status = "failed"
+        run.error = str(e)
+    else:
+        run.samples = result.get("samples")
+        run.model_version = result.get("version")
+        run.metrics = json.dumps({k: v for k, v in result.items() if k not in ("success", "samples", "version")})
+        if not result["success"]:
+            run.status = "failed"
+            run.error = result.get("message")
+        elif "message" in result:
+            # Nothing new to train on
+            run.status = "skipped"
+        else:
+            run.status = "completed"
+            run.progress = 1.0
+    run.finished_at = datetime.utcnow()
+    db.commit()
+    return run
+
+
+def work_once(worker: str) -> Optional[ModelTrainingRun]:
+    """Run at most one queued job. Returns the run, or None if the queue was empty."""
+    db = SessionLocal()
+    try:
+        fail_stale_runs(db)
+        run = claim_next(db, worker)
+        if run is None:
+            return None
+        logger.info("Training run %s (%s) started", run.id, run.mode)
+        run = execute(db, run)
+        logger.info("Training run %s %s, model version %s", run.id, run.status, run.model_version)
+        return run
+    finally:
+        db.close()
+
+
+def _limit_resources():
+    if TRAINING_WORKER_NICE and hasattr(os, "nice"):
+        os.nice(TRAINING_WORKER_NICE)
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(TRAINING_WORKER_THREADS)
+    except ImportError:
+        pass
+
+
+def main(once: bool = False, poll_seconds: float = TRAINING_WORKER_POLL_SECONDS):
+    _limit_resources()
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    logger.info("Training worker %s waiting for jobs", worker)
+    while True:
+        try:
+            run = work_once(worker)
+        except Exception:
+            logger.exception("Training worker iteration failed")
+            run = None
+        if once:
+            return
+        if run is None:
+            time.sleep(poll_seconds)
+
+
+if __name__ == "__main__":
+    import argparse
+    from ..db import Base, engine
+
+    parser = argparse.ArgumentParser(description="Symptom model training worker")
+    parser.add_argument("--once", action="store_true", help="run at most one queued job and exit")
+    parser.add_argument("--poll", type=float, default=TRAINING_WORKER_POLL_SECONDS, help="seconds between queue checks")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    Base.metadata.create_all(bind=engine)
+    main(once=args.once, poll_seconds=args.poll)
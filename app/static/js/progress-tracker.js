@@ -177,11 +177,10 @@ const ProgressTracker = {
         
         const ctx = document.querySelector('#weight-chart').getContext('2d');
         
-        // Extract data points for chart
+        // Fallback points when the series endpoint is unavailable
         const weightData = [];
         const labels = [];
         
-        // Assuming data contains first_measurement, latest_measurement, and potentially more points
         if (data.first_measurement && data.latest_measurement) {
             // Add first measurement
             labels.push(new Date(data.first_measurement.date).toLocaleDateString());
@@ -194,6 +193,39 @@ const ProgressTracker = {
             }
         }
         
+        // Long ranges are served from daily/weekly buckets by the series endpoint
+        this.loadSeries('weight')
+            .then(series => {
+                if (series.points && series.points.length > 0) {
+                    labels.length = 0;
+                    weightData.length = 0;
+                    series.points.forEach(point => {
+                        labels.push(new Date(point.start).toLocaleDateString());
+                        weightData.push(point.mean);
+                    });
+                }
+            })
+            .catch(error => console.error('Error loading weight series:', error))
+            .finally(() => this.drawWeightChart(ctx, labels, weightData));
+    },
+    
+    /**
+     * Load a downsampled metric series for the current time range
+     * @param {string} metric - Metric name (weight, blood_sugar, ...)
+     * @returns {Promise<Object>} Series data with points
+     */
+    loadSeries: function(metric) {
+        const url = `${this.config.apiBase}/user/${this.state.userId}/series?metric=${metric}&days=${this.state.currentDays}`;
+        return fetch(url).then(response => response.json());
+    },
+    
+    /**
+     * Draw the weight line chart
+     * @param {CanvasRenderingContext2D} ctx - Chart canvas context
+     * @param {Array} labels - X axis labels
+     * @param {Array} weightData - Weight values
+     */
+    drawWeightChart: function(ctx, labels, weightData) {
         // Create chart
         if (this.state.charts.weightChart) {
             this.state.charts.weightChart.destroy();
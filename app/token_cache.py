@@ -0,0 +1,139 @@
+"""
+Verified-token cache shared by the auth middleware and auth.get_current_user.
+
+A bearer token is decoded once; afterwards its claims (and, once the
+dependency has loaded it, a snapshot of the user row) are served from a
+bounded LRU until the token's exp. Logging out revokes a token until it
+would have expired anyway, and any update or delete of a User drops the
+cached snapshots for that username.
+
+The cache is per process: with several workers only the worker that handled
+the logout rejects the revoked token, so keep ACCESS_TOKEN_EXPIRE_MINUTES
+short.
+"""
+
+import os
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, Any, Optional
+
+from jose import JWTError, jwt
+from sqlalchemy import event, inspect
+
+from . import auth
+from .models.user import User
+
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
+
+class TokenCache:
+    """Bounded LRU of token -> {"claims", "exp", "user"}"""
+
+    def __init__(self, max_entries: int = TOKEN_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._tokens_by_user: Dict[str, set] = {}
+        self._revoked: Dict[str, float] = {}
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _drop(self, token: str):
+        entry = self._entries.pop(token, None)
+        if entry is not None:
+            tokens = self._tokens_by_user.get(entry["claims"].get("sub"))
+            if tokens is not None:
+                tokens.discard(token)
+                if not tokens:
+                    del self._tokens_by_user[entry["claims"].get("sub")]
+
+    def _get(self, token: str, now: float) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+        if entry["exp"] <= now:
+            self._drop(token)
+            return None
+        self._entries.move_to_end(token)
+        return entry
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        """Get the claims of a valid token, decoding it only on a cache miss. Raises JWTError."""
+        now = time.time()
+        with self._lock:
+            if token in self._revoked:
+                if self._revoked[token] > now:
+                    raise JWTError("Token has been revoked")
+                del self._revoked[token]
+            entry = self._get(token, now)
+            if entry is not None:
+                self.hits += 1
+                return entry["claims"]
+            self.misses += 1
+
+        claims = jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM])
+        exp = claims.get("exp")
+        if exp is None:
+            # Never cache tokens that do not expire
+            return claims
+
+        with self._lock:
+            self._drop(token)
+            self._entries[token] = {"claims": claims, "exp": float(exp), "user": None}
+            self._tokens_by_user.setdefault(claims.get("sub"), set()).add(token)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+        return claims
+
+    def get_user(self, token: str) -> Optional[Dict[str, Any]]:
+        """Get the cached user snapshot (column values) for a token"""
+        with self._lock:
+            entry = self._get(token, time.time())
+            return entry["user"] if entry is not None else None
+
+    def set_user(self, token: str, user: User):
+        """Remember a snapshot of the user a token belongs to"""
+        snapshot = {column.key: getattr(user, column.key) for column in inspect(User).column_attrs}
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None:
+                entry["user"] = snapshot
+
+    def revoke(self, token: str):
+        """Reject a token until it expires (logout)"""
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None:
+                exp = entry["exp"]
+            else:
+                try:
+                    exp = float(jwt.get_unverified_claims(token).get("exp") or 0)
+                except JWTError:
+                    return
+            self._drop(token)
+            now = time.time()
+            if exp > now:
+                self._revoked[token] = exp
+            # Keep the revocation list small by pruning expired tokens
+            for expired in [t for t, e in self._revoked.items() if e <= now]:
+                del self._revoked[expired]
+
+    def invalidate_user(self, username: str):
+        """Forget cached user snapshots for a username (user changed or deleted)"""
+        with self._lock:
+            for token in self._tokens_by_user.get(username, ()):
+                self._entries[token]["user"] = None
+
+
+# Process-wide cache instance
+token_cache = TokenCache()
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target):
+    token_cache.invalidate_user(target.username)
+    history = inspect(target).attrs.username.history
+    for old_username in history.deleted or ():
+        token_cache.invalidate_user(old_username)
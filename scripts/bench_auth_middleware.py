@@ -0,0 +1,115 @@
+"""
+Benchmark the auth middleware: requests per second through the previous
+BaseHTTPMiddleware + regex-list implementation versus the pure ASGI
+middleware, on an authenticated JSON endpoint and a public page path.
+
+Requests are driven straight through the ASGI interface (no sockets), so
+the numbers isolate framework and middleware overhead.
+
+    python scripts/bench_auth_middleware.py [--requests 5000]
+"""
+
+import argparse
+import asyncio
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from jose import JWTError, jwt
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.auth import SECRET_KEY, ALGORITHM, create_access_token
+from app.middleware import AuthMiddleware, PUBLIC_PATHS
+
+LEGACY_PATTERNS = [re.compile(f"^{path}$") for path in PUBLIC_PATHS]
+
+
+async def legacy_dispatch(request: Request, call_next):
+    """The previous BaseHTTPMiddleware dispatch function"""
+    path = request.url.path
+    if any(pattern.match(path) for pattern in LEGACY_PATTERNS):
+        return await call_next(request)
+    authorization = request.headers.get("Authorization")
+    if not authorization or not authorization.startswith("Bearer "):
+        return JSONResponse(status_code=401, content={"detail": "Not authenticated"})
+    try:
+        payload = jwt.decode(authorization.replace("Bearer ", ""), SECRET_KEY, algorithms=[ALGORITHM])
+        request.state.user = {"username": payload.get("sub")}
+    except JWTError:
+        return JSONResponse(status_code=401, content={"detail": "Invalid token"})
+    return await call_next(request)
+
+
+def build_app(kind: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/alerts/user/{user_id}/summary")
+    def summary(user_id: str):
+        return {"user_id": user_id, "total_alerts": 3, "unread_alerts": 1}
+
+    @app.get("/alerts")
+    def alerts_page():
+        return {"page": "alerts"}
+
+    if kind == "legacy":
+        app.add_middleware(BaseHTTPMiddleware, dispatch=legacy_dispatch)
+    else:
+        app.add_middleware(AuthMiddleware)
+    return app
+
+
+async def call(app, path: str, headers):
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": headers, "client": ("127.0.0.1", 1234), "server": ("test", 80)
+    }
+    status = []
+    received = []
+
+    async def receive():
+        if not received:
+            received.append(True)
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # Nothing more to read; the client stays connected until the response is sent
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    await app(scope, receive, send)
+    return status[0]
+
+
+async def bench(app, path: str, headers, n: int) -> float:
+    assert await call(app, path, headers) == 200
+    for _ in range(200):  # warm up
+        await call(app, path, headers)
+    start = time.perf_counter()
+    for _ in range(n):
+        await call(app, path, headers)
+    return n / (time.perf_counter() - start)
+
+
+async def main(n: int):
+    token = create_access_token({"sub": "bench"})
+    headers = [(b"host", b"test"), (b"authorization", f"Bearer {token}".encode())]
+    cases = [("authenticated", "/alerts/user/u1/summary", headers), ("public", "/alerts", [(b"host", b"test")])]
+
+    print(f"{'endpoint':<15}{'before rps':>12}{'after rps':>12}{'speedup':>10}")
+    for label, path, request_headers in cases:
+        before = await bench(build_app("legacy"), path, request_headers, n)
+        after = await bench(build_app("asgi"), path, request_headers, n)
+        print(f"{label:<15}{before:>12.0f}{after:>12.0f}{after / before:>9.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    asyncio.run(main(parser.parse_args().requests))
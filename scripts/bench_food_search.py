@@ -0,0 +1,101 @@
+"""
+Benchmark the food search index on a synthetic catalog: build time and
+autocomplete / meal item resolution latency (p50/p99) per query.
+
+Names are brand, style and food words drawn with Zipf-like frequencies,
+so common words are shared by many items, as in a real catalog. Queries are prefixes and misspelled
+(one character dropped) names of catalog items.
+
+    python scripts/bench_food_search.py [--items 100000] [--queries 2000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import numpy as np
+
+from app.services.food_search import FoodSearchIndex
+
+# Real food words first, then generated ones; words are drawn with Zipf-like
+# frequencies, so a few ("chicken", "organic") are in several percent of names
+FOODS = ["chicken breast", "brown rice", "broccoli", "salmon fillet", "oats", "whole milk", "greek yogurt",
+         "peanut butter", "apple", "banana", "almonds", "cheddar cheese", "white bread", "pasta", "egg",
+         "beef steak", "pork chop", "lentils", "chickpeas", "spinach", "sweet potato", "tofu", "quinoa",
+         "avocado", "orange juice", "tuna", "turkey", "blueberries", "carrot", "potato chips"]
+STYLES = ["grilled", "baked", "raw", "boiled", "fried", "roasted", "steamed", "smoked", "dried", "frozen",
+          "organic", "low fat", "whole", "light", "spicy", "sweet", "salted", "unsalted", "canned", "fresh"]
+SYLLABLES = [c + v for c in "bcdfghklmnprstvwz" for v in "aeiou"] + ["ch", "sh", "st", "er", "an", "on", "el"]
+
+
+def words(rng: np.random.Generator, real, count: int):
+    """The real words followed by made-up ones, in random order"""
+    made = set()
+    while len(made) < count - len(real):
+        made.add("".join(rng.choice(SYLLABLES, rng.integers(2, 4))))
+    made = sorted(made - set(real))
+    return list(real) + [made[i] for i in rng.permutation(len(made))]
+
+
+def zipf_choice(rng: np.random.Generator, items, size: int):
+    weights = 1 / (np.arange(len(items)) + 5)
+    return np.array(items, dtype=object)[rng.choice(len(items), size, p=weights / weights.sum())]
+
+
+def catalog(items: int, rng: np.random.Generator):
+    foods = words(rng, FOODS, 3000)
+    styles = words(rng, STYLES, 300)
+    brands = words(rng, [], 1000)
+    names = set()
+    while len(names) < items:
+        n = items - len(names)
+        for brand, style, food, has_brand in zip(zipf_choice(rng, brands, n), zipf_choice(rng, styles, n),
+                                                 zipf_choice(rng, foods, n), rng.random(n) < 0.6):
+            names.add(f"{brand} {style} {food}" if has_brand else f"{style} {food}")
+    return [(str(i), name, 100, *rng.uniform(0, 500, 4)) for i, name in enumerate(sorted(names)[:items])]
+
+
+def percentiles(samples):
+    values = np.array(samples) * 1000
+    return f"p50 {np.percentile(values, 50):.3f} ms, p99 {np.percentile(values, 99):.3f} ms"
+
+
+def main(items: int, queries: int):
+    rng = np.random.default_rng(0)
+    rows = catalog(items, rng)
+    start = time.perf_counter()
+    index = FoodSearchIndex(rows)
+    print(f"{len(index)} items, built in {time.perf_counter() - start:.2f}s, {len(index.postings)} postings")
+
+    picked = [rows[i][1] for i in rng.integers(0, len(rows), queries)]
+    prefixes = [name[:rng.integers(3, len(name) + 1)] for name in picked]
+    misspelled = []
+    for name in picked:
+        drop = rng.integers(0, len(name))
+        misspelled.append(name[:drop] + name[drop + 1:])
+
+    for label, fn, inputs in (("autocomplete", lambda q: index.search(q, 10), prefixes),
+                              ("resolve", index.resolve, misspelled)):
+        fn(inputs[0])
+        samples = []
+        for query in inputs:
+            t0 = time.perf_counter()
+            fn(query)
+            samples.append(time.perf_counter() - t0)
+        print(f"{label:<13} {percentiles(samples)}")
+
+    found = sum(1 for name, query in zip(picked, misspelled) if (m := index.resolve(query)) and index.names[m[0]] == name)
+    print(f"misspelled names resolved to the right item: {found / len(picked):.1%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the food search index")
+    parser.add_argument("--items", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.items, args.queries)
@@ -0,0 +1,119 @@
+"""
+Measure per-worker memory for the symptom classifier loaded the old way
+(joblib.load of a pickled RandomForestClassifier) versus the flat-array
+artifact memory-mapped with mmap_mode="r".
+
+Several worker processes (like uvicorn workers) load the same artifact and
+classify a batch so every page is touched, then report from
+/proc/self/smaps_rollup while all of them are still alive:
+
+    rss_delta   resident memory added by loading and using the model
+    pss_delta   proportional share: shared pages are split between the
+                processes mapping them, so this is the real cost per worker
+    private     private (unshared) memory added
+
+Linux only.
+
+    python scripts/bench_model_memory.py [--workers 4] [--trees 100]
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+FIELDS = ("Rss", "Pss", "Private_Clean", "Private_Dirty")
+
+
+def memory_kb():
+    values = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            name, _, rest = line.partition(":")
+            if name in FIELDS:
+                values[name] = int(rest.split()[0])
+    return values
+
+
+def worker(mode: str, path: str, ready, release, results):
+    import joblib
+    import numpy as np
+    from app.services.symptom_classifier import FlatForest
+
+    X = np.random.default_rng(1).random((2000, 4)).round()
+    before = memory_kb()
+    if mode == "pickle":
+        model = joblib.load(path)
+    else:
+        model = FlatForest.load(path, mmap_mode="r")
+    model.predict(X)
+    ready.wait()
+    # Measured while every worker holds the model, so shared pages are split
+    after = memory_kb()
+    results.put({
+        "rss_delta": after["Rss"] - before["Rss"],
+        "pss_delta": after["Pss"] - before["Pss"],
+        "private": (after["Private_Clean"] + after["Private_Dirty"]) - (before["Private_Clean"] + before["Private_Dirty"])
+    })
+    release.wait()
+
+
+def run(mode: str, path: str, workers: int):
+    context = multiprocessing.get_context("spawn")
+    ready, release = context.Barrier(workers), context.Barrier(workers + 1)
+    results = context.Queue()
+    processes = [context.Process(target=worker, args=(mode, path, ready, release, results)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    samples = [results.get() for _ in processes]
+    release.wait()
+    for process in processes:
+        process.join()
+    return {key: round(sum(s[key] for s in samples) / len(samples)) for key in samples[0]}
+
+
+def build_artifacts(directory: str, trees: int):
+    import joblib
+    import numpy as np
+    from sklearn.ensemble import RandomForestClassifier
+    from app.services.symptom_classifier import FlatForest
+
+    # Noisy labels make deep trees, so the forest is large enough to measure
+    rng = np.random.default_rng(0)
+    X = (rng.random((20000, 4)) < [0.15, 0.10, 0.08, 0.12]).astype(float) + rng.normal(0, 0.3, (20000, 4))
+    y = rng.integers(0, 3, len(X))
+    forest = RandomForestClassifier(n_estimators=trees, random_state=0, n_jobs=-1).fit(X, y)
+
+    pickled = os.path.join(directory, "forest.pickle.joblib")
+    flat = os.path.join(directory, "forest.flat.joblib")
+    joblib.dump(forest, pickled)
+    FlatForest.from_estimator(forest).save(flat)
+    return pickled, flat
+
+
+def main(workers: int, trees: int):
+    with tempfile.TemporaryDirectory() as directory:
+        pickled, flat = build_artifacts(directory, trees)
+        size_mb = os.path.getsize(flat) / 1e6
+        print(f"{trees} trees, flat artifact {size_mb:.1f} MB, {workers} workers\n")
+        print(f"{'mode':<12}{'RSS +MB':>10}{'PSS +MB':>10}{'private +MB':>13}")
+        rows = {}
+        for mode, path in (("pickle", pickled), ("flat-mmap", flat)):
+            rows[mode] = run(mode, path, workers)
+            r = rows[mode]
+            print(f"{mode:<12}{r['rss_delta'] / 1024:>10.1f}{r['pss_delta'] / 1024:>10.1f}{r['private'] / 1024:>13.1f}")
+        saved = (rows["pickle"]["pss_delta"] - rows["flat-mmap"]["pss_delta"]) / 1024
+        print(f"\nSaved per worker (PSS): {saved:.1f} MB, {saved * workers:.1f} MB across {workers} workers")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--trees", type=int, default=100)
+    args = parser.parse_args()
+    main(args.workers, args.trees)
@@ -0,0 +1,196 @@
+"""
+Benchmark candidate symptom models on accuracy versus CPU inference cost.
+
+Two tasks are measured on fixed, seeded synthetic data (no database needed):
+
+    classifier   symptom flags (fever, nausea, bloating, headache) -> class,
+                 as used by crud.create_symptom_log; candidates include the
+                 RandomForest from train_symptom_model.py and the deployed
+                 models/symptom_model.joblib, measured without retraining
+    forecaster   14-day symptom windows -> next day's class, as used by the
+                 symptom forecaster; windows come from the synthetic data
+                 generator through the sequence builder
+
+For every candidate the harness reports macro-F1 on a held-out split, the
+serialized size, load time, and single-row and batched inference latency
+(p50/p99). Results are written as JSON so runs can be compared across
+versions.
+
+    python scripts/bench_symptom_models.py [--output results.json] [--repeats 300]
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import joblib
+import numpy as np
+import sklearn
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.metrics import f1_score
+from sklearn.neural_network import MLPClassifier
+from sklearn.tree import DecisionTreeClassifier
+
+from app.services import symptom_sequences, synthetic_data
+from app.services.symptom_classifier import FlatForest
+from app.services.symptom_predictor import SEQUENCE_LENGTH
+
+SEED = 0
+BATCH_SIZE = 256
+
+# The classifier currently used by crud.create_symptom_log, benchmarked as is when present
+DEPLOYED_CLASSIFIER = os.path.join(ROOT, "models", "symptom_model.joblib")
+
+
+def classifier_dataset(n: int = 20000, seed: int = SEED):
+    """
+    Symptom flags drawn like train_symptom_model.py, labelled by its rule,
+    with 5% of labels flipped so the task is not trivially separable
+    """
+    rng = np.random.default_rng(seed)
+    X = (rng.random((n, 4)) < [0.15, 0.10, 0.08, 0.12]).astype(np.float64)
+    y = symptom_sequences.classify_days(X)
+    flip = rng.random(n) < 0.05
+    y[flip] = rng.integers(0, 3, int(flip.sum()))
+    return X, y
+
+
+def forecaster_dataset(users: int = 3000, days: int = 120, seed: int = SEED):
+    """Training windows built from generated symptom logs"""
+    rng = np.random.default_rng([seed, 0])
+    data = synthetic_data.generate_chunk(
+        rng, 0, users, days, datetime(2024, 1, 1), synthetic_data.load_foods(os.path.join(ROOT, "data", "food_sample.csv")), seed, "x"
+    )
+    user_id, symptom, severity, _, timestamp = data["symptom_logs"][1:]
+    columns = symptom_sequences.columns_from_rows(list(zip(user_id, symptom, severity, timestamp)))
+    grid, _ = symptom_sequences.daily_grid(columns, first_day=int(columns["day"].min()) - SEQUENCE_LENGTH)
+    X, y = symptom_sequences.training_windows(grid, SEQUENCE_LENGTH)
+    return X.reshape(len(X), -1).astype(np.float64), y
+
+
+CANDIDATES = {
+    "classifier": {
+        "random_forest_50": lambda: RandomForestClassifier(n_estimators=50, random_state=SEED),
+        "random_forest_10_depth6": lambda: RandomForestClassifier(n_estimators=10, max_depth=6, random_state=SEED),
+        "decision_tree": lambda: DecisionTreeClassifier(random_state=SEED),
+        "logistic_regression": lambda: LogisticRegression(max_iter=500),
+    },
+    "forecaster": {
+        "mlp_32": lambda: MLPClassifier(hidden_layer_sizes=(32,), max_iter=50, random_state=SEED),
+        "mlp_64_32": lambda: MLPClassifier(hidden_layer_sizes=(64, 32), max_iter=50, random_state=SEED),
+        "sgd_logistic": lambda: SGDClassifier(loss="log_loss", random_state=SEED),
+        "random_forest_50": lambda: RandomForestClassifier(n_estimators=50, random_state=SEED, n_jobs=1),
+    },
+}
+
+DATASETS = {"classifier": classifier_dataset, "forecaster": forecaster_dataset}
+
+
+def percentiles(samples):
+    values = np.array(samples) * 1000
+    return {"p50_ms": round(float(np.percentile(values, 50)), 4), "p99_ms": round(float(np.percentile(values, 99)), 4)}
+
+
+def time_calls(fn, repeats: int):
+    fn()  # warm up
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def measure(model, X_train, y_train, X_test, y_test, repeats: int, fit: bool = True):
+    start = time.perf_counter()
+    if fit:
+        model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start if fit else None
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "model.joblib")
+        joblib.dump(model, path)
+        size = os.path.getsize(path)
+        load_samples = time_calls(lambda: joblib.load(path), 5)
+        model = joblib.load(path)
+
+    single = X_test[:1]
+    batch = X_test[:BATCH_SIZE]
+    batch_samples = time_calls(lambda: model.predict(batch), max(repeats // 10, 10))
+    return {
+        "macro_f1": round(float(f1_score(y_test, model.predict(X_test), average="macro")), 4),
+        "fit_seconds": round(fit_seconds, 3) if fit else None,
+        "size_bytes": size,
+        "load_ms": round(float(np.median(load_samples)) * 1000, 3),
+        "single_row": percentiles(time_calls(lambda: model.predict(single), repeats)),
+        "batch": {
+            "rows": len(batch),
+            **percentiles(batch_samples),
+            "per_row_us": round(float(np.median(batch_samples)) / len(batch) * 1e6, 3)
+        }
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=ROOT, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(output: str, repeats: int, tasks):
+    results = {
+        "generated_at": datetime.utcnow().isoformat(),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "sklearn": sklearn.__version__,
+        "numpy": np.__version__,
+        "seed": SEED,
+        "tasks": {}
+    }
+    for task in tasks:
+        X, y = DATASETS[task]()
+        order = np.random.default_rng(SEED).permutation(len(X))
+        split = int(len(X) * 0.8)
+        train, test = order[:split], order[split:]
+        task_results = {"train_rows": int(split), "test_rows": int(len(test)), "features": int(X.shape[1]), "models": {}}
+        print(f"\n{task}: {split} train / {len(test)} test rows, {X.shape[1]} features")
+        print(f"{'model':<26}{'macro-F1':>9}{'size KB':>10}{'load ms':>9}{'1-row p50':>11}{'1-row p99':>11}"
+              f"{'batch p50':>11}{'batch p99':>11}")
+        candidates = [(name, build(), True) for name, build in CANDIDATES[task].items()]
+        if task == "classifier" and os.path.exists(DEPLOYED_CLASSIFIER):
+            candidates.append(("deployed", FlatForest.load(DEPLOYED_CLASSIFIER, mmap_mode=None), False))
+        for name, model, fit in candidates:
+            r = measure(model, X[train], y[train], X[test], y[test], repeats, fit)
+            task_results["models"][name] = r
+            print(f"{name:<26}{r['macro_f1']:>9.4f}{r['size_bytes'] / 1024:>10.1f}{r['load_ms']:>9.2f}"
+                  f"{r['single_row']['p50_ms']:>11.3f}{r['single_row']['p99_ms']:>11.3f}"
+                  f"{r['batch']['p50_ms']:>11.3f}{r['batch']['p99_ms']:>11.3f}")
+        results["tasks"][task] = task_results
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {output}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", default="symptom_model_benchmark.json", help="JSON results file ('' to skip)")
+    parser.add_argument("--repeats", type=int, default=300, help="timed single-row predictions per model")
+    parser.add_argument("--tasks", default="classifier,forecaster")
+    args = parser.parse_args()
+    main(args.output, args.repeats, args.tasks.split(","))
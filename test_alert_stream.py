@@ -0,0 +1,94 @@
+"""
+Tests for the authenticated Server-Sent Events alert stream.
+"""
+
+import os
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import auth, models
+from app.db import Base, get_db
+from app.middleware import AuthMiddleware
+from app.routes import alerts
+from app.services.alert_hub import alert_hub
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'alerts.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        db.add_all([
+            models.User(id="u1", username="alice", email="alice@example.com", hashed_password="x"),
+            models.User(id="u2", username="bob", email="bob@example.com", hashed_password="x")
+        ])
+        db.commit()
+
+    def get_test_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    monkeypatch.setattr(alerts, "STREAM_HEARTBEAT_SECONDS", 0.05)
+    app = FastAPI()
+    app.add_middleware(AuthMiddleware)
+    app.include_router(alerts.router)
+    app.dependency_overrides[get_db] = get_test_db
+    return TestClient(app)
+
+
+async def _read_stream(app, path: str, query: str):
+    """
+    Call the ASGI app like a browser EventSource (no headers), publish an
+    alert once the stream is open and disconnect after it arrives. The test
+    client would wait for the endless response to finish.
+    """
+    messages, body = [], []
+    disconnected = asyncio.Event()
+
+    async def receive():
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+        if message["type"] == "http.response.body":
+            body.append(message.get("body", b"").decode())
+            if len(body) == 1:
+                alert_hub.publish({"id": "a1", "user_id": "u1", "message": "Check your blood pressure"})
+            if "event: alert" in "".join(body):
+                disconnected.set()
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": query.encode(), "root_path": "",
+        "headers": [], "client": ("testclient", 50000), "server": ("testserver", 80)
+    }
+    await asyncio.wait_for(app(scope, receive, send), 5)
+    return messages[0], "".join(body)
+
+
+def test_stream_accepts_only_a_query_token(client):
+    token = auth.create_access_token({"sub": "alice"})
+    start, body = asyncio.run(_read_stream(client.app, "/alerts/user/u1/stream", f"token={token}"))
+    assert start["status"] == 200
+    assert body.startswith(": keep-alive")
+    assert "event: alert" in body and "Check your blood pressure" in body
+
+
+def test_stream_rejects_missing_and_foreign_tokens(client):
+    assert client.get("/alerts/user/u1/stream").status_code == 401
+    assert client.get("/alerts/user/u1/stream?token=not-a-jwt").status_code == 401
+    token = auth.create_access_token({"sub": "bob"})
+    assert client.get(f"/alerts/user/u1/stream?token={token}").status_code == 403
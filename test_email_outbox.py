@@ -0,0 +1,179 @@
+"""
+Tests for the email outbox worker against a local aiosmtpd server.
+"""
+
+import os
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import asyncio
+import socket
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+aiosmtpd_controller = pytest.importorskip("aiosmtpd.controller")
+
+from app import models
+from app.db import Base
+from app.services import email_outbox
+
+
+class RecordingHandler:
+    def __init__(self):
+        self.messages = []
+        self.sessions = set()
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith("bounce@"):
+            return "550 mailbox unavailable"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.sessions.add(id(session))
+        self.messages.append((envelope.rcpt_tos, envelope.content.decode()))
+        return "250 Message accepted"
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server():
+    handler = RecordingHandler()
+    controller = aiosmtpd_controller.Controller(handler, hostname="127.0.0.1", port=_free_port())
+    controller.start()
+    yield handler, controller.port
+    controller.stop()
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'outbox.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def _worker(port, session_factory, per_minute=60):
+    settings = {
+        "hostname": "127.0.0.1", "port": port, "username": None, "password": None,
+        "sender": "noreply@healthsync.test", "sender_name": "HealthSync",
+        "start_tls": False, "use_tls": False
+    }
+    return email_outbox.OutboxWorker(
+        settings, batch_size=10,
+        rate_limiter=email_outbox.DomainRateLimiter(per_minute),
+        session_factory=session_factory
+    )
+
+
+def _enqueue(session_factory, *recipients):
+    db = session_factory()
+    for recipient in recipients:
+        email_outbox.enqueue_email(db, recipient, "Hello", "<p>Hi</p>")
+    db.commit()
+    db.close()
+
+
+def _rows(session_factory):
+    db = session_factory()
+    rows = {r.recipient: r for r in db.query(models.EmailOutbox).all()}
+    db.close()
+    return rows
+
+
+def test_batch_is_sent_over_one_connection(smtp_server, session_factory):
+    handler, port = smtp_server
+    _enqueue(session_factory, "a@one.test", "b@one.test", "c@two.test")
+
+    async def run():
+        worker = _worker(port, session_factory)
+        claimed = await worker.process_batch()
+        await worker.close()
+        return claimed
+
+    assert asyncio.run(run()) == 3
+    assert sorted(r[0][0] for r in handler.messages) == ["a@one.test", "b@one.test", "c@two.test"]
+    assert len(handler.sessions) == 1
+    assert all(r.status == "sent" and r.attempts == 1 for r in _rows(session_factory).values())
+
+
+def test_failed_send_is_retried_with_backoff(smtp_server, session_factory):
+    _, port = smtp_server
+    _enqueue(session_factory, "bounce@one.test")
+
+    async def run():
+        worker = _worker(port, session_factory)
+        await worker.process_batch()
+        # Not due again yet
+        assert await worker.process_batch() == 0
+        await worker.close()
+
+    asyncio.run(run())
+    row = _rows(session_factory)["bounce@one.test"]
+    assert row.status == "pending"
+    assert row.attempts == 1
+    assert row.last_error
+    assert row.next_attempt_at > datetime.utcnow()
+
+
+def test_domain_rate_limit_defers_without_counting_attempts(smtp_server, session_factory):
+    handler, port = smtp_server
+    _enqueue(session_factory, "a@one.test", "b@one.test")
+
+    async def run():
+        worker = _worker(port, session_factory, per_minute=1)
+        await worker.process_batch()
+        await worker.close()
+
+    asyncio.run(run())
+    rows = _rows(session_factory)
+    assert len(handler.messages) == 1
+    deferred = [r for r in rows.values() if r.status == "pending"]
+    assert len(deferred) == 1 and deferred[0].attempts == 0
+
+
+def test_only_critical_alerts_are_emailed(session_factory):
+    db = session_factory()
+    db.add(models.User(id="u1", username='ann<a href="x">', email="ann@one.test", hashed_password="x"))
+    db.commit()
+    queued = email_outbox.enqueue_critical_alerts(db, [
+        {"user_id": "u1", "severity": "critical", "message": "Blood pressure 190/120 <script>"},
+        {"user_id": "u1", "severity": "medium", "message": "Weight change"},
+        {"user_id": "missing", "severity": "critical", "message": "Unknown user"},
+    ])
+    db.commit()
+    db.close()
+    assert queued == 1
+    row = _rows(session_factory)["ann@one.test"]
+    assert row.kind == "critical_alert"
+    assert "190/120" in row.body
+    # Usernames and messages are escaped in the HTML body
+    assert "Hi ann&lt;a href=&quot;x&quot;&gt;," in row.body and "&lt;script&gt;" in row.body
+    assert "<script>" not in row.body and "<a " not in row.body
+
+
+def test_unbuildable_row_fails_without_aborting_the_batch(smtp_server, session_factory):
+    handler, port = smtp_server
+    _enqueue(session_factory, "a@one.test", "b@one.test")
+    db = session_factory()
+    db.query(models.EmailOutbox).filter_by(recipient="b@one.test").update({"subject": "Hello\nBcc: x@evil.test"})
+    db.commit()
+    db.close()
+
+    async def run():
+        worker = _worker(port, session_factory)
+        await worker.process_batch()
+        await worker.close()
+
+    asyncio.run(run())
+    rows = _rows(session_factory)
+    assert [r[0][0] for r in handler.messages] == ["a@one.test"]
+    assert rows["a@one.test"].status == "sent"
+    assert rows["b@one.test"].status == "failed" and "invalid message" in rows["b@one.test"].last_error
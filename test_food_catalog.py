@@ -0,0 +1,80 @@
+"""
+Tests for the chunked food catalog import and the food search index.
+"""
+
+import os
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, select
+
+from app import models
+from app.db import Base
+from app.services import food_catalog
+from app.services.food_search import FoodSearchIndex, resolve_meal_items
+
+HEADER = "name,serving_g,calories_per_100g,protein_g_per_100g,fat_g_per_100g,carbs_g_per_100g,tags\n"
+
+
+def test_import_upserts_on_name_and_serving(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'catalog.db'}")
+    Base.metadata.create_all(engine)
+    path = tmp_path / "catalog.csv"
+    path.write_text(HEADER + "Oats,100,389,16.9,6.9,66.3,gluten\n Oats ,40,389,16.9,6.9,66.3,\n"
+                    "Apple,150,52,0.3,0.2,14,fruit\n,100,1,1,1,1,\nApple,150,50,0.3,0.2,13,fruit\n")
+
+    first = food_catalog.import_catalog(engine, str(path), chunk_rows=2)
+    # SQLite cannot tell inserted from updated rows
+    assert (first["rows"], first["inserted"], first["skipped"]) == (4, None, 1)
+
+    path.write_text(HEADER + "Apple,150,55,0.3,0.2,14,fruit;vegan\nBanana,118,89,1.1,0.3,23,fruit\n")
+    second = food_catalog.import_catalog(engine, str(path))
+    assert (second["rows"], second["inserted"], second["updated"]) == (2, None, None)
+
+    with engine.connect() as connection:
+        foods = {(f.name, f.serving_g): f for f in connection.execute(select(models.FoodItem))}
+    assert sorted(foods) == [("Apple", 150), ("Banana", 118), ("Oats", 40), ("Oats", 100)]
+    assert (foods["Apple", 150].calories_per_100g, foods["Apple", 150].tags) == (55, "fruit;vegan")
+
+
+def test_legacy_table_is_rejected_until_migrated(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'catalog.db'}")
+    legacy = pd.DataFrame({"name": ["Oats", "Oats ", "Apple", None], "serving_g": [100, 100.0, 150, 10],
+                           "calories_per_100g": [389, 390, 52, 1], "protein_g_per_100g": [16.9, 16.9, 0.3, 1]})
+    legacy.to_sql("food_items", engine, index=False)
+    path = tmp_path / "catalog.csv"
+    path.write_text(HEADER + "Apple,150,55,0.3,0.2,14,fruit\n")
+
+    with pytest.raises(RuntimeError, match="--migrate"):
+        food_catalog.import_catalog(engine, str(path))
+
+    assert food_catalog.migrate_table(engine) == {"migrated": True, "rows_before": 4, "rows_after": 2, "removed": 2}
+    assert food_catalog.migrate_table(engine) == {"migrated": False}
+    assert food_catalog.import_catalog(engine, str(path))["rows"] == 1
+    with engine.connect() as connection:
+        foods = {(f.name, f.serving_g): f for f in connection.execute(select(models.FoodItem))}
+    assert sorted(foods) == [("Apple", 150), ("Oats", 100)]
+    assert foods["Apple", 150].calories_per_100g == 55 and foods["Oats", 100].id
+
+
+def test_search_ranks_prefixes_and_resolves_misspelled_meal_items():
+    index = FoodSearchIndex([
+        ("1", "Chicken breast", 100, 165, 31, 3.6, 0),
+        ("2", "Chickpeas", 100, 364, 19, 6, 61),
+        ("3", "Milk (whole)", 100, 61, 3.2, 3.3, 4.8),
+        ("4", "Broccoli", 91, 55, 3.7, 0.6, 11.1),
+    ])
+    assert [index.names[p] for p, _ in index.search("chick")] == ["Chickpeas", "Chicken breast"]
+    assert index.names[index.search("chicken b")[0][0]] == "Chicken breast"
+    assert index.resolve("pizza") is None
+
+    items, totals = resolve_meal_items(index, [
+        {"name": "whole milk", "grams": 250}, {"name": "brocoli"}, {"food_id": "1", "servings": 2},
+        {"name": "pizza", "calories": 800}
+    ])
+    assert [item["food_id"] for item in items] == ["3", "4", "1", None]
+    assert (items[1]["grams"], items[1]["logged_name"]) == (91, "brocoli")
+    assert totals["calories"] == round(152.5 + 50.05 + 330 + 800, 1)
+    assert totals["protein_g"] == round(8 + 3.367 + 62, 1)
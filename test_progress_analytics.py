@@ -0,0 +1,252 @@
+"""
+Regression tests for the NumPy progress analytics core.
+Expected trend outputs were captured from the previous list-based
+ProgressTracker implementation on the same fixture data.
+"""
+
+import os
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app import models
+from app.db import Base, SessionLocal, engine
+from app.services import goal_forecast, progress_analytics
+from app.services.progress_tracker import ProgressTracker
+
+# (days ago, weight, blood sugar, systolic, diastolic)
+FIXTURE_ROWS = [
+    (27, 82.4, None, 128, 84),
+    (24, 82.1, 101, None, None),
+    (21, 81.9, None, 131, 86),
+    (17, 81.5, 97, 125, 82),
+    (14, 81.6, None, None, None),
+    (10, 80.9, 104, 142, 91),
+    (7, 80.7, None, 127, 83),
+    (3, 80.2, 99, 122, 79),
+    (0.5, 80.0, None, 119, 78),
+    (40, 90.0, None, 160, 100),
+]
+
+
+@pytest.fixture(scope="module")
+def base_time():
+    return datetime.utcnow() - timedelta(hours=1)
+
+
+@pytest.fixture(scope="module")
+def tracker(base_time):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    for days_ago, weight, sugar, systolic, diastolic in FIXTURE_ROWS:
+        db.add(models.Progress(
+            user_id="u1", weight_kg=weight, blood_sugar=sugar,
+            blood_pressure_systolic=systolic, blood_pressure_diastolic=diastolic,
+            timestamp=base_time - timedelta(days=days_ago)
+        ))
+    db.add(models.Progress(user_id="u2", weight_kg=60, timestamp=base_time))
+    db.add(models.Progress(user_id="u3", weight_kg=60, timestamp=base_time - timedelta(days=5)))
+    db.add(models.Progress(user_id="u3", weight_kg=60.3, timestamp=base_time - timedelta(days=1)))
+    db.add(models.Progress(user_id="u5", weight_kg=70, timestamp=base_time - timedelta(hours=5)))
+    db.add(models.Progress(user_id="u5", weight_kg=71, timestamp=base_time))
+    db.commit()
+    yield ProgressTracker(db)
+    db.query(models.Progress).delete()
+    db.commit()
+    db.close()
+
+
+def _legacy_keys(result, keys):
+    return {k: result[k] for k in keys}
+
+
+WEIGHT_KEYS = ["status", "total_change_kg", "percent_change", "weekly_change_rate_kg",
+               "trend", "data_points", "days_tracked", "insights"]
+BP_KEYS = ["status", "average_systolic", "average_diastolic", "min_systolic", "max_systolic",
+           "min_diastolic", "max_diastolic", "category", "data_points", "insights"]
+
+
+def test_weight_trend_matches_previous_output(tracker, base_time):
+    result = tracker.analyze_weight_trend("u1", 30)
+    assert _legacy_keys(result, WEIGHT_KEYS) == {
+        "status": "success",
+        "total_change_kg": -2.4,
+        "percent_change": -2.91,
+        "weekly_change_rate_kg": -0.65,
+        "trend": "losing",
+        "data_points": 9,
+        "days_tracked": 26,
+        "insights": ["You've lost 2.4 kg over this period."],
+    }
+    assert result["first_measurement"] == {
+        "date": (base_time - timedelta(days=27)).isoformat(), "weight_kg": 82.4
+    }
+    assert result["latest_measurement"] == {
+        "date": (base_time - timedelta(days=0.5)).isoformat(), "weight_kg": 80.0
+    }
+
+
+def test_weight_trend_long_window_matches_previous_output(tracker):
+    result = tracker.analyze_weight_trend("u1", 90)
+    assert _legacy_keys(result, WEIGHT_KEYS) == {
+        "status": "success",
+        "total_change_kg": -10.0,
+        "percent_change": -11.11,
+        "weekly_change_rate_kg": -1.79,
+        "trend": "losing",
+        "data_points": 10,
+        "days_tracked": 39,
+        "insights": [
+            "You've lost 10.0 kg over this period.",
+            "You're losing weight at a rapid pace. While weight loss may be your goal, "
+            "losing too quickly can sometimes be unhealthy.",
+        ],
+    }
+
+
+def test_weight_trend_small_change_and_same_day(tracker):
+    stable = tracker.analyze_weight_trend("u3", 30)
+    assert _legacy_keys(stable, WEIGHT_KEYS) == {
+        "status": "success",
+        "total_change_kg": 0.3,
+        "percent_change": 0.5,
+        "weekly_change_rate_kg": 0.52,
+        "trend": "stable",
+        "data_points": 2,
+        "days_tracked": 4,
+        "insights": ["Your weight has remained stable over this period."],
+    }
+    same_day = tracker.analyze_weight_trend("u5", 30)
+    assert same_day["days_tracked"] == 1
+    assert same_day["weekly_change_rate_kg"] == 7.0
+    assert same_day["trend"] == "gaining"
+
+
+def test_weight_trend_insufficient_data(tracker):
+    expected = {
+        "status": "insufficient_data",
+        "message": "Need at least two weight measurements to analyze trends",
+    }
+    assert tracker.analyze_weight_trend("u2", 30) == expected
+    assert tracker.analyze_weight_trend("missing", 30) == expected
+
+
+def test_blood_pressure_trend_matches_previous_output(tracker):
+    assert _legacy_keys(tracker.analyze_blood_pressure_trend("u1", 30), BP_KEYS) == {
+        "status": "success",
+        "average_systolic": 127.7,
+        "average_diastolic": 83.3,
+        "min_systolic": 119,
+        "max_systolic": 142,
+        "min_diastolic": 78,
+        "max_diastolic": 91,
+        "category": "hypertension_stage_1",
+        "data_points": 7,
+        "insights": [
+            "Your blood pressure falls into hypertension stage 1. Consider consulting with a "
+            "healthcare provider about lifestyle changes and possibly medication."
+        ],
+    }
+    long_window = tracker.analyze_blood_pressure_trend("u1", 90)
+    assert long_window["average_systolic"] == 131.8
+    assert long_window["average_diastolic"] == 85.4
+    assert long_window["max_systolic"] == 160
+    assert long_window["data_points"] == 8
+    assert isinstance(long_window["min_systolic"], int)
+
+
+def test_blood_pressure_trend_insufficient_data(tracker):
+    assert tracker.analyze_blood_pressure_trend("u2", 30) == {
+        "status": "insufficient_data",
+        "message": "No blood pressure measurements found",
+    }
+
+
+def test_slope_matches_polyfit():
+    t = np.array([0.0, 1.0, 2.5, 4.0, 7.0])
+    values = np.array([
+        [80.0, 79.8, np.nan, 79.1, 78.5],
+        [120.0, np.nan, np.nan, np.nan, np.nan],
+    ])
+    slopes = progress_analytics.least_squares_slope(t, values)
+    mask = ~np.isnan(values[0])
+    assert slopes[0] == pytest.approx(np.polyfit(t[mask], values[0][mask], 1)[0])
+    assert np.isnan(slopes[1])
+
+
+def test_rolling_mean_skips_missing_samples():
+    values = np.array([[1.0, np.nan, 3.0, 5.0, np.nan]])
+    rolling = progress_analytics.rolling_mean(values, window=2)
+    np.testing.assert_allclose(rolling, [[1.0, 1.0, 3.0, 4.0, 5.0]])
+
+
+def test_outlier_flags():
+    values = np.array([
+        [70.0, 70.2, 69.9, 70.1, 95.0],
+        [5.0, 5.0, 5.0, 5.0, 5.0],
+    ])
+    flags = progress_analytics.outlier_flags(values)
+    assert flags[0].tolist() == [False, False, False, False, True]
+    assert not flags[1].any()
+
+
+def test_analyze_metrics_covers_all_metrics(tracker):
+    stats = tracker.analyze_metrics("u1", 90)
+    assert set(stats) == set(progress_analytics.METRIC_COLUMNS)
+    assert stats["weight_kg"]["count"] == 10
+    assert stats["blood_sugar"]["count"] == 4
+    assert stats["blood_sugar"]["variance"] == pytest.approx(np.var([101, 97, 104, 99]))
+    assert stats["blood_pressure_systolic"]["outliers"] == 1
+
+
+def test_bulk_trends_match_single_user_analysis(tracker):
+    user_ids = ["u1", "u2", "u3", "u5", "missing"]
+    bulk = tracker.analyze_trends_bulk(user_ids, 90)
+    assert list(bulk) == user_ids
+    for user_id in user_ids:
+        assert bulk[user_id]["weight_trend"] == tracker.analyze_weight_trend(user_id, 90)
+        assert bulk[user_id]["blood_pressure_trend"] == tracker.analyze_blood_pressure_trend(user_id, 90)
+
+
+def test_theil_sen_ignores_single_outlier():
+    t = np.arange(10, dtype=float)
+    y = 90.0 - 0.2 * t
+    y[4] = 120.0
+    slope, intercept, low, high = goal_forecast.theil_sen(t, y)
+    assert slope == pytest.approx(-0.2)
+    assert intercept == pytest.approx(90.0)
+    assert low <= slope <= high
+
+
+def test_forecast_reached_only_at_or_past_the_goal():
+    timestamps = np.array([datetime(2024, 1, d) for d in (1, 2, 3, 4)], dtype="datetime64[us]")
+    now = datetime(2024, 1, 4)
+    # Started at the target and has been moving away from it since
+    away = goal_forecast.forecast_time_to_goal(timestamps, np.array([80.0, 81.0, 82.0, 83.0]), 80.0, now)
+    assert (away["on_track"], away["estimated_days_to_goal"]) == (False, None)
+    # Passed the target and still moving the same way
+    past = goal_forecast.forecast_time_to_goal(timestamps, np.array([83.0, 82.0, 81.0, 79.0]), 80.0, now)
+    assert (past["on_track"], past["estimated_days_to_goal"]) == (True, 0)
+    # Passed the target earlier but now heading back to it
+    back = goal_forecast.forecast_time_to_goal(timestamps, np.array([76.0, 77.0, 78.0, 79.0]), 80.0, now)
+    assert back["on_track"] is True and back["estimated_days_to_goal"] == 1
+
+
+def test_goal_forecast_is_cached_until_new_progress(tracker, base_time):
+    goal_forecast.forecast_cache.invalidate_user("u1")
+    first = tracker.track_goal_progress("u1", "weight", 78.0)
+    assert first["initial_value"] == 90.0
+    assert first["current_value"] == 80.0
+    assert first["forecast"]["status"] == "success"
+    assert first["forecast"]["on_track"] is True
+    assert tracker.track_goal_progress("u1", "weight", 78.0) is first
+
+    tracker.db.add(models.Progress(user_id="u1", weight_kg=79.5, timestamp=base_time))
+    tracker.db.commit()
+    refreshed = tracker.track_goal_progress("u1", "weight", 78.0)
+    assert refreshed is not first
+    assert refreshed["current_value"] == 79.5
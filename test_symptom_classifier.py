@@ -0,0 +1,67 @@
+"""
+Tests for the flat-array symptom classifier.
+"""
+
+import os
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+from app.services.symptom_classifier import FlatForest, SymptomClassifier
+
+
+def _forest():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(2000, 4))
+    y = (X[:, 0] > 0).astype(int) + (X[:, 1] * X[:, 2] > 0.5)
+    return RandomForestClassifier(n_estimators=20, random_state=0).fit(X, y), rng.normal(size=(500, 4))
+
+
+def test_flat_forest_matches_sklearn_after_memory_mapped_load(tmp_path):
+    forest, X = _forest()
+    path = str(tmp_path / "model.joblib")
+    FlatForest.from_estimator(forest).save(path)
+
+    flat = FlatForest.load(path, mmap_mode="r")
+    assert isinstance(flat.left, np.memmap)
+    np.testing.assert_allclose(flat.predict_proba(X), forest.predict_proba(X))
+    np.testing.assert_array_equal(flat.predict(X), forest.predict(X))
+
+
+def test_classifier_picks_up_a_replaced_artifact(tmp_path):
+    path = str(tmp_path / "model.joblib")
+    classifier = SymptomClassifier(path, poll_seconds=0)
+    assert classifier.classify(["fever"]) == "unknown"
+
+    forest, _ = _forest()
+    FlatForest.from_estimator(forest).save(path)
+    first = classifier.current().version
+    assert classifier.classify(["fever", "headache"]) in ("none", "flu-like", "food-intolerance")
+
+    forest.set_params(n_estimators=5).fit(np.eye(4).repeat(10, axis=0), np.arange(4).repeat(10) % 3)
+    FlatForest.from_estimator(forest).save(path)
+    assert classifier.current().version != first
+
+
+def test_classification_memo_is_keyed_by_features_and_model_version(tmp_path):
+    path = str(tmp_path / "model.joblib")
+    forest, _ = _forest()
+    FlatForest.from_estimator(forest).save(path)
+    classifier = SymptomClassifier(path, poll_seconds=0, cache_size=2)
+
+    first = classifier.classify_many([["Fever", "headache"], ["headache", "fever", "fever"], ["nausea"]])
+    assert first[0] == first[1]
+    assert (classifier.hits, classifier.misses) == (0, 2)
+    assert classifier.classify(["headache", "FEVER", "sneezing"]) == first[0]
+    assert classifier.hits == 1
+
+    classifier.classify(["bloating"])
+    assert len(classifier._cache) == 2
+
+    forest.set_params(n_estimators=5).fit(np.eye(4).repeat(10, axis=0), np.arange(4).repeat(10) % 3)
+    FlatForest.from_estimator(forest).save(path)
+    classifier.classify(["fever", "headache"])
+    assert classifier.hits == 1
+    assert {version for version, _ in classifier._cache} == {classifier.current().version}
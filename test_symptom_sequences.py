@@ -0,0 +1,69 @@
+"""
+Tests for the vectorized symptom sequence builder.
+"""
+
+import os
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app.services import symptom_sequences as seq
+
+START = datetime(2024, 3, 1, 9, 0)
+
+
+def _rows():
+    return [
+        ("u1", "Fever, headache", 8, START),
+        ("u1", "nausea", 3, START + timedelta(hours=5)),
+        ("u1", "bloating", 5, START + timedelta(days=3)),
+        ("u2", "headache", 2, START + timedelta(days=1)),
+        ("u2", "", None, START + timedelta(days=6)),
+    ]
+
+
+def test_daily_grid_aggregates_and_forward_fills():
+    columns = seq.columns_from_rows(_rows())
+    assert list(columns["users"]) == ["u1", "u2"]
+
+    grid, first_day = seq.daily_grid(columns, forward_fill_days=1)
+    assert first_day == seq.day_number(START)
+    assert grid.shape == (2, 7, len(seq.DAY_FEATURES))
+
+    # Both u1 logs on day 0 merge: every flag and the highest severity
+    np.testing.assert_allclose(grid[0, 0], [1, 1, 0, 1, 0.8, 1])
+    # Day 1 carries day 0 forward but is not marked as logged, day 2 is past the limit
+    np.testing.assert_allclose(grid[0, 1], [1, 1, 0, 1, 0.8, 0])
+    np.testing.assert_allclose(grid[0, 2], 0)
+    np.testing.assert_allclose(grid[0, 3], [0, 0, 1, 0, 0.5, 1])
+    # Nothing is filled before a user's first log
+    np.testing.assert_allclose(grid[1, 0], 0)
+    assert grid[1, 6, seq.LOGGED] == 1 and grid[1, 6, seq.SEVERITY] == 0
+
+
+def test_training_windows_match_a_naive_loop():
+    rng = np.random.default_rng(3)
+    grid = rng.random((4, 30, len(seq.DAY_FEATURES))).astype(np.float32).round()
+    length = 5
+
+    X, y = seq.training_windows(grid, length)
+
+    expected_X, expected_y = [], []
+    for user in range(grid.shape[0]):
+        for end in range(length, grid.shape[1]):
+            if grid[user, end, seq.LOGGED] > 0:
+                expected_X.append(grid[user, end - length:end])
+                expected_y.append(seq.classify_days(grid[user, end, :seq.SEVERITY]))
+    np.testing.assert_array_equal(X, np.stack(expected_X))
+    np.testing.assert_array_equal(y, np.array(expected_y))
+
+
+def test_sliding_windows_is_a_view():
+    grid = np.arange(2 * 6 * len(seq.DAY_FEATURES), dtype=np.float32).reshape(2, 6, -1)
+    windows = seq.sliding_windows(grid, 3)
+    assert windows.shape == (2, 4, 3, len(seq.DAY_FEATURES))
+    assert np.shares_memory(windows, grid)
+    np.testing.assert_array_equal(windows[1, 2], grid[1, 2:5])
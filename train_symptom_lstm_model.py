@@ -7,100 +7,22 @@ from sqlalchemy.orm import Session
 from app.db import SessionLocal, engine, Base
 from app.services.symptom_predictor import symptom_predictor
 from app import crud, models
+from app.services import synthetic_data
 
 # Create tables if they don't exist
 Base.metadata.create_all(bind=engine)
 
-def generate_synthetic_data(db: Session, num_users: int = 5, days_per_user: int = 30):
-    """Generate synthetic symptom data for training the model"""
-    print(f"Generating synthetic data for {num_users} users over {days_per_user} days each...")
-    
-    # Create synthetic users if needed
-    users = db.query(models.User).limit(num_users).all()
-    existing_users = len(users)
-    
-    if existing_users < num_users:
-        print(f"Creating {num_users - existing_users} synthetic users...")
-        for i in range(existing_users, num_users):
-            user = models.User(
-                name=f"Synthetic User {i+1}",
-                gender="other",
-                height_cm=170.0,
-                weight_kg=70.0,
-                allergies=[],
-                diseases=[],
-                preferences={}
-            )
-            db.add(user)
-        db.commit()
-        users = db.query(models.User).limit(num_users).all()
-    
-    # Generate symptom patterns for each user
-    from datetime import datetime, timedelta
-    import random
-    
-    symptom_types = [
-        # Flu-like pattern
-        {"symptoms": ["fever", "headache"], "classification": "flu-like", "severity": (6, 9)},
-        # Food intolerance pattern
-        {"symptoms": ["nausea", "bloating"], "classification": "food-intolerance", "severity": (4, 7)},
-        # No symptoms pattern
-        {"symptoms": [], "classification": "none", "severity": (1, 3)}
-    ]
-    
-    # Create patterns with time dependencies
-    for user in users:
-        print(f"Generating data for user {user.id}...")
-        
-        # Create a pattern that changes over time
-        # For example: none -> food-intolerance -> flu-like -> food-intolerance -> none
-        pattern_sequence = [0, 0, 1, 1, 1, 2, 2, 2, 1, 1, 0, 0]
-        
-        start_date = datetime.utcnow() - timedelta(days=days_per_user)
-        
-        for day in range(days_per_user):
-            # Determine pattern based on position in sequence
-            pattern_idx = pattern_sequence[day % len(pattern_sequence)]
-            pattern = symptom_types[pattern_idx]
-            
-            # Add some randomness - occasionally skip a day or change pattern
-            if random.random() < 0.2:  # 20% chance to skip
-                continue
-                
-            if random.random() < 0.1:  # 10% chance to change pattern
-                pattern_idx = random.choice([i for i in range(len(symptom_types)) if i != pattern_idx])
-                pattern = symptom_types[pattern_idx]
-            
-            # Create symptom log
-            symptoms = pattern["symptoms"].copy()
-            
-            # Add some random additional symptoms occasionally
-            if random.random() < 0.3:  # 30% chance
-                additional = random.choice(["fatigue", "sore throat", "cough", "dizziness"])
-                symptoms.append(additional)
-            
-            # Vary severity within the pattern's range
-            severity = random.randint(pattern["severity"][0], pattern["severity"][1])
-            
-            # Create the log
-            log_date = start_date + timedelta(days=day)
-            
-            # Create a SymptomLogCreate object
-            symptom_log = models.SymptomLog(
-                user_id=user.id,
-                symptoms=symptoms,
-                severity=severity,
-                timestamp=log_date,
-                ai_classification=pattern["classification"],
-                needs_medical_attention=severity >= 8
-            )
-            
-            db.add(symptom_log)
-        
-        # Commit after each user
-        db.commit()
-    
-    print("Synthetic data generation complete!")
+def generate_synthetic_data(db: Session, num_users: int = 50, days_per_user: int = 90, seed: int = None):
+    """Generate synthetic users, meals and symptom data for training the model"""
+    if seed is None:
+        # A fresh seed on every call, so earlier synthetic users are not generated again
+        seed = synthetic_data.unused_seed(db.get_bind())
+    print(f"Generating synthetic data for {num_users} users over {days_per_user} days each (seed {seed})...")
+    result = synthetic_data.generate(
+        db.get_bind(), num_users, days_per_user, seed=seed,
+        tables=["meal_logs", "symptom_logs"], report=print
+    )
+    print(f"Synthetic data generation complete! {result['rows']}")
 
 def train_model():
     """Train the symptom prediction model"""
@@ -127,6 +49,7 @@ def train_model():
         
         if result["success"]:
             print(f"Model trained successfully!")
+            print(f"Training windows: {result['samples']}")
             print(f"Accuracy: {result['accuracy']:.4f}")
             print(f"Validation Accuracy: {result['val_accuracy']:.4f}")
             print(f"Epochs trained: {result['epochs_trained']}")
@@ -2,7 +2,7 @@
 import numpy as np
 import pandas as pd
 from sklearn.ensemble import RandomForestClassifier
-import joblib
+from app.services.symptom_classifier import FlatForest, SYMPTOM_MODEL_PATH
 
 # create toy data: symptoms -> label (0: none,1:flu-like,2:food-intolerance)
 rng = np.random.RandomState(0)
@@ -27,5 +27,6 @@ X = pd.DataFrame(feats, columns=['fever','nausea','bloating','headache'])
 y = pd.Series(labels)
 clf = RandomForestClassifier(n_estimators=50, random_state=0)
 clf.fit(X,y)
-joblib.dump(clf, "models/symptom_model.joblib")
-print("trained model saved to models/symptom_model.joblib")
+# Saved as flat arrays so API workers can memory-map and share one copy
+FlatForest.from_estimator(clf).save(SYMPTOM_MODEL_PATH)
+print(f"trained model saved to {SYMPTOM_MODEL_PATH}")